@@ -0,0 +1,168 @@
+import asyncio
+import sys
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+
+import django
+from django.conf import settings
+from django.core.handlers.wsgi import WSGIHandler
+
+# Тело запроса больше этого размера читается во временный файл.
+BODY_MEMORY_SIZE = 1024 * 1024
+
+
+def build_environ(scope, body, size):
+    """Собирает WSGI environ из ASGI scope и прочитанного тела."""
+    server = scope.get('server') or ('localhost', 80)
+    client = scope.get('client') or ('', 0)
+    environ = {
+        'REQUEST_METHOD': scope['method'],
+        'SCRIPT_NAME': scope.get('root_path', '').encode().decode('latin1'),
+        'PATH_INFO': scope['path'].encode().decode('latin1'),
+        'QUERY_STRING': scope.get('query_string', b'').decode('latin1'),
+        'SERVER_NAME': server[0],
+        'SERVER_PORT': str(server[1]),
+        'REMOTE_ADDR': client[0],
+        'SERVER_PROTOCOL': f'HTTP/{scope.get("http_version", "1.1")}',
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': scope.get('scheme', 'http'),
+        'wsgi.input': body,
+        'wsgi.errors': sys.stderr,
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': True,
+        'wsgi.run_once': False,
+    }
+    for name, value in scope.get('headers', []):
+        name = name.decode('latin1').upper().replace('-', '_')
+        value = value.decode('latin1')
+        if name not in ('CONTENT_TYPE', 'CONTENT_LENGTH'):
+            name = f'HTTP_{name}'
+        if name in environ:
+            value = f'{environ[name]},{value}'
+        environ[name] = value
+    environ.setdefault('CONTENT_LENGTH', str(size))
+    return environ
+
+
+class AsgiHandler:
+    """ASGI-приложение поверх обычного синхронного обработчика Django.
+
+    Это не асинхронные view: в Django 2.2 их нет, и index,
+    group_posts, profile и post_detail остаются синхронными.
+    Асинхронна только работа с соединением: тело запроса читается
+    в цикле событий (большое — во временный файл), и медленный
+    клиент не занимает поток. Сам запрос — middleware, view, запросы
+    к базе и отрисовка — целиком выполняется в пуле из ASGI_THREADS
+    потоков, а части ответа передаются обратно в цикл. Весь запрос вместе
+    с request_finished идёт в одном потоке: на это рассчитаны
+    thread-local состояния роутера реплик, профилировщика и пула
+    миниатюр.
+    """
+
+    def __init__(self, wsgi_application=None, max_workers=None):
+        self.wsgi_application = wsgi_application or WSGIHandler()
+        self.executor = ThreadPoolExecutor(
+            max_workers=max_workers or settings.ASGI_THREADS,
+            thread_name_prefix='asgi',
+        )
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            await self.lifespan(receive, send)
+        elif scope['type'] == 'http':
+            await self.http(scope, receive, send)
+        else:
+            raise ValueError(f'Неподдерживаемый тип {scope["type"]!r}')
+
+    async def lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                # Дожидается запросов в пуле, не блокируя цикл событий.
+                await asyncio.get_running_loop().run_in_executor(
+                    None, self.executor.shutdown
+                )
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    async def read_body(self, receive):
+        """Читает тело запроса; None, если клиент ушёл раньше."""
+        body = tempfile.SpooledTemporaryFile(max_size=BODY_MEMORY_SIZE)
+        while True:
+            message = await receive()
+            if message['type'] == 'http.disconnect':
+                body.close()
+                return None
+            body.write(message.get('body', b''))
+            if not message.get('more_body'):
+                size = body.tell()
+                body.seek(0)
+                return body, size
+
+    async def http(self, scope, receive, send):
+        request = await self.read_body(receive)
+        if request is None:
+            return
+        body, size = request
+        loop = asyncio.get_running_loop()
+        with body:
+            await loop.run_in_executor(
+                self.executor,
+                self.run_wsgi,
+                loop,
+                build_environ(scope, body, size),
+                send,
+            )
+
+    def run_wsgi(self, loop, environ, send):
+        """Выполняет запрос в потоке пула и отправляет ответ в цикл."""
+        response = {}
+
+        def send_sync(message):
+            asyncio.run_coroutine_threadsafe(send(message), loop).result()
+
+        def send_body(chunk, more_body):
+            if 'status' in response:
+                send_sync({
+                    'type': 'http.response.start',
+                    'status': response.pop('status'),
+                    'headers': response['headers'],
+                })
+            send_sync({
+                'type': 'http.response.body',
+                'body': chunk,
+                'more_body': more_body,
+            })
+
+        def start_response(status, headers, exc_info=None):
+            response['status'] = int(status.split(' ', 1)[0])
+            response['headers'] = [
+                (name.lower().encode('latin1'), value.encode('latin1'))
+                for name, value in headers
+            ]
+            return lambda chunk: send_body(chunk, True)
+
+        result = self.wsgi_application(environ, start_response)
+        try:
+            # Последняя часть уходит с more_body=False, поэтому обычный
+            # ответ укладывается в одно сообщение.
+            pending = None
+            for chunk in result:
+                if not chunk:
+                    continue
+                if pending is not None:
+                    send_body(pending, True)
+                pending = chunk
+            send_body(pending or b'', False)
+        finally:
+            close = getattr(result, 'close', None)
+            if close is not None:
+                close()
+
+
+def get_asgi_application():
+    """Точка входа ASGI, парная django.core.wsgi.get_wsgi_application."""
+    django.setup(set_prefix=False)
+    return AsgiHandler()
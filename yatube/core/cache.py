@@ -0,0 +1,209 @@
+import os
+import pickle
+import sqlite3
+import threading
+import time
+
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+
+# Время последнего чтения обновляется не чаще раза в ACCESS_PRECISION
+# секунд: LRU остаётся приблизительным, зато чтения почти не пишут.
+ACCESS_PRECISION = 10
+
+SCHEMA = (
+    'CREATE TABLE IF NOT EXISTS cache ('
+    'key TEXT PRIMARY KEY, value BLOB NOT NULL, expires REAL, '
+    'accessed REAL NOT NULL, size INTEGER NOT NULL)',
+    'CREATE INDEX IF NOT EXISTS cache_accessed_idx ON cache (accessed)',
+    'CREATE INDEX IF NOT EXISTS cache_expires_idx ON cache (expires)',
+    'CREATE TABLE IF NOT EXISTS cache_stats ('
+    'id INTEGER PRIMARY KEY CHECK (id = 0), '
+    'total INTEGER NOT NULL, entries INTEGER NOT NULL)',
+    'INSERT OR IGNORE INTO cache_stats VALUES (0, 0, 0)',
+    'CREATE TRIGGER IF NOT EXISTS cache_insert AFTER INSERT ON cache '
+    'BEGIN UPDATE cache_stats SET total = total + NEW.size, '
+    'entries = entries + 1; END',
+    'CREATE TRIGGER IF NOT EXISTS cache_update AFTER UPDATE OF size ON cache '
+    'BEGIN UPDATE cache_stats SET total = total + NEW.size - OLD.size; END',
+    'CREATE TRIGGER IF NOT EXISTS cache_delete AFTER DELETE ON cache '
+    'BEGIN UPDATE cache_stats SET total = total - OLD.size, '
+    'entries = entries - 1; END',
+)
+
+
+def shared_connection(local, path, schema):
+    """Соединение потока с общим для процессов файлом SQLite в WAL.
+
+    local — threading.local() владельца соединения, schema создаётся
+    при первом подключении.
+    """
+    # После fork соединение родителя использовать нельзя.
+    if getattr(local, 'pid', None) != os.getpid():
+        db = sqlite3.connect(path, timeout=5, isolation_level=None)
+        db.execute('PRAGMA journal_mode = WAL')
+        db.execute('PRAGMA synchronous = NORMAL')
+        for statement in schema:
+            db.execute(statement)
+        local.db = db
+        local.pid = os.getpid()
+    return local.db
+
+
+class SQLiteCache(BaseCache):
+    """Кеш в файле SQLite, общий для всех процессов на машине.
+
+    Запись в кеш из одного воркера, в том числе смена поколения лент,
+    сразу видна остальным. Размер ограничен OPTIONS MAX_SIZE (байты
+    значений) и MAX_ENTRIES. При превышении сначала удаляются
+    просроченные записи, затем давно не читавшиеся (LRU)
+    долями по CULL_FREQUENCY. Общий размер поддерживают триггеры,
+    так что проверка лимита не сканирует таблицу.
+    """
+
+    def __init__(self, location, params):
+        super().__init__(params)
+        self._path = location
+        self._max_size = params.get('OPTIONS', {}).get(
+            'MAX_SIZE', 64 * 1024 * 1024
+        )
+        self._local = threading.local()
+
+    @property
+    def _db(self):
+        return shared_connection(self._local, self._path, SCHEMA)
+
+    def _key(self, key, version):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        return key
+
+    def get(self, key, default=None, version=None):
+        key = self._key(key, version)
+        now = time.time()
+        row = self._db.execute(
+            'SELECT value, expires, accessed FROM cache WHERE key = ?', [key]
+        ).fetchone()
+        if row is None:
+            return default
+        value, expires, accessed = row
+        if expires is not None and expires <= now:
+            self._db.execute(
+                'DELETE FROM cache WHERE key = ? AND expires <= ?',
+                [key, now],
+            )
+            return default
+        if now - accessed > ACCESS_PRECISION:
+            self._db.execute(
+                'UPDATE cache SET accessed = ? WHERE key = ?', [now, key]
+            )
+        return pickle.loads(value)
+
+    def _write(self, key, value, timeout, only_missing):
+        now = time.time()
+        data = pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+        condition = (
+            'WHERE cache.expires IS NOT NULL AND cache.expires <= :now'
+            if only_missing else ''
+        )
+        cursor = self._db.execute(
+            'INSERT INTO cache (key, value, expires, accessed, size) '
+            'VALUES (:key, :value, :expires, :now, :size) '
+            'ON CONFLICT (key) DO UPDATE SET value = excluded.value, '
+            'expires = excluded.expires, accessed = excluded.accessed, '
+            f'size = excluded.size {condition}',
+            {
+                'key': key,
+                'value': data,
+                'expires': self.get_backend_timeout(timeout),
+                'now': now,
+                'size': len(data),
+            },
+        )
+        written = cursor.rowcount > 0
+        if written:
+            self._cull()
+        return written
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        self._write(self._key(key, version), value, timeout, False)
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        return self._write(self._key(key, version), value, timeout, True)
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        cursor = self._db.execute(
+            'UPDATE cache SET expires = ? WHERE key = ? '
+            'AND (expires IS NULL OR expires > ?)',
+            [self.get_backend_timeout(timeout), self._key(key, version),
+             time.time()],
+        )
+        return cursor.rowcount > 0
+
+    def delete(self, key, version=None):
+        cursor = self._db.execute(
+            'DELETE FROM cache WHERE key = ?', [self._key(key, version)]
+        )
+        return cursor.rowcount > 0
+
+    def has_key(self, key, version=None):
+        return self._db.execute(
+            'SELECT 1 FROM cache WHERE key = ? '
+            'AND (expires IS NULL OR expires > ?)',
+            [self._key(key, version), time.time()],
+        ).fetchone() is not None
+
+    def incr(self, key, delta=1, version=None):
+        """Увеличивает значение атомарно для всех процессов."""
+        key = self._key(key, version)
+        db = self._db
+        db.execute('BEGIN IMMEDIATE')
+        try:
+            row = db.execute(
+                'SELECT value FROM cache WHERE key = ? '
+                'AND (expires IS NULL OR expires > ?)',
+                [key, time.time()],
+            ).fetchone()
+            if row is None:
+                raise ValueError(f"Key '{key}' not found")
+            value = pickle.loads(row[0]) + delta
+            data = pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+            db.execute(
+                'UPDATE cache SET value = ?, size = ? WHERE key = ?',
+                [data, len(data), key],
+            )
+        except BaseException:
+            db.execute('ROLLBACK')
+            raise
+        db.execute('COMMIT')
+        return value
+
+    def clear(self):
+        self._db.execute('DELETE FROM cache')
+
+    def close(self, **kwargs):
+        # Соединение потока живёт дольше запроса, как CONN_MAX_AGE.
+        pass
+
+    def _over_limit(self):
+        total, entries = self._db.execute(
+            'SELECT total, entries FROM cache_stats'
+        ).fetchone()
+        return (
+            total > self._max_size or entries > self._max_entries
+        ), entries
+
+    def _cull(self):
+        over, entries = self._over_limit()
+        if not over:
+            return
+        self._db.execute(
+            'DELETE FROM cache WHERE expires <= ?', [time.time()]
+        )
+        over, entries = self._over_limit()
+        while over and entries:
+            self._db.execute(
+                'DELETE FROM cache WHERE key IN ('
+                'SELECT key FROM cache ORDER BY accessed LIMIT ?)',
+                [max(1, entries // self._cull_frequency)],
+            )
+            over, entries = self._over_limit()
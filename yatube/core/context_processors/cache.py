@@ -0,0 +1,8 @@
+from django.conf import settings
+
+
+def cache_timeouts(request):
+    """Добавляет время жизни кешируемых фрагментов общих шаблонов."""
+    return {
+        'header_cache_timeout': settings.HEADER_CACHE_TIMEOUT,
+    }
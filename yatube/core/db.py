@@ -0,0 +1,93 @@
+import random
+import time
+from functools import wraps
+
+from django.db import (
+    DEFAULT_DB_ALIAS,
+    OperationalError,
+    connections,
+    transaction,
+)
+
+BUSY_MESSAGES = ('database is locked', 'database table is locked')
+
+
+def is_busy_error(error):
+    return isinstance(error, OperationalError) and any(
+        message in str(error) for message in BUSY_MESSAGES
+    )
+
+
+def backoff_delays(retries, base):
+    """Паузы перед повторами: экспонента с разбросом ±50%."""
+    for attempt in range(retries):
+        yield base * 2 ** attempt * random.uniform(0.5, 1.5)
+
+
+def apply_pragmas(connection):
+    """Выставляет PRAGMA из настроек базы на новом соединении SQLite."""
+    if connection.vendor != 'sqlite':
+        return
+    pragmas = connection.settings_dict.get('PRAGMAS', {})
+    with connection.cursor() as cursor:
+        for name, value in pragmas.items():
+            cursor.execute(f'PRAGMA {name} = {value}')
+
+
+def call_with_retry(call, connection):
+    """Вызывает call, повторяя его с паузами, пока база занята.
+
+    Внутри уже открытой транзакции ошибка пробрасывается сразу:
+    SQLite требует откатить и начать заново всю транзакцию.
+    Число повторов и начальная пауза берутся из BUSY_RETRIES
+    и BUSY_BACKOFF настроек базы.
+    """
+    delays = backoff_delays(
+        connection.settings_dict.get('BUSY_RETRIES', 0),
+        connection.settings_dict.get('BUSY_BACKOFF', 0.05),
+    )
+    while True:
+        try:
+            return call()
+        except OperationalError as error:
+            if connection.in_atomic_block or not is_busy_error(error):
+                raise
+            delay = next(delays, None)
+            if delay is None:
+                raise
+            time.sleep(delay)
+
+
+class BusyRetry:
+    """Обёртка execute_wrapper, повторяющая запрос при занятой базе."""
+
+    def __init__(self, connection):
+        self.connection = connection
+
+    def __call__(self, execute, sql, params, many, context):
+        return call_with_retry(
+            lambda: execute(sql, params, many, context), self.connection
+        )
+
+
+def install_busy_retry(connection):
+    if not any(
+        isinstance(wrapper, BusyRetry)
+        for wrapper in connection.execute_wrappers
+    ):
+        connection.execute_wrappers.append(BusyRetry(connection))
+
+
+def retry_on_busy(func=None, using=DEFAULT_DB_ALIAS):
+    """Выполняет функцию в транзакции, повторяя её при занятой базе."""
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            def attempt():
+                with transaction.atomic(using=using):
+                    return func(*args, **kwargs)
+            return call_with_retry(attempt, connections[using])
+        return wrapper
+    if func is not None:
+        return decorator(func)
+    return decorator
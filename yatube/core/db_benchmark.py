@@ -0,0 +1,136 @@
+import os
+import statistics
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import OperationalError, connections
+
+from .db import is_busy_error, retry_on_busy
+
+# Настройки Django по умолчанию: соединение на каждый запрос,
+# журнал DELETE и synchronous=FULL, без повторов.
+DEFAULT_PROFILE = {'CONN_MAX_AGE': 0}
+
+SCHEMA = (
+    'CREATE TABLE bench_post (id INTEGER PRIMARY KEY, text TEXT)',
+    'CREATE TABLE bench_comment (id INTEGER PRIMARY KEY AUTOINCREMENT, '
+    'post_id INTEGER, author_id INTEGER, text TEXT)',
+    'CREATE TABLE bench_follow (user_id INTEGER, author_id INTEGER, '
+    'PRIMARY KEY (user_id, author_id))',
+)
+POSTS = 100
+
+
+def _prepare(alias):
+    with connections[alias].cursor() as cursor:
+        for statement in SCHEMA:
+            cursor.execute(statement)
+        cursor.executemany(
+            'INSERT INTO bench_post (id, text) VALUES (%s, %s)',
+            [(pk, f'Пост {pk}') for pk in range(1, POSTS + 1)],
+        )
+    connections[alias].close()
+
+
+def _request(alias, user, step):
+    """Один «запрос»: чтение ленты, комментарий и подписка/отписка."""
+    post_id = (user * 31 + step) % POSTS + 1
+    author = (user + step) % 10
+    with connections[alias].cursor() as cursor:
+        cursor.execute(
+            'SELECT id, text FROM bench_post ORDER BY id DESC LIMIT 10'
+        )
+        cursor.fetchall()
+
+    @retry_on_busy(using=alias)
+    def write():
+        with connections[alias].cursor() as cursor:
+            cursor.execute(
+                'SELECT id FROM bench_post WHERE id = %s', [post_id]
+            )
+            cursor.execute(
+                'INSERT INTO bench_comment (post_id, author_id, text) '
+                'VALUES (%s, %s, %s)',
+                [post_id, user, 'Комментарий'],
+            )
+            if step % 2:
+                cursor.execute(
+                    'DELETE FROM bench_follow '
+                    'WHERE user_id = %s AND author_id = %s',
+                    [user, author],
+                )
+            else:
+                cursor.execute(
+                    'INSERT OR IGNORE INTO bench_follow (user_id, author_id) '
+                    'VALUES (%s, %s)',
+                    [user, author],
+                )
+    write()
+
+
+def run_profile(name, profile, threads, requests, directory):
+    """Гоняет конкурентные запросы на отдельной базе с профилем.
+
+    Возвращает пропускную способность, число ошибок «database is
+    locked» и задержки. После каждого запроса соединение закрывается
+    так же, как в конце HTTP-запроса, с учётом CONN_MAX_AGE.
+    """
+    alias = f'benchmark_{name}'
+    connections.databases[alias] = {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': os.path.join(directory, f'{name}.sqlite3'),
+        **profile,
+    }
+    _prepare(alias)
+    timings = []
+    errors = []
+    lock = threading.Lock()
+
+    def worker(user):
+        try:
+            for step in range(requests):
+                started = time.perf_counter()
+                try:
+                    _request(alias, user, step)
+                except OperationalError as error:
+                    if not is_busy_error(error):
+                        raise
+                    with lock:
+                        errors.append(error)
+                    continue
+                finally:
+                    connections[alias].close_if_unusable_or_obsolete()
+                with lock:
+                    timings.append((time.perf_counter() - started) * 1000)
+        finally:
+            connections[alias].close()
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        list(pool.map(worker, range(threads)))
+    elapsed = time.perf_counter() - started
+    del connections.databases[alias]
+    return {
+        'profile': name,
+        'requests_per_second': round(len(timings) / elapsed, 1),
+        'errors': len(errors),
+        'p50_ms': round(statistics.median(timings), 2) if timings else None,
+        'p95_ms': round(
+            sorted(timings)[int(len(timings) * 0.95) - 1], 2
+        ) if timings else None,
+    }
+
+
+def run(threads, requests):
+    """Сравнивает настройки Django по умолчанию с SQLITE_PROFILE."""
+    with tempfile.TemporaryDirectory() as directory:
+        return [
+            run_profile(name, profile, threads, requests, directory)
+            for name, profile in (
+                ('default', DEFAULT_PROFILE),
+                ('tuned', settings.SQLITE_PROFILE),
+            )
+        ]
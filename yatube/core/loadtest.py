@@ -0,0 +1,152 @@
+import asyncio
+import importlib.util
+import itertools
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+
+MODES = ('wsgi', 'asgi')
+# Каким сервером запускать каждый режим.
+SERVERS = {'wsgi': 'gunicorn', 'asgi': 'uvicorn'}
+START_TIMEOUT = 30
+
+
+async def fetch(host, port, path):
+    """Делает GET и возвращает статус ответа."""
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        writer.write(
+            f'GET {path} HTTP/1.1\r\nHost: {host}:{port}\r\n'
+            'Connection: close\r\n\r\n'.encode()
+        )
+        await writer.drain()
+        data = await reader.read()
+    finally:
+        writer.close()
+    return int(data.split(b' ', 2)[1])
+
+
+def _percentile(values, percent):
+    values = sorted(values)
+    index = min(len(values) - 1, round(percent / 100 * (len(values) - 1)))
+    return values[index]
+
+
+async def run_load(host, port, paths, concurrency, requests):
+    """Гоняет requests запросов по paths из concurrency клиентов сразу."""
+    targets = itertools.cycle(paths)
+    remaining = iter(range(requests))
+    timings = []
+    errors = 0
+
+    async def client():
+        nonlocal errors
+        for _ in remaining:
+            started = time.perf_counter()
+            try:
+                status = await fetch(host, port, next(targets))
+            except (OSError, IndexError, ValueError):
+                status = None
+            if status is None or status >= 500:
+                errors += 1
+            else:
+                timings.append((time.perf_counter() - started) * 1000)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(client() for _ in range(concurrency)))
+    seconds = time.perf_counter() - started
+    return {
+        'requests': requests,
+        'errors': errors,
+        'seconds': round(seconds, 2),
+        'requests_per_second': round(len(timings) / seconds, 1),
+        'p50_ms': round(_percentile(timings, 50), 2) if timings else None,
+        'p99_ms': round(_percentile(timings, 99), 2) if timings else None,
+        'mean_ms': round(statistics.mean(timings), 2) if timings else None,
+    }
+
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def _wait_for_port(port, process):
+    deadline = time.monotonic() + START_TIMEOUT
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError('Сервер завершился при запуске')
+        try:
+            socket.create_connection(('127.0.0.1', port), timeout=1).close()
+            return
+        except OSError:
+            time.sleep(0.1)
+    raise RuntimeError('Сервер не запустился')
+
+
+def check_server(mode):
+    """Бросает ImproperlyConfigured, если сервер режима не установлен."""
+    server = SERVERS[mode]
+    if importlib.util.find_spec(server) is None:
+        raise ImproperlyConfigured(
+            f'Для режима {mode} нужен {server}: '
+            'pip install -r requirements-optional.txt'
+        )
+
+
+def server_command(mode, port, threads):
+    """Команда запуска сервера режима mode.
+
+    WSGI — gunicorn с одним воркером gthread на threads потоков,
+    ASGI — uvicorn с одним воркером и пулом AsgiHandler того же
+    размера (ASGI_THREADS передаётся через окружение).
+    """
+    if mode == 'wsgi':
+        return [
+            sys.executable, '-m', 'gunicorn', 'yatube.wsgi:application',
+            f'--bind=127.0.0.1:{port}', '--workers=1',
+            '--worker-class=gthread', f'--threads={threads}',
+            '--log-level=warning',
+        ]
+    return [
+        sys.executable, '-m', 'uvicorn', 'yatube.asgi:application',
+        '--host=127.0.0.1', f'--port={port}', '--workers=1',
+        '--lifespan=on', '--log-level=warning', '--no-access-log',
+    ]
+
+
+def run(paths, concurrency, requests, threads, modes=MODES):
+    """Сравнивает WSGI и ASGI на одной машине и одной базе.
+
+    Каждый сервер запускается отдельным процессом с одинаковым
+    числом потоков для Django, чтобы генератор нагрузки не делил
+    с ним GIL.
+    """
+    for mode in modes:
+        check_server(mode)
+    env = {**os.environ, 'ASGI_THREADS': str(threads)}
+    results = []
+    for mode in modes:
+        port = _free_port()
+        process = subprocess.Popen(
+            server_command(mode, port, threads),
+            cwd=settings.BASE_DIR,
+            env=env,
+        )
+        try:
+            _wait_for_port(port, process)
+            result = asyncio.run(run_load(
+                '127.0.0.1', port, paths, concurrency, requests
+            ))
+        finally:
+            process.terminate()
+            process.wait()
+        results.append({'mode': mode, **result})
+    return results
@@ -0,0 +1,42 @@
+from django.core.management.base import BaseCommand
+
+from core import db_benchmark
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает пропускную способность SQLite при конкурентных '
+        'комментариях и подписках с настройками по умолчанию '
+        'и с SQLITE_PROFILE.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--threads',
+            type=int,
+            default=8,
+            help='Сколько потоков одновременно шлют запросы.',
+        )
+        parser.add_argument(
+            '--requests',
+            type=int,
+            default=200,
+            help='Сколько запросов делает каждый поток.',
+        )
+
+    def handle(self, *args, **options):
+        results = db_benchmark.run(options['threads'], options['requests'])
+        for result in results:
+            self.stdout.write(
+                f'{result["profile"]}: '
+                f'{result["requests_per_second"]} запросов/с, '
+                f'ошибок блокировки {result["errors"]}, '
+                f'p50 {result["p50_ms"]} мс, p95 {result["p95_ms"]} мс'
+            )
+        default, tuned = (
+            result['requests_per_second'] for result in results
+        )
+        if default:
+            self.stdout.write(
+                self.style.SUCCESS(f'Ускорение: {tuned / default:.1f}x')
+            )
@@ -0,0 +1,60 @@
+from django.core.exceptions import ImproperlyConfigured
+from django.core.management.base import BaseCommand, CommandError
+
+from core import loadtest
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает пропускную способность gunicorn (WSGI) и uvicorn '
+        '(ASGI) под высокой конкурентностью на одной машине.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--path',
+            dest='paths',
+            action='append',
+            help='Адрес для нагрузки, можно несколько. По умолчанию /.',
+        )
+        parser.add_argument(
+            '--concurrency',
+            type=int,
+            default=200,
+            help='Сколько клиентов шлют запросы одновременно.',
+        )
+        parser.add_argument(
+            '--requests',
+            type=int,
+            default=2000,
+            help='Сколько всего запросов сделать.',
+        )
+        parser.add_argument(
+            '--threads',
+            type=int,
+            default=8,
+            help='Сколько потоков Django у каждого сервера.',
+        )
+
+    def handle(self, *args, **options):
+        try:
+            results = loadtest.run(
+                options['paths'] or ['/'],
+                options['concurrency'],
+                options['requests'],
+                options['threads'],
+            )
+        except ImproperlyConfigured as error:
+            raise CommandError(error)
+        for result in results:
+            self.stdout.write(
+                f'{result["mode"]}: '
+                f'{result["requests_per_second"]} запросов/с, '
+                f'ошибок {result["errors"]}, '
+                f'p50 {result["p50_ms"]} мс, p99 {result["p99_ms"]} мс'
+            )
+        wsgi, asgi = (result['requests_per_second'] for result in results)
+        if wsgi:
+            self.stdout.write(
+                self.style.SUCCESS(f'ASGI/WSGI: {asgi / wsgi:.1f}x')
+            )
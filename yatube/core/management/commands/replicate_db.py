@@ -0,0 +1,49 @@
+import sqlite3
+import time
+from contextlib import closing
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+
+def replicate(source, targets):
+    """Копирует SQLite-базу source в файлы targets через backup API.
+
+    Копия снимается целиком и согласованно, поэтому реплика
+    отстаёт от основной базы, но никогда не бывает наполовину
+    обновлённой.
+    """
+    with closing(sqlite3.connect(source)) as primary:
+        for target in targets:
+            with closing(sqlite3.connect(target)) as replica:
+                primary.backup(replica)
+
+
+class Command(BaseCommand):
+    help = (
+        'Локальная замена репликации: переносит основную SQLite-базу '
+        'в файлы реплик из REPLICA_DATABASES.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--interval',
+            type=float,
+            default=0,
+            help='Повторять каждые N секунд; 0 — один проход.',
+        )
+
+    def handle(self, *args, **options):
+        if not settings.REPLICA_DATABASES:
+            raise CommandError('Реплики не настроены, задайте DB_REPLICAS.')
+        source = settings.DATABASES['default']['NAME']
+        targets = [
+            settings.DATABASES[alias]['NAME']
+            for alias in settings.REPLICA_DATABASES
+        ]
+        while True:
+            replicate(source, targets)
+            self.stdout.write(f'Реплик обновлено: {len(targets)}')
+            if not options['interval']:
+                return
+            time.sleep(options['interval'])
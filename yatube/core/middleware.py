@@ -0,0 +1,227 @@
+import heapq
+import json
+import logging
+import random
+import threading
+import time
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.template.base import Template
+from django.template.loader import render_to_string
+from django.utils import timezone
+
+from .ratelimit import endpoint_name, limit_request
+from .routers import finish_request, start_request
+
+logger = logging.getLogger('core.profiling')
+
+PROFILE_PARAM = '_profile'
+PRIMARY_PIN_KEY = 'db_primary_until'
+SLOWEST_QUERIES = 5
+
+_local = threading.local()
+_original_render = Template.render
+
+
+class RequestProfile:
+    """Запросы к базе и отрисовка шаблонов за время одного запроса.
+
+    Экземпляр служит обёрткой для connection.execute_wrapper.
+    """
+
+    def __init__(self):
+        self.queries = 0
+        self.query_ms = 0.0
+        self.slowest = []
+        self.templates = {}
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed = (time.perf_counter() - started) * 1000
+            self.queries += 1
+            self.query_ms += elapsed
+            heapq.heappush(self.slowest, (elapsed, sql))
+            if len(self.slowest) > SLOWEST_QUERIES:
+                heapq.heappop(self.slowest)
+
+    def add_template(self, name, elapsed):
+        count, total = self.templates.get(name, (0, 0.0))
+        self.templates[name] = (count + 1, total + elapsed)
+
+    def as_dict(self):
+        return {
+            'queries': self.queries,
+            'query_ms': round(self.query_ms, 2),
+            'slowest_queries': [
+                {'ms': round(elapsed, 2), 'sql': sql}
+                for elapsed, sql in sorted(self.slowest, reverse=True)
+            ],
+            'templates': {
+                name: {'count': count, 'ms': round(total, 2)}
+                for name, (count, total) in self.templates.items()
+            },
+        }
+
+
+def _timed_render(self, context):
+    profile = getattr(_local, 'profile', None)
+    if profile is None:
+        return _original_render(self, context)
+    started = time.perf_counter()
+    try:
+        return _original_render(self, context)
+    finally:
+        profile.add_template(
+            self.name or '<string>',
+            (time.perf_counter() - started) * 1000,
+        )
+
+
+def install_template_timer():
+    """Подменяет Template.render, чтобы засекать время каждого шаблона.
+
+    Время шаблона включает вложенные include. Вне профилируемого
+    запроса обёртка сразу вызывает исходный метод.
+    """
+    Template.render = _timed_render
+
+
+class ProfilingMiddleware:
+    """Профилирует случайную долю запросов и пишет сводку в JSON.
+
+    Доля задаётся PROFILING_SAMPLE_RATE. У остальных запросов
+    засекается только общее время, и в журнал попадают лишь те,
+    что медленнее PROFILING_SLOW_REQUEST_MS. Сотрудник может включить
+    профилирование параметром ?_profile=1: тогда сводка придёт
+    в заголовке Server-Timing и панелью внизу страницы.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        install_template_timer()
+
+    def __call__(self, request):
+        forced = (
+            PROFILE_PARAM in request.GET
+            and request.user.is_staff
+        )
+        started = time.perf_counter()
+        if not forced and random.random() >= settings.PROFILING_SAMPLE_RATE:
+            response = self.get_response(request)
+            duration = (time.perf_counter() - started) * 1000
+            if duration >= settings.PROFILING_SLOW_REQUEST_MS:
+                self.log(request, response, duration)
+            return response
+        profile = RequestProfile()
+        _local.profile = profile
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(profile))
+                response = self.get_response(request)
+        finally:
+            _local.profile = None
+        duration = (time.perf_counter() - started) * 1000
+        record = self.log(request, response, duration, profile)
+        if forced:
+            self.add_panel(response, record)
+        return response
+
+    def log(self, request, response, duration, profile=None):
+        record = {
+            'time': timezone.now().isoformat(),
+            'method': request.method,
+            'path': request.path,
+            'view': getattr(request.resolver_match, 'view_name', None),
+            'status': response.status_code,
+            'duration_ms': round(duration, 2),
+            'slow': duration >= settings.PROFILING_SLOW_REQUEST_MS,
+            'sampled': profile is not None,
+        }
+        if profile is not None:
+            record.update(profile.as_dict())
+        logger.info(json.dumps(record, ensure_ascii=False))
+        return record
+
+    def add_panel(self, response, record):
+        response['Server-Timing'] = (
+            f'db;dur={record["query_ms"]};'
+            f'desc="{record["queries"]} queries", '
+            f'total;dur={record["duration_ms"]}'
+        )
+        if (
+            response.streaming
+            or 'text/html' not in response.get('Content-Type', '')
+        ):
+            return
+        content = response.content.decode(response.charset)
+        panel = render_to_string(
+            'core/profiling_panel.html', {'profile': record}
+        )
+        position = content.rfind('</body>')
+        if position == -1:
+            position = len(content)
+        response.content = content[:position] + panel + content[position:]
+        if response.has_header('Content-Length'):
+            response['Content-Length'] = len(response.content)
+
+
+class ReplicaRoutingMiddleware:
+    """Читает с реплик, пока сессия не закреплена за основной базой.
+
+    Запрос, который что-то записал, закрепляет свою сессию
+    за основной базой на REPLICA_STICKY_SECONDS, чтобы автор сразу
+    видел свои изменения, пока реплики их догоняют. Небезопасные
+    методы всегда читают основную базу. Без реплик в настройках
+    middleware отключается.
+    """
+
+    def __init__(self, get_response):
+        if not settings.REPLICA_DATABASES:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        pinned = (
+            request.method not in ('GET', 'HEAD', 'OPTIONS')
+            or request.session.get(PRIMARY_PIN_KEY, 0) > time.time()
+        )
+        start_request(use_replicas=not pinned)
+        try:
+            response = self.get_response(request)
+        finally:
+            wrote = finish_request()
+        if wrote:
+            request.session[PRIMARY_PIN_KEY] = (
+                time.time() + settings.REPLICA_STICKY_SECONDS
+            )
+        return response
+
+
+class RateLimitMiddleware:
+    """Ограничивает частоту запросов к адресам из RATELIMIT['RATES'].
+
+    У каждого IP-адреса и каждого пользователя своя корзина токенов
+    на адрес, запрос списывает из обеих. Когда токены кончаются,
+    middleware отвечает 429 до вызова view, не обращаясь к таблицам
+    постов. View с декоратором rate_limit пропускаются.
+    """
+
+    def __init__(self, get_response):
+        if not settings.RATELIMIT['RATES']:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        return self.get_response(request)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        if getattr(view_func, 'rate_limited', False):
+            return None
+        return limit_request(request, endpoint_name(request.resolver_match))
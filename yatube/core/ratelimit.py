@@ -0,0 +1,157 @@
+import random
+import threading
+import time
+from functools import wraps
+
+from django.conf import settings
+
+from .cache import shared_connection
+from .views import too_many_requests
+
+# Доля вызовов, после которых из файла удаляются полные корзины.
+PRUNE_PROBABILITY = 0.01
+
+SCHEMA = (
+    'CREATE TABLE IF NOT EXISTS buckets ('
+    'key TEXT PRIMARY KEY, tokens REAL NOT NULL, updated REAL NOT NULL, '
+    'expires REAL NOT NULL)',
+    'CREATE INDEX IF NOT EXISTS buckets_expires_idx ON buckets (expires)',
+)
+
+# Пополнение и списание одним UPSERT: при нехватке токенов WHERE
+# не пропускает обновление, и строка остаётся прежней.
+CONSUME = (
+    'INSERT INTO buckets (key, tokens, updated, expires) '
+    'VALUES (:key, :capacity - :cost, :now, :expires) '
+    'ON CONFLICT (key) DO UPDATE SET '
+    'tokens = MIN(:capacity, tokens + (:now - updated) * :rate) - :cost, '
+    'updated = :now, expires = :expires '
+    'WHERE MIN(:capacity, tokens + (:now - updated) * :rate) >= :cost'
+)
+
+
+class BucketStore:
+    """Корзины токенов в файле SQLite, общем для всех воркеров.
+
+    Корзина вмещает capacity токенов и наполняется заново за period
+    секунд. Списание атомарно для всех процессов и не трогает
+    основную базу, поэтому отказ не ждёт её блокировок.
+    """
+
+    def __init__(self, location):
+        self._path = location
+        self._local = threading.local()
+
+    @property
+    def _db(self):
+        return shared_connection(self._local, self._path, SCHEMA)
+
+    def consume(self, keys, capacity, period, cost=1):
+        """Списывает cost токенов из каждой корзины keys или ни из одной.
+
+        Возвращает None, если токенов хватило во всех корзинах, иначе
+        сколько секунд ждать до их появления в самой пустой.
+        """
+        rate = capacity / period
+        now = time.time()
+        params = {
+            'capacity': capacity,
+            'cost': cost,
+            'rate': rate,
+            'now': now,
+            'expires': now + period,
+        }
+        db = self._db
+        db.execute('BEGIN IMMEDIATE')
+        try:
+            short = [
+                key for key in keys
+                if not db.execute(CONSUME, {**params, 'key': key}).rowcount
+            ]
+        except BaseException:
+            db.execute('ROLLBACK')
+            raise
+        db.execute('ROLLBACK' if short else 'COMMIT')
+        if random.random() < PRUNE_PROBABILITY:
+            db.execute('DELETE FROM buckets WHERE expires < ?', [now])
+        if not short:
+            return None
+        waits = []
+        for key in short:
+            row = db.execute(
+                'SELECT tokens, updated FROM buckets WHERE key = ?', [key]
+            ).fetchone()
+            tokens = (
+                min(capacity, row[0] + (now - row[1]) * rate) if row else 0
+            )
+            waits.append(max(cost - tokens, 0) / rate)
+        return max(waits)
+
+    def clear(self):
+        self._db.execute('DELETE FROM buckets')
+
+
+_stores = {}
+
+
+def get_store():
+    """Хранилище корзин из settings.RATELIMIT['LOCATION']."""
+    location = settings.RATELIMIT['LOCATION']
+    if location not in _stores:
+        _stores[location] = BucketStore(location)
+    return _stores[location]
+
+
+def endpoint_name(resolver_match):
+    """Имя адреса с пространством приложения, например posts:add_comment."""
+    return ':'.join([*resolver_match.app_names, resolver_match.url_name or ''])
+
+
+def client_keys(request):
+    """Корзины клиента: IP-адрес и, если он вошёл, пользователь."""
+    keys = [f'ip:{request.META.get("REMOTE_ADDR", "")}']
+    if request.user.is_authenticated:
+        keys.append(f'user:{request.user.pk}')
+    return keys
+
+
+def limit_request(request, name):
+    """Ответ 429, если у клиента кончились токены адреса name.
+
+    Правила берутся из RATELIMIT['RATES'][name]: CAPACITY, PERIOD
+    и необязательный METHODS. Запрос списывает токен и из корзины
+    пользователя, и из корзины его IP-адреса, так что несколько
+    аккаунтов с одного адреса делят общий лимит. Для адресов без
+    правила и других методов возвращает None.
+    """
+    rule = settings.RATELIMIT['RATES'].get(name)
+    if rule is None or request.method not in rule.get(
+        'METHODS', (request.method,)
+    ):
+        return None
+    retry_after = get_store().consume(
+        [f'{name}:{key}' for key in client_keys(request)],
+        rule['CAPACITY'],
+        rule['PERIOD'],
+    )
+    if retry_after is None:
+        return None
+    return too_many_requests(request, retry_after)
+
+
+def rate_limit(name):
+    """Декоратор view: ограничивает его правилом RATELIMIT['RATES'][name].
+
+    Работает и без RateLimitMiddleware, а middleware такие view
+    пропускает, чтобы не списывать токены дважды.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            response = limit_request(request, name)
+            if response is not None:
+                return response
+            return view(request, *args, **kwargs)
+        wrapper.rate_limited = True
+        return wrapper
+    return decorator
@@ -0,0 +1,53 @@
+import random
+import threading
+
+from django.conf import settings
+
+PRIMARY_DB = 'default'
+PRIMARY_ONLY_APPS = {'sessions'}
+
+_state = threading.local()
+
+
+def start_request(use_replicas):
+    """Включает чтение с реплик для запроса в текущем потоке."""
+    _state.use_replicas = use_replicas
+    _state.wrote = False
+
+
+def finish_request():
+    """Выключает реплики и сообщает, писал ли запрос в основную базу."""
+    wrote = getattr(_state, 'wrote', False)
+    _state.use_replicas = False
+    _state.wrote = False
+    return wrote
+
+
+class ReplicaRouter:
+    """Отправляет чтения запроса на реплики из REPLICA_DATABASES.
+
+    Реплики используются только внутри запроса, который пропустил
+    ReplicaRoutingMiddleware; команды и фоновые задачи читают
+    основную базу. Запись всегда идёт в основную базу и отмечается,
+    чтобы закрепить за ней сессию автора изменений.
+    """
+
+    def db_for_read(self, model, **hints):
+        replicas = settings.REPLICA_DATABASES
+        if (
+            not replicas
+            or not getattr(_state, 'use_replicas', False)
+            or model._meta.app_label in PRIMARY_ONLY_APPS
+        ):
+            return PRIMARY_DB
+        return random.choice(replicas)
+
+    def db_for_write(self, model, **hints):
+        _state.wrote = True
+        return PRIMARY_DB
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db not in settings.REPLICA_DATABASES
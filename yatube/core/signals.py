@@ -0,0 +1,11 @@
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+
+from .db import apply_pragmas, install_busy_retry
+
+
+@receiver(connection_created)
+def tune_connection(sender, connection, **kwargs):
+    """Настраивает каждое новое соединение с базой."""
+    apply_pragmas(connection)
+    install_busy_retry(connection)
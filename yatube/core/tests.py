@@ -1,6 +1,50 @@
+import asyncio
+import json
+import os
+import sqlite3
+import tempfile
+import threading
+from contextlib import closing
 from http import HTTPStatus
+from io import StringIO
+from types import SimpleNamespace
+from unittest import mock
+from wsgiref.simple_server import WSGIRequestHandler, make_server
 
-from django.test import Client, TestCase
+from django.contrib.auth import get_user_model
+from django.contrib.sessions.backends.db import SessionStore
+from django.contrib.sessions.models import Session
+from django.core.cache import cache, caches
+from django.core.exceptions import MiddlewareNotUsed
+from django.core.handlers.wsgi import WSGIHandler
+from django.core.management import CommandError, call_command
+from django.db import OperationalError, connection, router
+from django.http import HttpResponse
+from django.test import (
+    Client,
+    RequestFactory,
+    SimpleTestCase,
+    TestCase,
+    override_settings,
+)
+from django.test.utils import CaptureQueriesContext
+from django.urls import resolve, reverse
+
+from posts.models import Post
+
+from .asgi import AsgiHandler
+from .cache import SQLiteCache
+from .db import call_with_retry
+from .loadtest import run_load, server_command
+from .management.commands.replicate_db import replicate
+from .middleware import (
+    RateLimitMiddleware,
+    ReplicaRoutingMiddleware,
+    logger,
+)
+from .ratelimit import BucketStore, rate_limit
+
+User = get_user_model()
 
 
 class ViewTestClass(TestCase):
@@ -16,3 +60,514 @@ class ViewTestClass(TestCase):
         """URL-адрес использует соответствующий шаблон."""
         response = self.client.get('/nonexist-page/')
         self.assertTemplateUsed(response, 'core/404.html')
+
+
+class ProfilingMiddlewareTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.staff = User.objects.create_user(username='staff', is_staff=True)
+        Post.objects.create(text='Тестовый пост', author=cls.author)
+        cls.index_url = reverse('posts:index')
+
+    def setUp(self):
+        cache.clear()
+        self.guest_client = Client()
+
+    def get_records(self, client, url):
+        with self.assertLogs('core.profiling') as logs:
+            response = client.get(url)
+        return response, [
+            json.loads(record.getMessage()) for record in logs.records
+        ]
+
+    @override_settings(PROFILING_SAMPLE_RATE=1)
+    def test_sampled_request_is_profiled(self):
+        """Выбранный запрос пишет число запросов и время шаблонов."""
+        _, [record] = self.get_records(self.guest_client, self.index_url)
+        self.assertEqual(record['view'], 'post:index')
+        self.assertEqual(record['status'], HTTPStatus.OK)
+        self.assertTrue(record['sampled'])
+        self.assertGreater(record['queries'], 0)
+        self.assertLessEqual(
+            len(record['slowest_queries']), record['queries']
+        )
+        templates = record['templates']
+        self.assertEqual(templates['includes/article.html']['count'], 1)
+        self.assertIn('posts/index.html', templates)
+
+    @override_settings(PROFILING_SAMPLE_RATE=0, PROFILING_SLOW_REQUEST_MS=0)
+    def test_slow_request_is_logged_without_profile(self):
+        """Медленный запрос вне выборки пишется без подробностей."""
+        _, [record] = self.get_records(self.guest_client, self.index_url)
+        self.assertTrue(record['slow'])
+        self.assertFalse(record['sampled'])
+        self.assertNotIn('queries', record)
+
+    @override_settings(PROFILING_SAMPLE_RATE=0)
+    def test_fast_request_is_not_logged(self):
+        """Быстрый запрос вне выборки не попадает в журнал."""
+        with mock.patch.object(logger, 'info') as log:
+            self.guest_client.get(f'{self.index_url}?_profile=1')
+        log.assert_not_called()
+
+    @override_settings(PROFILING_SAMPLE_RATE=0)
+    def test_staff_can_force_profiling_panel(self):
+        """Сотрудник видит панель профилирования по ?_profile=1."""
+        client = Client()
+        client.force_login(self.staff)
+        response, [record] = self.get_records(
+            client, f'{self.index_url}?_profile=1'
+        )
+        self.assertIn('Server-Timing', response)
+        self.assertContains(response, 'id="profiling-panel"')
+        self.assertContains(response, f'запросов к базе {record["queries"]}')
+
+
+@override_settings(REPLICA_DATABASES=['replica1'])
+class ReplicaRoutingTests(SimpleTestCase):
+    def setUp(self):
+        self.factory = RequestFactory()
+        self.session = SessionStore()
+
+    def run_request(self, method='get', write=False):
+        """Выполняет запрос и возвращает, куда роутер направил чтения."""
+        routed = {}
+
+        def view(request):
+            routed['post'] = router.db_for_read(Post)
+            routed['session'] = router.db_for_read(Session)
+            if write:
+                router.db_for_write(Post)
+            return HttpResponse()
+
+        request = getattr(self.factory, method)('/')
+        request.session = self.session
+        ReplicaRoutingMiddleware(view)(request)
+        return routed
+
+    def test_reads_go_to_replicas_inside_requests(self):
+        """Чтения запроса идут на реплику, сессии — в основную базу."""
+        self.assertEqual(
+            self.run_request(), {'post': 'replica1', 'session': 'default'}
+        )
+        self.assertEqual(router.db_for_read(Post), 'default')
+        self.assertEqual(self.run_request('post')['post'], 'default')
+
+    def test_session_sticks_to_primary_after_write(self):
+        """После записи сессия читает основную базу, пока не истечёт срок."""
+        self.run_request(write=True)
+        self.assertEqual(self.run_request()['post'], 'default')
+        with override_settings(REPLICA_STICKY_SECONDS=-1):
+            self.run_request(write=True)
+        self.assertEqual(self.run_request()['post'], 'replica1')
+
+    @override_settings(REPLICA_DATABASES=[])
+    def test_middleware_disabled_without_replicas(self):
+        """Без реплик middleware выключается."""
+        with self.assertRaises(MiddlewareNotUsed):
+            ReplicaRoutingMiddleware(HttpResponse)
+
+    def test_replicate_copies_database(self):
+        """Замена репликации переносит данные в файлы реплик."""
+        with tempfile.TemporaryDirectory() as directory:
+            source = os.path.join(directory, 'primary.sqlite3')
+            target = os.path.join(directory, 'replica.sqlite3')
+            with closing(sqlite3.connect(source)) as primary:
+                primary.execute('CREATE TABLE posts (text TEXT)')
+                primary.execute("INSERT INTO posts VALUES ('Пост')")
+                primary.commit()
+            replicate(source, [target])
+            with closing(sqlite3.connect(target)) as replica:
+                self.assertEqual(
+                    replica.execute('SELECT text FROM posts').fetchall(),
+                    [('Пост',)],
+                )
+
+
+class DatabaseProfileTests(TestCase):
+    def test_pragmas_applied_to_connection(self):
+        """Новое соединение получает PRAGMA из профиля базы."""
+        with connection.cursor() as cursor:
+            cursor.execute('PRAGMA synchronous')
+            self.assertEqual(cursor.fetchone()[0], 1)
+            cursor.execute('PRAGMA cache_size')
+            self.assertEqual(
+                cursor.fetchone()[0],
+                connection.settings_dict['PRAGMAS']['cache_size'],
+            )
+
+    def test_busy_database_is_retried(self):
+        """Занятая база повторяет вызов, другие ошибки — нет."""
+        calls = []
+
+        def flaky(message):
+            calls.append(message)
+            if len(calls) < 3:
+                raise OperationalError(message)
+            return 'ok'
+
+        fake_connection = SimpleNamespace(
+            in_atomic_block=False,
+            settings_dict={'BUSY_RETRIES': 5, 'BUSY_BACKOFF': 0.01},
+        )
+        with mock.patch('core.db.time.sleep') as sleep:
+            self.assertEqual(call_with_retry(
+                lambda: flaky('database is locked'), fake_connection
+            ), 'ok')
+            self.assertEqual(sleep.call_count, 2)
+            calls.clear()
+            with self.assertRaises(OperationalError):
+                call_with_retry(
+                    lambda: flaky('no such table'), fake_connection
+                )
+            self.assertEqual(len(calls), 1)
+            calls.clear()
+            fake_connection.in_atomic_block = True
+            with self.assertRaises(OperationalError):
+                call_with_retry(
+                    lambda: flaky('database is locked'), fake_connection
+                )
+            self.assertEqual(len(calls), 1)
+
+
+class DatabaseBenchmarkTests(SimpleTestCase):
+    def test_benchmark_compares_profiles(self):
+        """Бенчмарк гоняет оба профиля на временных базах."""
+        out = StringIO()
+        call_command('benchmark_db', threads=2, requests=5, stdout=out)
+        output = out.getvalue()
+        self.assertIn('default:', output)
+        self.assertIn('tuned:', output)
+        self.assertIn('Ускорение', output)
+
+
+class SQLiteCacheTests(SimpleTestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = os.path.join(directory.name, 'cache.sqlite3')
+
+    def make_cache(self, **options):
+        return SQLiteCache(self.path, {'OPTIONS': options})
+
+    def test_tests_use_temporary_cache(self):
+        """Тесты идут на SQLiteCache, но не в файле сервера."""
+        default = caches['default']
+        self.assertIsInstance(default, SQLiteCache)
+        self.assertTrue(default._path.startswith(tempfile.gettempdir()))
+
+    def test_workers_share_entries(self):
+        """Запись и удаление в одном воркере видны другому."""
+        first, second = self.make_cache(), self.make_cache()
+        first.set('index_page', 'фрагмент')
+        self.assertEqual(second.get('index_page'), 'фрагмент')
+        second.delete('index_page')
+        self.assertIsNone(first.get('index_page'))
+
+    def test_expired_entry_is_missing(self):
+        """Просроченная запись не отдаётся, add может её занять."""
+        cache = self.make_cache()
+        cache.set('key', 1, timeout=-1)
+        self.assertIsNone(cache.get('key'))
+        self.assertFalse(cache.has_key('key'))
+        self.assertTrue(cache.add('key', 2))
+        self.assertFalse(cache.add('key', 3))
+        self.assertEqual(cache.get('key'), 2)
+
+    def test_incr_and_touch(self):
+        cache = self.make_cache()
+        cache.set('counter', 1)
+        self.assertEqual(cache.incr('counter', 2), 3)
+        self.assertEqual(self.make_cache().get('counter'), 3)
+        with self.assertRaises(ValueError):
+            cache.incr('missing')
+        self.assertTrue(cache.touch('counter', None))
+        self.assertFalse(cache.touch('missing'))
+
+    def test_least_recently_used_entries_are_evicted(self):
+        """При переполнении уходят давно не читавшиеся записи."""
+        cache = self.make_cache(MAX_ENTRIES=3, CULL_FREQUENCY=3)
+        for number in range(3):
+            cache.set(f'key{number}', number)
+        with mock.patch('core.cache.ACCESS_PRECISION', -1):
+            cache.get('key0')
+        cache.set('key3', 3)
+        self.assertIsNone(cache.get('key1'))
+        self.assertEqual(cache.get('key0'), 0)
+        self.assertEqual(cache.get('key3'), 3)
+
+    def test_size_limit(self):
+        """Суммарный размер значений не превышает MAX_SIZE."""
+        cache = self.make_cache(MAX_SIZE=10000)
+        for number in range(20):
+            cache.set(f'key{number}', 'x' * 1000)
+        with closing(sqlite3.connect(self.path)) as db:
+            total = db.execute('SELECT SUM(size) FROM cache').fetchone()[0]
+        self.assertLessEqual(total, 10000)
+        self.assertEqual(cache.get('key19'), 'x' * 1000)
+
+
+class AsgiHandlerTests(SimpleTestCase):
+    def call(self, path, method='GET', body=b''):
+        scope = {
+            'type': 'http',
+            'method': method,
+            'path': path,
+            'query_string': b'',
+            'headers': [(b'host', b'testserver')],
+            'server': ('testserver', 80),
+            'client': ('127.0.0.1', 50000),
+        }
+        messages = [{'type': 'http.request', 'body': body}]
+        sent = []
+
+        async def receive():
+            return messages.pop(0)
+
+        async def send(message):
+            sent.append(message)
+
+        handler = AsgiHandler(max_workers=2)
+        asyncio.run(handler(scope, receive, send))
+        handler.executor.shutdown()
+        return sent
+
+    def test_page_is_served_from_thread_pool(self):
+        """Ответ Django приходит одним сообщением с телом."""
+        start, body = self.call(reverse('about:author'))
+        self.assertEqual(start['status'], HTTPStatus.OK)
+        self.assertIn(
+            (b'content-type', b'text/html; charset=utf-8'), start['headers']
+        )
+        self.assertFalse(body['more_body'])
+        self.assertIn('</html>', body['body'].decode())
+
+    def test_unknown_page(self):
+        start, _ = self.call('/missing/page/')
+        self.assertEqual(start['status'], HTTPStatus.NOT_FOUND)
+
+    def test_lifespan(self):
+        messages = [
+            {'type': 'lifespan.startup'}, {'type': 'lifespan.shutdown'}
+        ]
+        sent = []
+
+        async def receive():
+            return messages.pop(0)
+
+        async def send(message):
+            sent.append(message['type'])
+
+        handler = AsgiHandler(max_workers=1)
+        asyncio.run(handler({'type': 'lifespan'}, receive, send))
+        self.assertEqual(sent, [
+            'lifespan.startup.complete', 'lifespan.shutdown.complete'
+        ])
+
+
+class QuietHandler(WSGIRequestHandler):
+    def log_message(self, *args):
+        pass
+
+
+class LoadTestTests(SimpleTestCase):
+    def test_run_load(self):
+        """Генератор нагрузки считает ответы любого HTTP-сервера."""
+        server = make_server(
+            '127.0.0.1', 0, WSGIHandler(), handler_class=QuietHandler
+        )
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        try:
+            result = asyncio.run(run_load(
+                '127.0.0.1', server.server_address[1],
+                [reverse('about:author')], concurrency=5, requests=10,
+            ))
+        finally:
+            server.shutdown()
+            server.server_close()
+        self.assertEqual(result['errors'], 0)
+        self.assertEqual(result['requests'], 10)
+        self.assertGreater(result['requests_per_second'], 0)
+
+    def test_servers_get_same_threads(self):
+        wsgi = server_command('wsgi', 8001, threads=4)
+        asgi = server_command('asgi', 8002, threads=4)
+        self.assertIn('gunicorn', wsgi)
+        self.assertIn('--threads=4', wsgi)
+        self.assertIn('uvicorn', asgi)
+        self.assertIn('--port=8002', asgi)
+
+    def test_missing_server(self):
+        """Без gunicorn или uvicorn команда объясняет, что поставить."""
+        with mock.patch('importlib.util.find_spec', return_value=None):
+            with self.assertRaisesMessage(CommandError, 'requirements'):
+                call_command('loadtest', stdout=StringIO())
+
+
+class BucketStoreTests(SimpleTestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = os.path.join(directory.name, 'ratelimit.sqlite3')
+
+    def test_bucket_refills_over_time(self):
+        """Корзина пускает CAPACITY запросов и пополняется со временем."""
+        store = BucketStore(self.path)
+        with mock.patch('core.ratelimit.time.time', return_value=1000.0):
+            for _ in range(3):
+                self.assertIsNone(store.consume(['key'], 3, 60))
+            self.assertAlmostEqual(store.consume(['key'], 3, 60), 20)
+        with mock.patch('core.ratelimit.time.time', return_value=1020.0):
+            self.assertIsNone(store.consume(['key'], 3, 60))
+            self.assertAlmostEqual(store.consume(['key'], 3, 60), 20)
+
+    def test_workers_share_buckets(self):
+        """Токены списываются общие для всех воркеров."""
+        first, second = BucketStore(self.path), BucketStore(self.path)
+        self.assertIsNone(first.consume(['key'], 1, 60))
+        self.assertIsNotNone(second.consume(['key'], 1, 60))
+        self.assertIsNone(second.consume(['other'], 1, 60))
+
+    def test_keys_are_debited_together(self):
+        """Токены списываются из всех корзин сразу или ни из одной."""
+        store = BucketStore(self.path)
+        with mock.patch('core.ratelimit.time.time', return_value=1000.0):
+            self.assertIsNone(store.consume(['full'], 1, 60))
+            self.assertAlmostEqual(
+                store.consume(['empty', 'full'], 1, 60), 60
+            )
+            self.assertIsNone(store.consume(['empty'], 1, 60))
+
+
+class RateLimitTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='writer')
+        cls.other = User.objects.create_user(username='other')
+        cls.post = Post.objects.create(text='Тестовый пост', author=cls.user)
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        settings = override_settings(RATELIMIT={
+            'LOCATION': os.path.join(directory.name, 'ratelimit.sqlite3'),
+            'RATES': {
+                'posts:add_comment': {
+                    'CAPACITY': 2, 'PERIOD': 60, 'METHODS': ('POST',),
+                },
+                'posts:profile_follow': {'CAPACITY': 1, 'PERIOD': 60},
+            },
+        })
+        settings.enable()
+        self.addCleanup(settings.disable)
+        self.client = Client()
+        self.client.force_login(self.user)
+
+    def comment(self, client):
+        return client.post(
+            reverse('posts:add_comment', kwargs={'post_id': self.post.pk}),
+            {'text': 'Комментарий'},
+        )
+
+    def test_comments_are_throttled_without_posts_queries(self):
+        """Лишний комментарий получает 429, не трогая таблицы постов."""
+        for _ in range(2):
+            self.assertEqual(
+                self.comment(self.client).status_code, HTTPStatus.FOUND
+            )
+        with CaptureQueriesContext(connection) as queries:
+            response = self.comment(self.client)
+        self.assertEqual(response.status_code, HTTPStatus.TOO_MANY_REQUESTS)
+        self.assertEqual(response['Retry-After'], '30')
+        self.assertTemplateUsed(response, 'core/429.html')
+        for query in queries.captured_queries:
+            self.assertNotIn('posts_', query['sql'])
+        self.assertEqual(self.post.comments.count(), 2)
+
+    def test_buckets_are_per_user(self):
+        """У другого пользователя с другого адреса своя корзина."""
+        for _ in range(3):
+            self.comment(self.client)
+        other_client = Client(REMOTE_ADDR='10.0.0.2')
+        other_client.force_login(self.other)
+        self.assertEqual(
+            self.comment(other_client).status_code, HTTPStatus.FOUND
+        )
+
+    def test_accounts_share_ip_bucket(self):
+        """Аккаунты с одного IP-адреса делят его корзину."""
+        for _ in range(2):
+            self.comment(self.client)
+        other_client = Client()
+        other_client.force_login(self.other)
+        self.assertEqual(
+            self.comment(other_client).status_code,
+            HTTPStatus.TOO_MANY_REQUESTS,
+        )
+
+    def test_user_bucket_follows_account_across_ips(self):
+        """Смена IP-адреса не обнуляет корзину пользователя."""
+        for address in ('10.0.0.2', '10.0.0.3'):
+            self.client.defaults['REMOTE_ADDR'] = address
+            self.comment(self.client)
+        self.client.defaults['REMOTE_ADDR'] = '10.0.0.4'
+        self.assertEqual(
+            self.comment(self.client).status_code,
+            HTTPStatus.TOO_MANY_REQUESTS,
+        )
+
+    def test_other_methods_are_not_counted(self):
+        """Правило с METHODS не считает GET к тому же адресу."""
+        url = reverse('posts:add_comment', kwargs={'post_id': self.post.pk})
+        for _ in range(3):
+            self.client.get(url)
+        self.assertEqual(
+            self.comment(self.client).status_code, HTTPStatus.FOUND
+        )
+
+    def test_guests_are_limited_by_ip(self):
+        """Гости ограничиваются по IP-адресу."""
+        url = reverse('posts:profile_follow', kwargs={'username': 'writer'})
+        guest = Client()
+        self.assertEqual(guest.get(url).status_code, HTTPStatus.FOUND)
+        self.assertEqual(
+            guest.get(url).status_code, HTTPStatus.TOO_MANY_REQUESTS
+        )
+        self.assertEqual(
+            guest.get(url, REMOTE_ADDR='10.0.0.2').status_code,
+            HTTPStatus.FOUND,
+        )
+
+    def test_decorator_without_middleware(self):
+        """Декоратор списывает те же корзины, что и middleware."""
+        view = rate_limit('posts:profile_follow')(
+            lambda request: HttpResponse()
+        )
+        request = RequestFactory().get('/')
+        request.user = self.user
+        self.assertEqual(view(request).status_code, HTTPStatus.OK)
+        self.assertEqual(
+            view(request).status_code, HTTPStatus.TOO_MANY_REQUESTS
+        )
+        request.META['REMOTE_ADDR'] = '10.0.0.2'
+        self.assertEqual(
+            view(request).status_code, HTTPStatus.TOO_MANY_REQUESTS
+        )
+
+    def test_middleware_skips_decorated_view(self):
+        """Middleware не списывает токены второй раз."""
+        view = rate_limit('posts:profile_follow')(
+            lambda request: HttpResponse()
+        )
+        request = RequestFactory().get('/')
+        request.user = self.user
+        request.resolver_match = resolve(
+            reverse('posts:profile_follow', kwargs={'username': 'other'})
+        )
+        middleware = RateLimitMiddleware(view)
+        for _ in range(2):
+            self.assertIsNone(middleware.process_view(request, view, (), {}))
+        self.assertEqual(view(request).status_code, HTTPStatus.OK)
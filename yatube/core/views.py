@@ -1,3 +1,4 @@
+import math
 from http import HTTPStatus
 
 from django.shortcuts import render
@@ -34,3 +35,14 @@ def csrf_failure(request, reason=''):
         'core/403csrf.html',
         status=HTTPStatus.FORBIDDEN
     )
+
+
+def too_many_requests(request, retry_after):
+    response = render(
+        request,
+        'core/429.html',
+        {'retry_after': math.ceil(retry_after)},
+        status=HTTPStatus.TOO_MANY_REQUESTS
+    )
+    response['Retry-After'] = str(math.ceil(retry_after))
+    return response
@@ -1,6 +1,19 @@
 from django.contrib import admin
 
 from .models import Comment, Follow, Group, Post
+from .search import get_search_backend
+
+
+class IndexedSearchMixin:
+    """Поиск в админке через тот же индекс, что и на сайте."""
+
+    def get_search_results(self, request, queryset, search_term):
+        if not search_term:
+            return queryset, False
+        return (
+            get_search_backend().filter_queryset(queryset, search_term),
+            False,
+        )
 
 
 class GroupAdmin(admin.ModelAdmin):
@@ -15,7 +28,7 @@ class GroupAdmin(admin.ModelAdmin):
     empty_value_display = "-пусто-"
 
 
-class PostAdmin(admin.ModelAdmin):
+class PostAdmin(IndexedSearchMixin, admin.ModelAdmin):
     list_display = (
         "pk",
         "text",
@@ -29,7 +42,7 @@ class PostAdmin(admin.ModelAdmin):
     empty_value_display = "-пусто-"
 
 
-class CommentAdmin(admin.ModelAdmin):
+class CommentAdmin(IndexedSearchMixin, admin.ModelAdmin):
     list_display = (
         'pk',
         'post',
@@ -0,0 +1,165 @@
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.files.storage import default_storage
+from django.http import JsonResponse
+from django.views.decorators.http import require_safe
+
+from .conditional import (
+    conditional_feed,
+    group_validators,
+    index_validators,
+    post_validators,
+    profile_validators,
+)
+from .models import Comment, Group, Post
+from .utils import CursorPaginator
+from .views import (
+    FOLLOW_CURSOR_KEY,
+    follow_feed,
+    group_feed,
+    index_feed,
+    profile_feed,
+)
+
+User = get_user_model()
+
+# Имя поля в ответе -> путь для values().
+POST_FIELDS = {
+    'id': 'pk',
+    'text': 'text',
+    'pub_date': 'pub_date',
+    'author': 'author__username',
+    'group': 'group__slug',
+    'image': 'image',
+    'comments_count': 'comments_count',
+}
+COMMENT_FIELDS = {
+    'id': 'pk',
+    'post': 'post_id',
+    'author': 'author__username',
+    'text': 'text',
+    'created': 'created',
+}
+
+
+def _error(message, status):
+    return JsonResponse({'error': message}, status=status)
+
+
+def parse_fields(request, available):
+    """Разбирает ?fields=a,b; без параметра отдаются все поля.
+
+    Бросает ValueError, если запрошено неизвестное поле.
+    """
+    value = request.GET.get('fields')
+    if not value:
+        return list(available)
+    fields = list(dict.fromkeys(
+        name.strip() for name in value.split(',') if name.strip()
+    ))
+    unknown = [name for name in fields if name not in available]
+    if unknown or not fields:
+        raise ValueError(
+            f'неизвестные поля: {", ".join(unknown)}; '
+            f'доступны: {", ".join(available)}'
+        )
+    return fields
+
+
+def serialize(row, fields, available):
+    """Собирает объект ответа из строки values()."""
+    item = {name: row[available[name]] for name in fields}
+    if item.get('image'):
+        item['image'] = default_storage.url(item['image'])
+    elif 'image' in item:
+        item['image'] = None
+    return item
+
+
+def feed_response(
+    request, queryset, available=POST_FIELDS, key=('pub_date', 'pk'),
+    per_page=None,
+):
+    """Отдаёт страницу ленты в JSON, выбранную по курсору.
+
+    В values() попадают только запрошенные поля и поля ключа курсора,
+    поэтому запрос не тянет лишние колонки и не создаёт модели.
+    """
+    try:
+        fields = parse_fields(request, available)
+    except ValueError as error:
+        return _error(str(error), 400)
+    lookups = dict.fromkeys([*(available[name] for name in fields), *key])
+    paginator = CursorPaginator(
+        queryset.values(*lookups),
+        per_page or settings.POST_COUNT,
+        key=key,
+    )
+    page = paginator.cursor_page(request.GET.get('cursor'))
+    return JsonResponse({
+        'results': [serialize(row, fields, available) for row in page],
+        'next': page.next_cursor,
+        'previous': page.previous_cursor,
+    })
+
+
+@require_safe
+@conditional_feed(index_validators)
+def index(request):
+    return feed_response(request, index_feed())
+
+
+@require_safe
+@conditional_feed(group_validators)
+def group_posts(request, slug):
+    group = Group.objects.filter(slug=slug).first()
+    if group is None:
+        return _error('группа не найдена', 404)
+    return feed_response(request, group_feed(group))
+
+
+@require_safe
+@conditional_feed(profile_validators)
+def profile(request, username):
+    author = User.objects.filter(username=username).first()
+    if author is None:
+        return _error('автор не найден', 404)
+    return feed_response(request, profile_feed(author))
+
+
+@require_safe
+def follow_index(request):
+    if not request.user.is_authenticated:
+        return _error('нужна авторизация', 401)
+    return feed_response(
+        request, follow_feed(request.user), key=FOLLOW_CURSOR_KEY
+    )
+
+
+@require_safe
+@conditional_feed(post_validators)
+def post_detail(request, post_id):
+    try:
+        fields = parse_fields(request, POST_FIELDS)
+    except ValueError as error:
+        return _error(str(error), 400)
+    row = Post.objects.filter(pk=post_id).values(
+        *{POST_FIELDS[name] for name in fields}
+    ).first()
+    if row is None:
+        return _error('пост не найден', 404)
+    return JsonResponse(serialize(row, fields, POST_FIELDS))
+
+
+@require_safe
+@conditional_feed(post_validators)
+def post_comments(request, post_id):
+    if not Post.objects.filter(pk=post_id).exists():
+        return _error('пост не найден', 404)
+    return feed_response(
+        request,
+        Comment.objects.filter(post_id=post_id),
+        available=COMMENT_FIELDS,
+        key=('created', 'pk'),
+        per_page=settings.COMMENT_COUNT,
+    )
@@ -0,0 +1,270 @@
+import json
+import random
+import time
+import tracemalloc
+import uuid
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import connection, reset_queries, transaction
+from django.db.models import Max
+from django.test import Client
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.urls import reverse
+
+from . import urls as posts_urls
+from .counters import (
+    reconcile_counters,
+    reconcile_group_stats,
+    reconcile_post_comments,
+)
+from .feed_cache import invalidate_feeds
+from .models import Comment, FeedEntry, Follow, Group, Post
+from .recommendations import build_suggestions
+from .search import get_search_backend
+from .trending import update_trending
+
+User = get_user_model()
+
+BATCH_SIZE = 5000
+
+# Адреса, которые пишут в базу; бенчмарк их не запрашивает.
+WRITE_URLS = {
+    'post_create',
+    'post_edit',
+    'add_comment',
+    'import_posts',
+    'profile_follow',
+    'profile_unfollow',
+}
+
+# Все адреса, которые бенчмарк не запрашивает, с причиной.
+SKIPPED_URLS = {
+    **dict.fromkeys(WRITE_URLS, 'пишет в базу'),
+    # Тестовый клиент не читает потоковый ответ, а прочитать его —
+    # значит выгрузить таблицу целиком; для этого есть export_data.
+    'export': 'потоковая выгрузка только для staff, см. export_data',
+}
+
+
+def _max_pk(model):
+    return model.objects.aggregate(max_pk=Max('pk'))['max_pk'] or 0
+
+
+def _bulk_insert(model, objects, batch_size=BATCH_SIZE, **kwargs):
+    """Вставляет объекты из генератора пачками, не держа всё в памяти."""
+    batch = []
+    for obj in objects:
+        batch.append(obj)
+        if len(batch) >= batch_size:
+            model.objects.bulk_create(batch, **kwargs)
+            batch = []
+    if batch:
+        model.objects.bulk_create(batch, **kwargs)
+
+
+def seed(users, posts, comments, follows, groups, stdout=None):
+    """Наполняет базу синтетическими данными для замеров.
+
+    Строки вставляются через bulk_create, поэтому сигналы не срабатывают:
+    ленты подписок заполняются одним INSERT ... SELECT, а счётчики,
+    поисковый индекс и поколение лент пересчитываются целиком.
+    """
+    prefix = f'bench{int(time.time())}'
+    with transaction.atomic():
+        first_user = _max_pk(User) + 1
+        _bulk_insert(User, (
+            User(username=f'{prefix}_user_{i}', password='!')
+            for i in range(users)
+        ))
+        user_ids = range(first_user, _max_pk(User) + 1)
+        first_group = _max_pk(Group) + 1
+        _bulk_insert(Group, (
+            Group(title=f'Группа {i}', slug=f'{prefix}-group-{i}')
+            for i in range(groups)
+        ))
+        group_ids = range(first_group, _max_pk(Group) + 1)
+        first_post = _max_pk(Post) + 1
+        _bulk_insert(Post, (
+            Post(
+                text=f'Пост {i}',
+                author_id=random.choice(user_ids),
+                group_id=random.choice(group_ids) if group_ids else None,
+            )
+            for i in range(posts)
+        ))
+        post_ids = range(first_post, _max_pk(Post) + 1)
+        _bulk_insert(Comment, (
+            Comment(
+                text=f'Комментарий {i}',
+                post_id=random.choice(post_ids),
+                author_id=random.choice(user_ids),
+            )
+            for i in range(comments if post_ids else 0)
+        ))
+        _bulk_insert(Follow, (
+            Follow(user_id=user_id, author_id=author_id)
+            for user_id, author_id in (
+                random.sample(user_ids, 2) for _ in range(follows)
+            )
+        ), ignore_conflicts=True)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'INSERT INTO {FeedEntry._meta.db_table} '
+                '(user_id, post_id, pub_date) '
+                'SELECT f.user_id, p.id, p.pub_date '
+                f'FROM {Follow._meta.db_table} f '
+                f'INNER JOIN {Post._meta.db_table} p '
+                'ON p.author_id = f.author_id '
+                'WHERE f.user_id >= %s',
+                [first_user],
+            )
+    reconcile_counters()
+    reconcile_group_stats()
+    reconcile_post_comments()
+    update_trending()
+    build_suggestions()
+    get_search_backend().rebuild()
+    invalidate_feeds()
+    if stdout is not None:
+        stdout.write(
+            f'Создано: пользователей {len(user_ids)}, постов {len(post_ids)}'
+        )
+
+
+def _sample_kwargs():
+    """Подбирает значения для параметров всех адресов posts.urls.
+
+    Если примера нет, например ни в одной группе нет постов, значение
+    параметра — None.
+    """
+    follow = Follow.objects.select_related(
+        'user', 'author'
+    ).order_by('pk').first()
+    post = Post.objects.select_related('author').order_by('pk').first()
+    author = follow.author if follow else post.author
+    reader = follow.user if follow else author
+    group = Group.objects.filter(posts__isnull=False).order_by('pk').first()
+    return reader, {
+        'slug': group.slug if group else None,
+        'username': author.username,
+        'post_id': post.pk,
+        'model': 'post',
+    }
+
+
+def _percentile(values, percent):
+    values = sorted(values)
+    index = min(len(values) - 1, round(percent / 100 * (len(values) - 1)))
+    return values[index]
+
+
+def _isolated_caches():
+    """CACHES с пустым пространством ключей для одного замера.
+
+    Бэкенд тот же, что у сервера, но со своим KEY_PREFIX: замер
+    начинается с холодного кеша, не очищая общий.
+    """
+    default = settings.CACHES['default']
+    prefix = f'{default.get("KEY_PREFIX", "")}benchmark:{uuid.uuid4().hex}'
+    return {**settings.CACHES, 'default': {**default, 'KEY_PREFIX': prefix}}
+
+
+def measure(client, url, repeat):
+    """Замеряет число запросов, задержку и пиковую память адреса.
+
+    Память и запросы снимаются отдельным прогоном с пустым кешем:
+    так число запросов не зависит от прошлых прогонов, а tracemalloc
+    и запись SQL не искажают замер задержки.
+    """
+    with override_settings(CACHES=_isolated_caches()):
+        return _measure(client, url, repeat)
+
+
+def _measure(client, url, repeat):
+    reset_queries()
+    tracemalloc.start()
+    with CaptureQueriesContext(connection) as queries:
+        response = client.get(url)
+    queries_count = len(queries)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        client.get(url)
+        timings.append((time.perf_counter() - started) * 1000)
+    return {
+        'url': url,
+        'status': response.status_code,
+        'queries': queries_count,
+        'p50_ms': round(_percentile(timings, 50), 2),
+        'p95_ms': round(_percentile(timings, 95), 2),
+        'peak_kb': round(peak / 1024, 1),
+    }
+
+
+def run(repeat):
+    """Проходит GET-запросами по адресам posts.urls от имени подписчика.
+
+    Возвращает замеры и пропущенные адреса с причиной. Адреса
+    из SKIPPED_URLS не запрашиваются, поэтому прогон ничего не меняет
+    в базе и повторные прогоны дают сравнимые цифры; адреса, для
+    параметров которых в базе нет примера, тоже пропускаются.
+    """
+    reader, kwargs = _sample_kwargs()
+    client = Client()
+    client.force_login(reader)
+    results = {}
+    skipped = {}
+    for pattern in posts_urls.urlpatterns:
+        if pattern.name in SKIPPED_URLS:
+            skipped[pattern.name] = SKIPPED_URLS[pattern.name]
+            continue
+        values = {key: kwargs[key] for key in pattern.pattern.converters}
+        missing = [key for key, value in values.items() if value is None]
+        if missing:
+            skipped[pattern.name] = f'нет примера для {", ".join(missing)}'
+            continue
+        name = f'{posts_urls.app_name}:{pattern.name}'
+        url = reverse(name, kwargs=values)
+        results[pattern.name] = measure(client, url, repeat)
+        if pattern.name in (
+            'index', 'group_list', 'profile', 'follow_index'
+        ):
+            results[f'{pattern.name}_cursor'] = measure(
+                client, f'{url}?cursor=', repeat
+            )
+    return results, skipped
+
+
+def compare(results, baseline, tolerance):
+    """Возвращает список регрессий относительно сохранённой базы."""
+    regressions = []
+    for name, current in results.items():
+        previous = baseline.get(name)
+        if previous is None:
+            continue
+        if current['queries'] > previous['queries']:
+            regressions.append(
+                f'{name}: запросов {current["queries"]} '
+                f'вместо {previous["queries"]}'
+            )
+        for metric in ('p95_ms', 'peak_kb'):
+            limit = previous[metric] * (1 + tolerance)
+            if current[metric] > limit:
+                regressions.append(
+                    f'{name}: {metric} {current[metric]} '
+                    f'больше допустимых {limit:.1f}'
+                )
+    return regressions
+
+
+def load_baseline(path):
+    with open(path, encoding='utf-8') as file:
+        return json.load(file)
+
+
+def dump_results(results, path):
+    with open(path, 'w', encoding='utf-8') as file:
+        json.dump(results, file, ensure_ascii=False, indent=2)
@@ -0,0 +1,124 @@
+import hashlib
+from datetime import datetime, timezone
+from functools import wraps
+
+from django.contrib.auth import get_user_model
+from django.db.models import Max, OuterRef, Subquery
+from django.utils.cache import patch_cache_control
+from django.views.decorators.http import condition
+
+from .feed_cache import feed_version
+from .models import Comment, Group, GroupStats, Post
+
+User = get_user_model()
+
+
+def index_validators():
+    return [None], Post.objects.aggregate(last=Max('pub_date'))['last']
+
+
+def group_index_validators():
+    return ['groups'], GroupStats.objects.aggregate(
+        last=Max('last_post_date')
+    )['last']
+
+
+def trending_validators():
+    return [None, 'trending'], None
+
+
+def _latest(queryset, field):
+    """Подзапрос даты последней записи, идущий по индексу с LIMIT 1."""
+    return Subquery(
+        queryset.order_by(f'-{field}').values(field)[:1]
+    )
+
+
+def group_validators(slug):
+    group = Group.objects.filter(slug=slug).annotate(last=_latest(
+        Post.objects.filter(group=OuterRef('pk')), 'pub_date'
+    )).values_list('pk', 'last').first()
+    if group is None:
+        return None
+    group_id, last = group
+    return [f'group:{group_id}'], last
+
+
+def profile_validators(username):
+    author = User.objects.filter(username=username).annotate(last=_latest(
+        Post.objects.filter(author=OuterRef('pk')), 'pub_date'
+    )).values_list('pk', 'last').first()
+    if author is None:
+        return None
+    author_id, last = author
+    return [f'profile:{author_id}', 'suggestions'], last
+
+
+def post_validators(post_id):
+    post = Post.objects.filter(pk=post_id).annotate(last=_latest(
+        Comment.objects.filter(post=OuterRef('pk')), 'created'
+    )).values_list('author_id', 'pub_date', 'last').first()
+    if post is None:
+        return None
+    author_id, pub_date, last = post
+    return (
+        [f'post:{post_id}', f'profile:{author_id}'],
+        max(pub_date, last) if last else pub_date,
+    )
+
+
+def _validators(request, lookup, kwargs):
+    """Считает ETag и Last-Modified один раз на запрос.
+
+    ETag складывается из поколений областей страницы, даты последней
+    записи, пользователя и параметров адреса. Дата из базы ловит и
+    изменения в обход сигналов, например bulk_create.
+    """
+    if not hasattr(request, '_feed_validators'):
+        found = lookup(**kwargs)
+        if found is None:
+            request._feed_validators = (None, None)
+            return request._feed_validators
+        scopes, last = found
+        versions = [feed_version(scope) for scope in scopes]
+        changed = datetime.fromtimestamp(
+            max(versions) / 10 ** 9, tz=timezone.utc
+        )
+        parts = [
+            *map(str, versions),
+            last.isoformat() if last else '',
+            str(request.user.pk),
+            request.get_full_path(),
+        ]
+        request._feed_validators = (
+            hashlib.md5('|'.join(parts).encode()).hexdigest(),
+            max(changed, last) if last else changed,
+        )
+    return request._feed_validators
+
+
+def conditional_feed(lookup):
+    """Отвечает 304 на неизменившуюся страницу, не вызывая view.
+
+    lookup получает аргументы адреса и возвращает области страницы
+    и дату последней записи или None, если объекта нет.
+    Cache-Control: private, no-cache заставляет браузер каждый раз
+    переспрашивать сервер, а не показывать страницу по эвристике.
+    """
+    def decorator(view):
+        conditional_view = condition(
+            etag_func=lambda request, **kwargs: _validators(
+                request, lookup, kwargs
+            )[0],
+            last_modified_func=lambda request, **kwargs: _validators(
+                request, lookup, kwargs
+            )[1],
+        )(view)
+
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            response = conditional_view(request, *args, **kwargs)
+            patch_cache_control(response, private=True, no_cache=True)
+            return response
+        return wrapper
+    return decorator
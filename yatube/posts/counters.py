@@ -0,0 +1,313 @@
+from django.contrib.auth import get_user_model
+from django.db.models import (
+    Count,
+    DateTimeField,
+    F,
+    Max,
+    OuterRef,
+    Subquery,
+    Value,
+)
+from django.db.models.functions import Coalesce, Greatest
+from django.utils.text import Truncator
+
+from core.db import retry_on_busy
+
+from .models import (
+    COMMENT_SUMMARY_FIELDS,
+    LAST_COMMENT_LENGTH,
+    Comment,
+    Follow,
+    Group,
+    GroupAuthor,
+    GroupStats,
+    Post,
+    UserCounters,
+)
+
+User = get_user_model()
+
+COUNTER_FIELDS = (
+    'posts_count',
+    'comments_count',
+    'followers_count',
+    'following_count',
+)
+
+
+def bump_counters(user_id, **deltas):
+    """Атомарно меняет счётчики пользователя на заданные величины.
+
+    Если строки счётчиков ещё нет, ничего не делает: она будет
+    посчитана с нуля при первом чтении в get_counters. Разошедшийся
+    счётчик не уходит ниже нуля, его исправит reconcile_counters.
+    """
+    if user_id is None:
+        return
+    UserCounters.objects.filter(user_id=user_id).update(**{
+        field: Greatest(F(field) + delta, 0)
+        for field, delta in deltas.items()
+    })
+
+
+def count_user(user_id):
+    """Считает значения счётчиков пользователя по исходным таблицам."""
+    return {
+        'posts_count': Post.objects.filter(author_id=user_id).count(),
+        'comments_count': Comment.objects.filter(author_id=user_id).count(),
+        'followers_count': Follow.objects.filter(author_id=user_id).count(),
+        'following_count': Follow.objects.filter(user_id=user_id).count(),
+    }
+
+
+def get_counters(user):
+    """Возвращает счётчики пользователя, создавая их при первом обращении."""
+    try:
+        return user.counters
+    except UserCounters.DoesNotExist:
+        counters, _ = UserCounters.objects.get_or_create(
+            user=user,
+            defaults=count_user(user.pk),
+        )
+        return counters
+
+
+def _grouped_count(queryset, field):
+    return dict(
+        queryset.order_by().values_list(field).annotate(total=Count('pk'))
+    )
+
+
+def reconcile_counters(batch_size=1000):
+    """Сверяет все счётчики с исходными таблицами и исправляет расхождения.
+
+    Возвращает количество созданных или исправленных строк.
+    """
+    totals = {
+        'posts_count': _grouped_count(Post.objects, 'author'),
+        'comments_count': _grouped_count(Comment.objects, 'author'),
+        'followers_count': _grouped_count(Follow.objects, 'author'),
+        'following_count': _grouped_count(Follow.objects, 'user'),
+    }
+    existing = {
+        counters.user_id: counters
+        for counters in UserCounters.objects.iterator()
+    }
+    to_create = []
+    to_update = []
+    for user_id in User.objects.values_list('pk', flat=True).iterator():
+        actual = {
+            field: totals[field].get(user_id, 0) for field in COUNTER_FIELDS
+        }
+        counters = existing.get(user_id)
+        if counters is None:
+            to_create.append(UserCounters(user_id=user_id, **actual))
+            continue
+        if any(
+            getattr(counters, field) != value
+            for field, value in actual.items()
+        ):
+            for field, value in actual.items():
+                setattr(counters, field, value)
+            to_update.append(counters)
+    UserCounters.objects.bulk_create(
+        to_create, batch_size=batch_size, ignore_conflicts=True
+    )
+    UserCounters.objects.bulk_update(
+        to_update, COUNTER_FIELDS, batch_size=batch_size
+    )
+    return len(to_create) + len(to_update)
+
+
+def _update_group_stats(group_id, **fields):
+    GroupStats.objects.filter(group_id=group_id).update(
+        authors_count=GroupAuthor.objects.filter(group_id=group_id).count(),
+        **fields,
+    )
+
+
+def add_group_posts(group_id, author_id, count, last_date):
+    """Учитывает в сводке группы новые посты автора.
+
+    Число авторов пересчитывается по GroupAuthor, где на группу
+    приходится по строке на автора, а не по всем постам группы.
+    """
+    if group_id is None:
+        return
+    updated = GroupAuthor.objects.filter(
+        group_id=group_id, author_id=author_id
+    ).update(posts_count=F('posts_count') + count)
+    if not updated:
+        GroupAuthor.objects.bulk_create([GroupAuthor(
+            group_id=group_id, author_id=author_id, posts_count=count
+        )], ignore_conflicts=True)
+    last_date = Value(last_date, output_field=DateTimeField())
+    _update_group_stats(
+        group_id,
+        posts_count=F('posts_count') + count,
+        last_post_date=Greatest(
+            Coalesce('last_post_date', last_date), last_date
+        ),
+    )
+
+
+def remove_group_post(group_id, author_id):
+    """Убирает из сводки группы удалённый или перенесённый пост."""
+    if group_id is None:
+        return
+    authors = GroupAuthor.objects.filter(
+        group_id=group_id, author_id=author_id
+    )
+    authors.filter(posts_count__gt=0).update(
+        posts_count=F('posts_count') - 1
+    )
+    authors.filter(posts_count=0).delete()
+    _update_group_stats(
+        group_id,
+        posts_count=Greatest(F('posts_count') - 1, 0),
+        last_post_date=Subquery(Post.objects.filter(
+            group_id=group_id
+        ).order_by('-pub_date').values('pub_date')[:1]),
+    )
+
+
+@retry_on_busy
+def reconcile_group_stats(batch_size=1000):
+    """Пересчитывает сводки всех групп по таблице постов.
+
+    GroupAuthor удаляются и собираются заново в одной транзакции,
+    поэтому читатели каталога не видят пустых сводок, а сбой
+    посередине откатывает пересчёт целиком. Возвращает количество
+    созданных или исправленных сводок.
+    """
+    posts = Post.objects.filter(group__isnull=False).order_by()
+    GroupAuthor.objects.all().delete()
+    GroupAuthor.objects.bulk_create(
+        (
+            GroupAuthor(group_id=group_id, author_id=author_id,
+                        posts_count=count)
+            for group_id, author_id, count in posts.values_list(
+                'group', 'author'
+            ).annotate(count=Count('pk')).iterator()
+        ),
+        batch_size=batch_size,
+    )
+    totals = {
+        row.pop('group'): row for row in posts.values('group').annotate(
+            posts_count=Count('pk'),
+            authors_count=Count('author', distinct=True),
+            last_post_date=Max('pub_date'),
+        )
+    }
+    empty = {'posts_count': 0, 'authors_count': 0, 'last_post_date': None}
+    existing = {stats.group_id: stats for stats in GroupStats.objects.all()}
+    to_create = []
+    to_update = []
+    for group_id in Group.objects.values_list('pk', flat=True).iterator():
+        actual = totals.get(group_id, empty)
+        stats = existing.get(group_id)
+        if stats is None:
+            to_create.append(GroupStats(group_id=group_id, **actual))
+        elif any(
+            getattr(stats, field) != value for field, value in actual.items()
+        ):
+            for field, value in actual.items():
+                setattr(stats, field, value)
+            to_update.append(stats)
+    GroupStats.objects.bulk_create(
+        to_create, batch_size=batch_size, ignore_conflicts=True
+    )
+    GroupStats.objects.bulk_update(
+        to_update, list(empty), batch_size=batch_size
+    )
+    return len(to_create) + len(to_update)
+
+
+def truncate_comment_text(text):
+    """Начало комментария для сводки поста, с многоточием при обрезке."""
+    return Truncator(text).chars(LAST_COMMENT_LENGTH)
+
+
+def comment_summary(comment):
+    """Поля сводки поста, в которой comment — последний комментарий."""
+    if comment is None:
+        return {
+            'last_comment_text': '',
+            'last_comment_author': '',
+            'last_comment_date': None,
+        }
+    return {
+        'last_comment_text': truncate_comment_text(comment.text),
+        'last_comment_author': comment.author.username,
+        'last_comment_date': comment.created,
+    }
+
+
+def add_post_comment(comment):
+    """Учитывает новый комментарий в сводке поста одним UPDATE."""
+    Post.objects.filter(pk=comment.post_id).update(
+        comments_count=F('comments_count') + 1,
+        **comment_summary(comment),
+    )
+
+
+def refresh_post_comments(post_id, delta=0):
+    """Меняет число комментариев и берёт последний заново.
+
+    Нужен после удаления или правки комментария, когда показанный
+    в сводке комментарий мог исчезнуть или измениться.
+    """
+    latest = Comment.objects.filter(post_id=post_id).select_related(
+        'author'
+    ).order_by('-created', '-pk').first()
+    Post.objects.filter(pk=post_id).update(
+        comments_count=Greatest(F('comments_count') + delta, 0),
+        **comment_summary(latest),
+    )
+
+
+def reconcile_post_comments(batch_size=1000):
+    """Сверяет сводки комментариев постов с таблицей комментариев.
+
+    Возвращает количество исправленных постов.
+    """
+    comments = Comment.objects.filter(post=OuterRef('pk'))
+    latest = comments.order_by('-created', '-pk').values('pk')[:1]
+    posts = Post.objects.order_by().annotate(
+        actual_count=Coalesce(Subquery(
+            comments.order_by().values('post').annotate(
+                count=Count('pk')
+            ).values('count')
+        ), 0),
+        latest_id=Subquery(latest),
+    ).only('pk', *COMMENT_SUMMARY_FIELDS)
+    to_update = []
+    pending = []
+
+    def check(batch):
+        found = Comment.objects.select_related('author').in_bulk(
+            [post.latest_id for post in batch if post.latest_id]
+        )
+        for post in batch:
+            actual = {
+                'comments_count': post.actual_count,
+                **comment_summary(found.get(post.latest_id)),
+            }
+            if any(
+                getattr(post, field) != value
+                for field, value in actual.items()
+            ):
+                for field, value in actual.items():
+                    setattr(post, field, value)
+                to_update.append(post)
+
+    for post in posts.iterator():
+        pending.append(post)
+        if len(pending) == batch_size:
+            check(pending)
+            pending = []
+    check(pending)
+    Post.objects.bulk_update(
+        to_update, COMMENT_SUMMARY_FIELDS, batch_size=batch_size
+    )
+    return len(to_update)
@@ -0,0 +1,60 @@
+import csv
+import json
+
+from django.core.serializers.json import DjangoJSONEncoder
+
+from .models import Comment, Follow, Group, Post
+
+EXPORT_FORMATS = ('ndjson', 'csv')
+
+EXPORT_MODELS = {
+    'post': (
+        Post, ('id', 'text', 'pub_date', 'author_id', 'group_id', 'image')
+    ),
+    'comment': (
+        Comment, ('id', 'post_id', 'author_id', 'text', 'created')
+    ),
+    'follow': (Follow, ('id', 'user_id', 'author_id')),
+    'group': (Group, ('id', 'title', 'slug', 'description')),
+}
+
+
+class Echo:
+    """Файлоподобный объект, который отдаёт записанное вместо хранения."""
+
+    def write(self, value):
+        return value
+
+
+def export_rows(name, after=None, chunk_size=2000):
+    """Возвращает строки модели по возрастанию id в виде кортежей.
+
+    Записи читаются итератором пачками по chunk_size без кеша
+    queryset. С after выгрузка продолжается с id больше переданного.
+    """
+    model, fields = EXPORT_MODELS[name]
+    queryset = model.objects.order_by('pk')
+    if after is not None:
+        queryset = queryset.filter(pk__gt=after)
+    return queryset.values_list(*fields).iterator(chunk_size=chunk_size)
+
+
+def export_lines(name, export_format, after=None, chunk_size=2000):
+    """Выдаёт выгрузку модели построчно в формате NDJSON или CSV.
+
+    CSV начинается со строки заголовков, кроме продолжения выгрузки,
+    которое нужно запрашивать с id последней полученной записи.
+    """
+    _, fields = EXPORT_MODELS[name]
+    rows = export_rows(name, after=after, chunk_size=chunk_size)
+    if export_format == 'csv':
+        writer = csv.writer(Echo())
+        if after is None:
+            yield writer.writerow(fields)
+        for row in rows:
+            yield writer.writerow(row)
+        return
+    for row in rows:
+        yield json.dumps(
+            dict(zip(fields, row)), cls=DjangoJSONEncoder, ensure_ascii=False
+        ) + '\n'
@@ -0,0 +1,44 @@
+import time
+
+from django.core.cache import cache
+
+FEED_VERSION_KEY = 'posts:feed_version'
+
+
+def _version_key(scope):
+    if scope is None:
+        return FEED_VERSION_KEY
+    return f'{FEED_VERSION_KEY}:{scope}'
+
+
+def _new_version():
+    return time.time_ns()
+
+
+def feed_version(scope=None):
+    """Текущее поколение кеша лент, входит в ключи фрагментов и ETag.
+
+    Без scope это общее поколение всех лент, а scope вида
+    ``group:<id>``, ``profile:<id>`` или ``post:<id>`` сужает его
+    до одной страницы. Поколение — момент последнего изменения
+    в наносекундах, поэтому вытесненный ключ не вернёт старое
+    значение.
+    """
+    return cache.get_or_set(_version_key(scope), _new_version, None)
+
+
+def bump_scopes(*scopes):
+    """Меняет поколение перечисленных областей, не трогая общее."""
+    version = _new_version()
+    cache.set_many({
+        _version_key(scope): version for scope in scopes
+    }, None)
+
+
+def invalidate_feeds(*scopes):
+    """Сбрасывает закешированные фрагменты лент сменой поколения.
+
+    Старые ключи не удаляются, а просто перестают запрашиваться
+    и вытесняются бэкендом кеша по TTL.
+    """
+    bump_scopes(None, *scopes)
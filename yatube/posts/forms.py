@@ -1,4 +1,6 @@
 from django import forms
+from django.conf import settings
+from django.template.defaultfilters import filesizeformat
 
 from .models import Comment, Post
 
@@ -13,6 +15,15 @@ class PostForm(forms.ModelForm):
             'group': 'Группа, к которой будет относиться пост',
         }
 
+    def clean_image(self):
+        image = self.cleaned_data.get('image')
+        limit = settings.POST_IMAGE_MAX_UPLOAD_SIZE
+        if image and image.size > limit:
+            raise forms.ValidationError(
+                f'Картинка больше {filesizeformat(limit)}'
+            )
+        return image
+
 
 class CommentForm(forms.ModelForm):
     class Meta:
@@ -0,0 +1,58 @@
+import os
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from PIL import Image, ImageOps, features
+
+EXTENSIONS = {'WEBP': '.webp', 'JPEG': '.jpg'}
+
+
+def _target_format():
+    image_format = settings.POST_IMAGE_PROCESSING['FORMAT']
+    if image_format == 'WEBP' and not features.check('webp'):
+        return 'JPEG'
+    return image_format
+
+
+def encode_image(image, image_format):
+    """Кодирует картинку без EXIF, ICC и прочих метаданных."""
+    options = settings.POST_IMAGE_PROCESSING
+    buffer = BytesIO()
+    if image_format == 'JPEG':
+        if image.mode != 'RGB':
+            image = image.convert('RGB')
+        image.save(
+            buffer, 'JPEG', quality=options['QUALITY'],
+            optimize=True, progressive=True,
+        )
+    else:
+        if image.mode not in ('RGB', 'RGBA'):
+            image = image.convert('RGBA' if 'A' in image.getbands() else 'RGB')
+        image.save(buffer, image_format, quality=options['QUALITY'], method=4)
+    return buffer.getvalue()
+
+
+def process_image(name):
+    """Пережимает загруженную картинку поста в хранилище.
+
+    Картинка поворачивается по EXIF, уменьшается до MAX_SIZE
+    и сохраняется в FORMAT без метаданных рядом с оригиналом.
+    Возвращает имя нового файла или None, если формат из SKIP_FORMATS
+    (анимированный GIF при пережатии потерял бы кадры).
+    """
+    options = settings.POST_IMAGE_PROCESSING
+    with default_storage.open(name) as file:
+        image = Image.open(file)
+        if image.format in options['SKIP_FORMATS']:
+            return None
+        # JPEG декодируется сразу в уменьшенном масштабе.
+        image.draft('RGB', options['MAX_SIZE'])
+        image = ImageOps.exif_transpose(image)
+        image.thumbnail(options['MAX_SIZE'], Image.LANCZOS)
+    image_format = _target_format()
+    return default_storage.save(
+        os.path.splitext(name)[0] + EXTENSIONS[image_format],
+        ContentFile(encode_image(image, image_format)),
+    )
@@ -0,0 +1,234 @@
+import json
+import time
+from collections import Counter
+
+from django.contrib.auth import get_user_model
+from django.db import connection, transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .counters import add_group_posts, bump_counters
+from .feed_cache import invalidate_feeds
+from .models import FeedEntry, Follow, Group, Post
+from .search import get_search_backend
+from .thumbnails import schedule_thumbnails, wait_for_thumbnails
+
+User = get_user_model()
+
+MAX_ERRORS = 20
+AUTHOR_CACHE_SIZE = 100000
+
+
+def parse_ndjson(lines):
+    """Разбирает NDJSON построчно, не читая вход целиком.
+
+    Выдаёт пары (номер строки, объект); для битой строки вместо
+    объекта приходит текст ошибки. Пустые строки пропускаются.
+    """
+    for number, line in enumerate(lines, start=1):
+        if isinstance(line, bytes):
+            line = line.decode('utf-8')
+        if not line.strip():
+            continue
+        try:
+            yield number, json.loads(line)
+        except ValueError as error:
+            yield number, f'некорректный JSON: {error}'
+
+
+class ImportReport:
+    """Итоги импорта: сколько строк прочитано, загружено и отклонено."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.read = 0
+        self.imported = 0
+        self.skipped = 0
+        self.images = 0
+        self.errors = []
+
+    def reject(self, number, message):
+        self.skipped += 1
+        if len(self.errors) < MAX_ERRORS:
+            self.errors.append(f'строка {number}: {message}')
+
+    @property
+    def seconds(self):
+        return time.perf_counter() - self.started
+
+    @property
+    def rate(self):
+        return self.imported / self.seconds if self.seconds else 0
+
+    def as_dict(self):
+        return {
+            'read': self.read,
+            'imported': self.imported,
+            'skipped': self.skipped,
+            'images': self.images,
+            'seconds': round(self.seconds, 2),
+            'posts_per_second': round(self.rate, 1),
+            'errors': self.errors,
+        }
+
+
+def check_string_fields(row, fields):
+    """Бросает ValueError, если значение поля не строка и не null."""
+    for field in fields:
+        if not isinstance(row.get(field), (str, type(None))):
+            raise ValueError(f'поле {field} должно быть строкой')
+
+
+class PostImporter:
+    """Загружает посты пачками через bulk_create.
+
+    Строка входа — объект с полями ``text``, ``author`` (username),
+    необязательными ``group`` (slug), ``pub_date`` (ISO 8601)
+    и ``image`` (имя уже загруженного в хранилище файла).
+    bulk_create не вызывает сигналы, поэтому ленты подписчиков,
+    счётчики, поисковый индекс и поколения кеша обновляются
+    для каждой пачки целиком. Миниатюры пачки считаются в фоновом
+    пуле, пока разбирается следующая.
+    """
+
+    def __init__(self, batch_size=1000, process_images=True, progress=None):
+        self.batch_size = batch_size
+        self.process_images = process_images
+        self.progress = progress
+        self.groups = dict(Group.objects.values_list('slug', 'pk'))
+        self.authors = {}
+
+    def run(self, lines):
+        report = ImportReport()
+        batch = []
+        for number, row in parse_ndjson(lines):
+            report.read += 1
+            batch.append((number, row))
+            if len(batch) >= self.batch_size:
+                self.import_batch(batch, report)
+                batch = []
+        if batch:
+            self.import_batch(batch, report)
+        if self.process_images:
+            wait_for_thumbnails()
+        return report
+
+    def _resolve_authors(self, rows):
+        usernames = {
+            row['author'] for _, row in rows
+            if isinstance(row, dict) and isinstance(row.get('author'), str)
+        } - self.authors.keys()
+        if not usernames:
+            return
+        if len(self.authors) + len(usernames) > AUTHOR_CACHE_SIZE:
+            self.authors.clear()
+        self.authors.update(
+            User.objects.filter(
+                username__in=usernames
+            ).values_list('username', 'pk')
+        )
+
+    def build_post(self, row):
+        """Собирает несохранённый пост или бросает ValueError."""
+        if not isinstance(row, dict):
+            raise ValueError(row)
+        text = row.get('text')
+        if not isinstance(text, str) or not text.strip():
+            raise ValueError('нет текста поста')
+        check_string_fields(row, ('author', 'group', 'image'))
+        author_id = self.authors.get(row.get('author'))
+        if author_id is None:
+            raise ValueError(f'неизвестный автор {row.get("author")!r}')
+        group_id = None
+        if row.get('group'):
+            group_id = self.groups.get(row['group'])
+            if group_id is None:
+                raise ValueError(f'неизвестная группа {row["group"]!r}')
+        pub_date = None
+        if row.get('pub_date'):
+            pub_date = parse_datetime(str(row['pub_date']))
+            if pub_date is None:
+                raise ValueError(f'некорректная дата {row["pub_date"]!r}')
+            if timezone.is_naive(pub_date):
+                pub_date = timezone.make_aware(pub_date)
+        return Post(
+            text=text,
+            author_id=author_id,
+            group_id=group_id,
+            pub_date=pub_date,
+            image=row.get('image') or '',
+        )
+
+    def import_batch(self, rows, report):
+        self._resolve_authors(rows)
+        posts = []
+        for number, row in rows:
+            try:
+                posts.append(self.build_post(row))
+            except ValueError as error:
+                report.reject(number, error)
+        if posts:
+            self._save(posts)
+            report.imported += len(posts)
+            images = [post.image for post in posts if post.image]
+            report.images += len(images)
+            if self.process_images:
+                wait_for_thumbnails()
+                for image in images:
+                    schedule_thumbnails(image)
+        if self.progress is not None:
+            self.progress(report)
+
+    def _save(self, posts):
+        pub_dates = [post.pub_date for post in posts]
+        with transaction.atomic():
+            Post.objects.bulk_create(posts)
+            if posts[0].pk is None:
+                # SQLite не возвращает id вставленных строк, но до конца
+                # транзакции последние id в таблице принадлежат пачке.
+                ids = list(Post.objects.order_by('-pk').values_list(
+                    'pk', flat=True
+                )[:len(posts)])
+                for post, pk in zip(posts, ids[::-1]):
+                    post.pk = pk
+            dated = []
+            for post, pub_date in zip(posts, pub_dates):
+                if pub_date is not None:
+                    post.pub_date = pub_date
+                    dated.append(post)
+            Post.objects.bulk_update(dated, ['pub_date'])
+            self._fan_out(posts)
+            for author_id, count in Counter(
+                post.author_id for post in posts
+            ).items():
+                bump_counters(author_id, posts_count=count)
+            grouped = {}
+            for post in posts:
+                if post.group_id is not None:
+                    key = (post.group_id, post.author_id)
+                    count, last_date = grouped.get(key, (0, post.pub_date))
+                    grouped[key] = (count + 1, max(last_date, post.pub_date))
+            for (group_id, author_id), (count, last_date) in grouped.items():
+                add_group_posts(group_id, author_id, count, last_date)
+            get_search_backend().index_posts(posts)
+        invalidate_feeds(
+            *{f'profile:{post.author_id}' for post in posts},
+            *{f'group:{post.group_id}' for post in posts if post.group_id},
+            *(['groups'] if grouped else []),
+        )
+
+    def _fan_out(self, posts):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'INSERT INTO {FeedEntry._meta.db_table} '
+                '(user_id, post_id, pub_date) '
+                'SELECT f.user_id, p.id, p.pub_date '
+                f'FROM {Follow._meta.db_table} f '
+                f'INNER JOIN {Post._meta.db_table} p '
+                'ON p.author_id = f.author_id '
+                'WHERE p.id BETWEEN %s AND %s AND NOT EXISTS ('
+                f'SELECT 1 FROM {FeedEntry._meta.db_table} e '
+                'WHERE e.user_id = f.user_id AND e.post_id = p.id)',
+                [min(post.pk for post in posts),
+                 max(post.pk for post in posts)],
+            )
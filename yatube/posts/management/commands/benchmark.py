@@ -0,0 +1,90 @@
+import os
+
+from django.core.management.base import BaseCommand, CommandError
+
+from posts import benchmark
+from posts.models import Post
+
+
+class Command(BaseCommand):
+    help = (
+        'Замеряет число SQL-запросов, задержку и память на всех адресах '
+        'posts.urls и сравнивает их с сохранённой базой.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--seed',
+            action='store_true',
+            help='Перед замером наполнить базу синтетическими данными.',
+        )
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--posts', type=int, default=10000)
+        parser.add_argument('--comments', type=int, default=50000)
+        parser.add_argument('--follows', type=int, default=10000)
+        parser.add_argument('--groups', type=int, default=100)
+        parser.add_argument(
+            '--repeat',
+            type=int,
+            default=20,
+            help='Сколько раз запрашивать каждый адрес.',
+        )
+        parser.add_argument(
+            '--output',
+            default='benchmark.json',
+            help='Куда записать результаты в JSON.',
+        )
+        parser.add_argument(
+            '--baseline',
+            help='JSON с прошлыми результатами для поиска регрессий.',
+        )
+        parser.add_argument(
+            '--tolerance',
+            type=float,
+            default=0.2,
+            help='Допустимый рост p95 и памяти относительно базы.',
+        )
+
+    def handle(self, *args, **options):
+        if options['seed']:
+            if options['users'] < 2:
+                raise CommandError(
+                    'Для подписок нужно хотя бы 2 пользователя.'
+                )
+            benchmark.seed(
+                users=options['users'],
+                posts=options['posts'],
+                comments=options['comments'],
+                follows=options['follows'],
+                groups=options['groups'],
+                stdout=self.stdout,
+            )
+        if not Post.objects.exists():
+            raise CommandError('В базе нет постов, запустите с --seed.')
+        if options['repeat'] < 1:
+            raise CommandError('--repeat должен быть положительным.')
+        results, skipped = benchmark.run(options['repeat'])
+        benchmark.dump_results(results, options['output'])
+        for name, result in results.items():
+            self.stdout.write(
+                f'{name}: {result["queries"]} запросов, '
+                f'p50 {result["p50_ms"]} мс, p95 {result["p95_ms"]} мс, '
+                f'{result["peak_kb"]} КБ'
+            )
+        for name, reason in skipped.items():
+            self.stdout.write(f'{name}: пропущен, {reason}')
+        baseline = options['baseline']
+        if baseline is None:
+            return
+        if not os.path.exists(baseline):
+            raise CommandError(f'Файл базы {baseline} не найден.')
+        regressions = benchmark.compare(
+            results,
+            benchmark.load_baseline(baseline),
+            options['tolerance'],
+        )
+        if regressions:
+            raise CommandError(
+                'Найдены регрессии:\n' + '\n'.join(regressions)
+            )
+        self.stdout.write(self.style.SUCCESS('Регрессий нет.'))
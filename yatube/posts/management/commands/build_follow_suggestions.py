@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand
+
+from posts.recommendations import build_suggestions
+
+
+class Command(BaseCommand):
+    help = (
+        'Пересчитывает рекомендации «на кого подписаться» по графу '
+        'подписок. С NumPy и SciPy граф считается разреженными матрицами.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--count',
+            type=int,
+            help='Сколько авторов сохранять на пользователя.',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            help='Сколько пользователей записывать за раз.',
+        )
+
+    def handle(self, *args, **options):
+        saved = build_suggestions(
+            count=options['count'], batch_size=options['batch_size']
+        )
+        self.stdout.write(
+            self.style.SUCCESS(f'Сохранено рекомендаций: {saved}')
+        )
@@ -0,0 +1,48 @@
+from django.core.management.base import BaseCommand
+
+from posts.export import EXPORT_FORMATS, EXPORT_MODELS, export_lines
+
+
+class Command(BaseCommand):
+    help = 'Потоково выгружает посты, комментарии, подписки или группы.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('model', choices=sorted(EXPORT_MODELS))
+        parser.add_argument(
+            '--format',
+            choices=EXPORT_FORMATS,
+            default='ndjson',
+            help='Формат выгрузки.',
+        )
+        parser.add_argument(
+            '--after',
+            type=int,
+            help='Продолжить выгрузку с id больше указанного.',
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=2000,
+            help='Сколько строк читать из базы за раз.',
+        )
+        parser.add_argument(
+            '--output',
+            help='Файл для выгрузки, по умолчанию стандартный вывод.',
+        )
+
+    def handle(self, *args, **options):
+        lines = export_lines(
+            options['model'],
+            options['format'],
+            after=options['after'],
+            chunk_size=options['chunk_size'],
+        )
+        if options['output'] is None:
+            for line in lines:
+                self.stdout.write(line, ending='')
+            return
+        with open(
+            options['output'], 'a' if options['after'] is not None else 'w',
+            encoding='utf-8', newline='',
+        ) as output:
+            output.writelines(lines)
@@ -0,0 +1,35 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from posts.models import Post
+from posts.thumbnails import ThumbnailPool, generate_thumbnails
+
+
+class Command(BaseCommand):
+    help = 'Заранее создаёт миниатюры для уже загруженных картинок постов.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=settings.THUMBNAIL_WORKERS,
+            help='Сколько потоков создают миниатюры, 0 — без потоков.',
+        )
+
+    def handle(self, *args, **options):
+        workers = options['workers']
+        if workers < 0:
+            raise CommandError('--workers не может быть отрицательным.')
+        names = Post.objects.exclude(image='').exclude(
+            image__isnull=True
+        ).values_list('image', flat=True)
+        if workers:
+            with ThumbnailPool(
+                max_workers=workers, thread_name_prefix='thumbnails'
+            ) as pool:
+                done = sum(1 for _ in pool.map(
+                    generate_thumbnails, names.iterator()
+                ))
+        else:
+            done = sum(1 for _ in map(generate_thumbnails, names.iterator()))
+        self.stdout.write(self.style.SUCCESS(f'Обработано картинок: {done}'))
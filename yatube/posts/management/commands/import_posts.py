@@ -0,0 +1,53 @@
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from posts.importer import PostImporter
+
+
+class Command(BaseCommand):
+    help = 'Загружает посты из NDJSON-файла пачками через bulk_create.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'path',
+            help='NDJSON-файл с постами, «-» — стандартный ввод.',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Сколько постов вставлять одним запросом.',
+        )
+        parser.add_argument(
+            '--skip-images',
+            action='store_true',
+            help='Не создавать миниатюры, оставив их generate_thumbnails.',
+        )
+
+    def report_progress(self, report):
+        self.stdout.write(
+            f'Загружено {report.imported}, отклонено {report.skipped}, '
+            f'{report.rate:.0f} постов/с'
+        )
+
+    def handle(self, *args, **options):
+        if options['batch_size'] < 1:
+            raise CommandError('Размер пачки должен быть положительным.')
+        importer = PostImporter(
+            batch_size=options['batch_size'],
+            process_images=not options['skip_images'],
+            progress=self.report_progress,
+        )
+        if options['path'] == '-':
+            report = importer.run(sys.stdin)
+        else:
+            with open(options['path'], encoding='utf-8') as lines:
+                report = importer.run(lines)
+        for error in report.errors:
+            self.stderr.write(error)
+        self.stdout.write(self.style.SUCCESS(
+            f'Загружено постов: {report.imported} за '
+            f'{report.seconds:.1f} с ({report.rate:.0f} постов/с), '
+            f'отклонено строк: {report.skipped}'
+        ))
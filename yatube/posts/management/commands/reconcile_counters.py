@@ -0,0 +1,36 @@
+from django.core.management.base import BaseCommand
+
+from posts.counters import (
+    reconcile_counters,
+    reconcile_group_stats,
+    reconcile_post_comments,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        'Пересчитывает денормализованные счётчики пользователей, '
+        'сводки групп и комментариев постов.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Размер пачки при записи исправленных счётчиков.',
+        )
+
+    def handle(self, *args, **options):
+        fixed = reconcile_counters(batch_size=options['batch_size'])
+        self.stdout.write(
+            self.style.SUCCESS(f'Исправлено счётчиков: {fixed}')
+        )
+        fixed = reconcile_group_stats(batch_size=options['batch_size'])
+        self.stdout.write(
+            self.style.SUCCESS(f'Исправлено сводок групп: {fixed}')
+        )
+        fixed = reconcile_post_comments(batch_size=options['batch_size'])
+        self.stdout.write(
+            self.style.SUCCESS(f'Исправлено сводок комментариев: {fixed}')
+        )
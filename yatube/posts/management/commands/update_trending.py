@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+
+from posts.trending import update_trending
+
+
+class Command(BaseCommand):
+    help = (
+        'Добавляет в рейтинг популярного новые посты и комментарии. '
+        'Запускается периодически, например из cron.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Размер пачки при записи рейтингов.',
+        )
+
+    def handle(self, *args, **options):
+        updated = update_trending(batch_size=options['batch_size'])
+        self.stdout.write(
+            self.style.SUCCESS(f'Обновлено рейтингов: {updated}')
+        )
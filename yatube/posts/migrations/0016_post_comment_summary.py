@@ -0,0 +1,80 @@
+# Generated by Django 2.2.16 on 2026-10-18 06:34
+
+from django.db import migrations, models
+from django.db.models.functions import Coalesce, Length, Substr
+
+from posts.counters import truncate_comment_text
+
+BATCH_SIZE = 1000
+
+
+def fill_comment_summary(apps, schema_editor):
+    Post = apps.get_model('posts', 'Post')
+    Comment = apps.get_model('posts', 'Comment')
+    comments = Comment.objects.filter(post=models.OuterRef('pk'))
+    latest = comments.order_by('-created', '-pk')
+    Post.objects.update(
+        comments_count=Coalesce(models.Subquery(
+            comments.order_by().values('post').annotate(
+                count=models.Count('pk')
+            ).values('count')
+        ), 0),
+        last_comment_text=Coalesce(
+            Substr(models.Subquery(latest.values('text')[:1]), 1, 200),
+            models.Value(''),
+        ),
+        last_comment_author=Coalesce(
+            models.Subquery(latest.values('author__username')[:1]),
+            models.Value(''),
+        ),
+        last_comment_date=models.Subquery(latest.values('created')[:1]),
+    )
+    # Обрезанные тексты получают многоточие тем же хелпером,
+    # что и у сигналов комментариев.
+    long_posts = Post.objects.annotate(
+        latest_text=models.Subquery(latest.values('text')[:1]),
+    ).annotate(
+        length=Length('latest_text'),
+    ).filter(length__gt=200).values_list('pk', 'latest_text')
+    batch = []
+    for post_id, text in long_posts.iterator():
+        batch.append(Post(
+            pk=post_id, last_comment_text=truncate_comment_text(text)
+        ))
+        if len(batch) == BATCH_SIZE:
+            Post.objects.bulk_update(batch, ['last_comment_text'])
+            batch = []
+    Post.objects.bulk_update(batch, ['last_comment_text'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0015_follow_suggestions'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='comments_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Комментариев'),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='last_comment_author',
+            field=models.CharField(blank=True, editable=False, max_length=150, verbose_name='Автор последнего комментария'),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='last_comment_date',
+            field=models.DateTimeField(blank=True, editable=False, null=True, verbose_name='Дата последнего комментария'),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='last_comment_text',
+            field=models.CharField(blank=True, editable=False, max_length=200, verbose_name='Последний комментарий'),
+        ),
+        migrations.RunPython(
+            fill_comment_summary, migrations.RunPython.noop
+        ),
+    ]
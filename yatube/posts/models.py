@@ -24,6 +24,15 @@ class Group(models.Model):
         return self.title
 
 
+LAST_COMMENT_LENGTH = 200
+COMMENT_SUMMARY_FIELDS = (
+    'comments_count',
+    'last_comment_text',
+    'last_comment_author',
+    'last_comment_date',
+)
+
+
 class Post(models.Model):
     text = models.TextField(
         verbose_name="Текст поста",
@@ -54,12 +63,78 @@ class Post(models.Model):
         blank=True,
         null=True,
     )
+    comments_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name="Комментариев",
+    )
+    last_comment_text = models.CharField(
+        max_length=LAST_COMMENT_LENGTH,
+        blank=True,
+        editable=False,
+        verbose_name="Последний комментарий",
+    )
+    last_comment_author = models.CharField(
+        max_length=150,
+        blank=True,
+        editable=False,
+        verbose_name="Автор последнего комментария",
+    )
+    last_comment_date = models.DateTimeField(
+        null=True,
+        blank=True,
+        editable=False,
+        verbose_name="Дата последнего комментария",
+    )
 
     def __str__(self):
         return self.text[:15]
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        """Запоминает группу загруженного поста.
+
+        По ней сигналы узнают прежнюю группу при правке, не перечитывая
+        пост перед сохранением.
+        """
+        post = super().from_db(db, field_names, values)
+        if 'group_id' in post.__dict__:
+            post._loaded_group_id = post.group_id
+        return post
+
+    def save(self, *args, **kwargs):
+        """Не перезаписывает сводку комментариев при правке поста.
+
+        Её меняют только UPDATE из сигналов комментариев, а в загруженном
+        для правки посте она могла устареть.
+        """
+        if not self._state.adding and kwargs.get('update_fields') is None:
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key
+                and field.name not in COMMENT_SUMMARY_FIELDS
+            ]
+        super().save(*args, **kwargs)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is None or {'group', 'group_id'} & set(update_fields):
+            self._loaded_group_id = self.group_id
+
     class Meta:
         ordering = ("-pub_date",)
+        indexes = [
+            models.Index(
+                fields=("pub_date",),
+                name="post_pub_date_idx"
+            ),
+            models.Index(
+                fields=("author", "pub_date"),
+                name="post_author_pub_date_idx"
+            ),
+            models.Index(
+                fields=("group", "pub_date"),
+                name="post_group_pub_date_idx"
+            ),
+        ]
         verbose_name = "Пост"
         verbose_name_plural = "Посты"
 
@@ -89,6 +164,10 @@ class Comment(models.Model):
 
     class Meta:
         ordering = ("-created",)
+        indexes = [models.Index(
+            fields=("post", "created"),
+            name="comment_post_created_idx"
+        )]
         verbose_name = "Комментарий"
         verbose_name_plural = "Комментарии"
 
@@ -119,3 +198,232 @@ class Follow(models.Model):
 
     def __str__(self):
         return f'{self.user} подписан на {self.author}'
+
+
+class FeedEntry(models.Model):
+    """Запись ленты подписок, разложенная по подписчикам при публикации."""
+
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name="feed",
+        verbose_name="Подписчик",
+    )
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name="feed_entries",
+        verbose_name="Пост",
+    )
+    pub_date = models.DateTimeField(
+        verbose_name="Дата публикации"
+    )
+
+    class Meta:
+        ordering = ("-pub_date",)
+        constraints = [models.UniqueConstraint(
+            fields=('user', 'post'),
+            name="unique feed entry"
+        )]
+        indexes = [models.Index(
+            fields=('user', 'pub_date', 'post'),
+            name="feed_user_pub_date_post_idx"
+        )]
+        verbose_name = "Запись ленты"
+        verbose_name_plural = "Записи ленты"
+
+    def __str__(self):
+        return f'{self.post} в ленте {self.user}'
+
+
+class UserCounters(models.Model):
+    """Денормализованные счётчики пользователя для профиля и поста."""
+
+    user = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name="counters",
+        verbose_name="Пользователь",
+    )
+    posts_count = models.PositiveIntegerField(
+        default=0,
+        verbose_name="Постов",
+    )
+    comments_count = models.PositiveIntegerField(
+        default=0,
+        verbose_name="Комментариев",
+    )
+    followers_count = models.PositiveIntegerField(
+        default=0,
+        verbose_name="Подписчиков",
+    )
+    following_count = models.PositiveIntegerField(
+        default=0,
+        verbose_name="Подписок",
+    )
+
+    class Meta:
+        verbose_name = "Счётчики пользователя"
+        verbose_name_plural = "Счётчики пользователей"
+
+    def __str__(self):
+        return f'Счётчики {self.user}'
+
+
+class GroupStats(models.Model):
+    """Сводка по группе для каталога групп, обновляется сигналами."""
+
+    group = models.OneToOneField(
+        Group,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name="stats",
+        verbose_name="Группа",
+    )
+    posts_count = models.PositiveIntegerField(
+        default=0,
+        verbose_name="Постов",
+    )
+    authors_count = models.PositiveIntegerField(
+        default=0,
+        verbose_name="Авторов",
+    )
+    last_post_date = models.DateTimeField(
+        null=True,
+        blank=True,
+        verbose_name="Последний пост",
+    )
+
+    class Meta:
+        indexes = [models.Index(
+            fields=('last_post_date', 'group'),
+            name="group_stats_last_post_idx"
+        )]
+        verbose_name = "Сводка группы"
+        verbose_name_plural = "Сводки групп"
+
+    def __str__(self):
+        return f'Сводка {self.group}'
+
+
+class GroupAuthor(models.Model):
+    """Сколько постов автор написал в группе; ведёт число авторов."""
+
+    group = models.ForeignKey(
+        Group,
+        on_delete=models.CASCADE,
+        related_name="group_authors",
+        verbose_name="Группа",
+    )
+    author = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name="group_authors",
+        verbose_name="Автор",
+    )
+    posts_count = models.PositiveIntegerField(
+        default=0,
+        verbose_name="Постов",
+    )
+
+    class Meta:
+        constraints = [models.UniqueConstraint(
+            fields=('group', 'author'),
+            name="unique group author"
+        )]
+        verbose_name = "Автор группы"
+        verbose_name_plural = "Авторы групп"
+
+    def __str__(self):
+        return f'{self.author} в {self.group}'
+
+
+class TrendingScore(models.Model):
+    """Рейтинг поста в популярном с экспоненциальным затуханием.
+
+    score — логарифм суммы весов событий поста, каждый из которых
+    умножен на exp(t / tau) от своего момента. Затухание одинаково
+    для всех постов, поэтому порядок по score не меняется со временем
+    и новые события лишь прибавляются к рейтингу поста.
+    """
+
+    post = models.OneToOneField(
+        Post,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name="trending",
+        verbose_name="Пост",
+    )
+    score = models.FloatField(verbose_name="Рейтинг")
+
+    class Meta:
+        ordering = ("-score",)
+        indexes = [models.Index(
+            fields=('score', 'post'),
+            name="trending_score_idx"
+        )]
+        verbose_name = "Рейтинг поста"
+        verbose_name_plural = "Рейтинги постов"
+
+    def __str__(self):
+        return f'Рейтинг {self.post_id}'
+
+
+class TrendingWatermark(models.Model):
+    """Последний учтённый в рейтинге id постов или комментариев."""
+
+    source = models.CharField(
+        max_length=20,
+        primary_key=True,
+        verbose_name="Источник",
+    )
+    last_id = models.PositiveIntegerField(
+        default=0,
+        verbose_name="Последний id",
+    )
+
+    class Meta:
+        verbose_name = "Отметка рейтинга"
+        verbose_name_plural = "Отметки рейтинга"
+
+    def __str__(self):
+        return f'{self.source}: {self.last_id}'
+
+
+class FollowSuggestion(models.Model):
+    """Автор, на которого пользователю стоит подписаться.
+
+    Список из первых FOLLOW_SUGGESTIONS['COUNT'] авторов строится
+    пакетно командой build_follow_suggestions.
+    """
+
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name="follow_suggestions",
+        verbose_name="Пользователь",
+    )
+    author = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name="suggested_to",
+        verbose_name="Автор",
+    )
+    score = models.FloatField(verbose_name="Оценка")
+
+    class Meta:
+        ordering = ("-score",)
+        constraints = [models.UniqueConstraint(
+            fields=('user', 'author'),
+            name="unique suggestion"
+        )]
+        indexes = [models.Index(
+            fields=('user', 'score'),
+            name="follow_suggestion_idx"
+        )]
+        verbose_name = "Рекомендация автора"
+        verbose_name_plural = "Рекомендации авторов"
+
+    def __str__(self):
+        return f'{self.author} для {self.user}'
@@ -0,0 +1,239 @@
+import heapq
+import itertools
+import math
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+
+from core.db import retry_on_busy
+
+from .feed_cache import bump_scopes
+from .models import Follow, FollowSuggestion
+
+try:
+    import numpy as np
+    from scipy import sparse
+except ImportError:
+    np = sparse = None
+
+
+def _top(scores, count, excluded=()):
+    """Первые count пар (id, оценка) по убыванию оценки, затем id."""
+    top = heapq.nsmallest(count, (
+        (-score, author) for author, score in scores.items()
+        if author not in excluded and score > 0
+    ))
+    return [(author, -score) for score, author in top]
+
+
+def _python_suggestions(edges, count, options):
+    """Те же оценки, что и в _vectorized_suggestions, без NumPy."""
+    following = defaultdict(list)
+    followed_by = defaultdict(list)
+    for user, author in edges.iterator():
+        following[user].append(author)
+        followed_by[author].append(user)
+    for authors in following.values():
+        authors.sort()
+    scale = {
+        author: 1 / math.sqrt(len(users))
+        for author, users in followed_by.items()
+    }
+    similar = {}
+    for middle, users in followed_by.items():
+        together = defaultdict(int)
+        for user in users:
+            for author in following[user]:
+                together[author] += 1
+        similar[middle] = _top(
+            {
+                author: shared * scale[middle] * scale[author]
+                for author, shared in together.items()
+            },
+            options['NEIGHBOURS'],
+            {middle},
+        )
+    for user in sorted(following.keys() | followed_by.keys()):
+        friends = defaultdict(float)
+        cofollow = defaultdict(float)
+        for middle in following.get(user, ()):
+            for author in following.get(middle, ()):
+                friends[author] += 1
+            for author, value in similar[middle]:
+                cofollow[author] += value
+        scores = {
+            author: (
+                options['FRIENDS_WEIGHT'] * friends.get(author, 0)
+                + options['COFOLLOW_WEIGHT'] * cofollow.get(author, 0)
+            )
+            for author in friends.keys() | cofollow.keys()
+        }
+        yield user, _top(scores, count, {user, *following.get(user, ())})
+
+
+def _blocks(costs, budget):
+    """Делит строки на блоки примерно по budget умножений в каждом."""
+    total = np.cumsum(costs)
+    start = 0
+    while start < len(costs):
+        done = total[start - 1] if start else 0
+        end = max(
+            int(np.searchsorted(total, done + budget, side='right')),
+            start + 1,
+        )
+        yield start, end
+        start = end
+
+
+def _row_top(matrix, row, count, excluded):
+    """Первые count столбцов строки csr-матрицы, как в _top."""
+    columns = matrix.indices[matrix.indptr[row]:matrix.indptr[row + 1]]
+    values = matrix.data[matrix.indptr[row]:matrix.indptr[row + 1]]
+    keep = ~np.isin(columns, excluded) & (values > 0)
+    columns, values = columns[keep], values[keep]
+    top = np.lexsort((columns, -values))[:count]
+    return columns[top], values[top]
+
+
+def _vectorized_suggestions(edges, count, options):
+    """Оценки по разреженной матрице подписок A.
+
+    Друзья друзей — A @ A, число путей u -> x -> a. Схожесть авторов —
+    косинус столбцов A, то есть D (A.T @ A) D, D = diag(1 / sqrt(d)),
+    где d — число подписчиков; у каждого автора остаются NEIGHBOURS
+    самых похожих, иначе популярные авторы делают матрицу плотной.
+    Пользователю достаётся сумма схожестей с его авторами: A @ S.
+    Строки считаются блоками не больше BLOCK_PRODUCTS умножений,
+    поэтому память не зависит от размера графа целиком.
+    """
+    pairs = np.fromiter(
+        itertools.chain.from_iterable(edges.iterator()), dtype=np.int64
+    ).reshape(-1, 2)
+    ids, index = np.unique(pairs, return_inverse=True)
+    index = index.reshape(-1, 2)
+    size = len(ids)
+    follows = sparse.csr_matrix(
+        (np.ones(len(index)), (index[:, 0], index[:, 1])),
+        shape=(size, size),
+    )
+    transposed = follows.T.tocsr()
+    following_counts = np.diff(follows.indptr)
+    followers = np.diff(transposed.indptr)
+    scale = np.zeros(size)
+    scale[followers > 0] = 1 / np.sqrt(followers[followers > 0])
+    budget = options['BLOCK_PRODUCTS']
+    rows, columns, values = [], [], []
+    for start, end in _blocks(transposed @ following_counts, budget):
+        together = (transposed[start:end] @ follows).tocsr()
+        for row in range(end - start):
+            middle = start + row
+            lo, hi = together.indptr[row], together.indptr[row + 1]
+            together.data[lo:hi] *= scale[middle]
+            together.data[lo:hi] *= scale[together.indices[lo:hi]]
+            authors, similarity = _row_top(
+                together, row, options['NEIGHBOURS'], [middle]
+            )
+            rows.append(np.full(len(authors), middle))
+            columns.append(authors)
+            values.append(similarity)
+    similar = sparse.csr_matrix(
+        (
+            np.concatenate(values or [np.zeros(0)]),
+            (
+                np.concatenate(rows or [np.zeros(0, dtype=np.int64)]),
+                np.concatenate(columns or [np.zeros(0, dtype=np.int64)]),
+            ),
+        ),
+        shape=(size, size),
+    )
+    costs = follows @ (following_counts + np.diff(similar.indptr))
+    for start, end in _blocks(costs, budget):
+        block = follows[start:end]
+        scores = (
+            options['FRIENDS_WEIGHT'] * (block @ follows)
+            + options['COFOLLOW_WEIGHT'] * (block @ similar)
+        ).tocsr()
+        for row in range(end - start):
+            user = start + row
+            followed = block.indices[block.indptr[row]:block.indptr[row + 1]]
+            authors, score = _row_top(
+                scores, row, count, np.append(followed, user)
+            )
+            yield int(ids[user]), [
+                (int(ids[author]), float(value))
+                for author, value in zip(authors, score)
+            ]
+
+
+@retry_on_busy
+def _replace(first_id, last_id, suggestions):
+    FollowSuggestion.objects.filter(
+        user_id__gte=first_id, user_id__lte=last_id
+    ).delete()
+    FollowSuggestion.objects.bulk_create(suggestions)
+
+
+def _save(rows, batch_size):
+    """Заменяет рекомендации пачками пользователей по возрастанию id.
+
+    Каждая пачка удаляет старые строки всего диапазона id до своего
+    последнего пользователя, включая тех, кто выпал из графа.
+    """
+    saved = 0
+    first_id = 0
+    rows = iter(rows)
+    while True:
+        batch = list(itertools.islice(rows, batch_size))
+        if not batch:
+            break
+        suggestions = [
+            FollowSuggestion(user_id=user_id, author_id=author_id,
+                             score=score)
+            for user_id, authors in batch
+            for author_id, score in authors
+        ]
+        last_id = batch[-1][0]
+        _replace(first_id, last_id, suggestions)
+        saved += len(suggestions)
+        first_id = last_id + 1
+    FollowSuggestion.objects.filter(user_id__gte=first_id).delete()
+    return saved
+
+
+def build_suggestions(count=None, batch_size=None, vectorized=None):
+    """Пересчитывает рекомендации «на кого подписаться» по графу Follow.
+
+    Оценка автора — FRIENDS_WEIGHT на каждый путь через автора,
+    на которого пользователь подписан, плюс COFOLLOW_WEIGHT на схожесть
+    по общим подписчикам с его авторами. Записываются пачки
+    по batch_size пользователей. Пользователю сохраняются
+    первые count авторов, на которых он ещё не подписан. С NumPy
+    и SciPy граф считается разреженными матрицами, без них — тем же
+    алгоритмом на словарях. Возвращает количество рекомендаций.
+    """
+    options = settings.FOLLOW_SUGGESTIONS
+    if vectorized is None:
+        vectorized = np is not None
+    if vectorized and np is None:
+        raise ImproperlyConfigured('Для расчёта матрицами нужны NumPy и SciPy')
+    compute = _vectorized_suggestions if vectorized else _python_suggestions
+    rows = compute(
+        Follow.objects.filter(
+            author__isnull=False, user__isnull=False
+        ).order_by().values_list('user', 'author'),
+        count or options['COUNT'],
+        options,
+    )
+    saved = _save(rows, batch_size or options['BATCH_SIZE'])
+    bump_scopes('suggestions')
+    return saved
+
+
+def get_suggestions(user, count=None):
+    """Первые рекомендации пользователя одним запросом по индексу."""
+    if not user.is_authenticated:
+        return []
+    return list(user.follow_suggestions.select_related('author')[
+        :count or settings.FOLLOW_SUGGESTIONS['SHOW']
+    ])
@@ -0,0 +1,234 @@
+import re
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import Q
+from django.db.models.expressions import RawSQL
+from django.utils.module_loading import import_string
+
+from .models import Comment, Post
+
+SEARCH_TABLE = 'posts_search'
+
+KIND_POST = 0
+KIND_COMMENT = 1
+
+
+def _tokens(query):
+    return re.findall(r'\w+', query.lower())
+
+
+class SearchResults:
+    """Ленивый список найденных постов по убыванию релевантности.
+
+    Понимает count() и срезы, поэтому его можно отдать в Paginator.
+    """
+
+    def __init__(self, backend, query):
+        self.backend = backend
+        self.query = query
+        self._count = None
+
+    def count(self):
+        if self._count is None:
+            self._count = self.backend.count_posts(self.query)
+        return self._count
+
+    def __len__(self):
+        return self.count()
+
+    def __getitem__(self, key):
+        if not isinstance(key, slice):
+            return self[key:key + 1][0]
+        start = key.start or 0
+        limit = (key.stop if key.stop is not None else self.count()) - start
+        if limit <= 0:
+            return []
+        post_ids = self.backend.rank_posts(self.query, limit, start)
+        posts = Post.objects.select_related(
+            'author', 'group'
+        ).in_bulk(post_ids)
+        return [posts[pk] for pk in post_ids if pk in posts]
+
+
+class BaseSearchBackend:
+    """Интерфейс поискового бэкенда постов и комментариев."""
+
+    def index_post(self, post):
+        pass
+
+    def index_comment(self, comment):
+        pass
+
+    def index_posts(self, posts):
+        for post in posts:
+            self.index_post(post)
+
+    def remove_post(self, post):
+        pass
+
+    def remove_comment(self, comment):
+        pass
+
+    def rebuild(self):
+        pass
+
+    def search_posts(self, query):
+        return SearchResults(self, query)
+
+    def count_posts(self, query):
+        raise NotImplementedError
+
+    def rank_posts(self, query, limit, offset):
+        raise NotImplementedError
+
+    def filter_queryset(self, queryset, query):
+        raise NotImplementedError
+
+
+class LikeSearchBackend(BaseSearchBackend):
+    """Запасной бэкенд без индекса: LIKE по тексту постов и комментариев."""
+
+    def _posts(self, query):
+        condition = Q()
+        for token in _tokens(query):
+            condition &= (
+                Q(text__icontains=token)
+                | Q(comments__text__icontains=token)
+            )
+        return Post.objects.filter(condition).distinct()
+
+    def count_posts(self, query):
+        if not _tokens(query):
+            return 0
+        return self._posts(query).count()
+
+    def rank_posts(self, query, limit, offset):
+        if not _tokens(query):
+            return []
+        return list(self._posts(query).values_list(
+            'pk', flat=True
+        )[offset:offset + limit])
+
+    def filter_queryset(self, queryset, query):
+        for token in _tokens(query):
+            queryset = queryset.filter(text__icontains=token)
+        return queryset
+
+
+class FTS5SearchBackend(BaseSearchBackend):
+    """Инвертированный индекс на виртуальной таблице SQLite FTS5.
+
+    Пост хранится под rowid = 2 * id, комментарий под 2 * id + 1,
+    поэтому обновление и удаление записи идут по первичному ключу.
+    """
+
+    def _rowid(self, kind, pk):
+        return 2 * pk + kind
+
+    def _match(self, query):
+        return ' '.join(f'"{token}"' for token in _tokens(query))
+
+    def _put(self, kind, pk, post_id, text):
+        rowid = self._rowid(kind, pk)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'DELETE FROM {SEARCH_TABLE} WHERE rowid = %s', [rowid]
+            )
+            cursor.execute(
+                f'INSERT INTO {SEARCH_TABLE} (rowid, text, post_id) '
+                'VALUES (%s, %s, %s)',
+                [rowid, text, post_id],
+            )
+
+    def _delete(self, kind, pk):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'DELETE FROM {SEARCH_TABLE} WHERE rowid = %s',
+                [self._rowid(kind, pk)],
+            )
+
+    def index_post(self, post):
+        self._put(KIND_POST, post.pk, post.pk, post.text)
+
+    def index_comment(self, comment):
+        self._put(KIND_COMMENT, comment.pk, comment.post_id, comment.text)
+
+    def index_posts(self, posts):
+        rows = [
+            (self._rowid(KIND_POST, post.pk), post.text, post.pk)
+            for post in posts
+        ]
+        with connection.cursor() as cursor:
+            cursor.executemany(
+                f'DELETE FROM {SEARCH_TABLE} WHERE rowid = %s',
+                [row[:1] for row in rows],
+            )
+            cursor.executemany(
+                f'INSERT INTO {SEARCH_TABLE} (rowid, text, post_id) '
+                'VALUES (%s, %s, %s)',
+                rows,
+            )
+
+    def remove_post(self, post):
+        self._delete(KIND_POST, post.pk)
+
+    def remove_comment(self, comment):
+        self._delete(KIND_COMMENT, comment.pk)
+
+    def rebuild(self):
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {SEARCH_TABLE}')
+            cursor.execute(
+                f'INSERT INTO {SEARCH_TABLE} (rowid, text, post_id) '
+                f'SELECT 2 * id + {KIND_POST}, text, id '
+                f'FROM {Post._meta.db_table}'
+            )
+            cursor.execute(
+                f'INSERT INTO {SEARCH_TABLE} (rowid, text, post_id) '
+                f'SELECT 2 * id + {KIND_COMMENT}, text, post_id '
+                f'FROM {Comment._meta.db_table}'
+            )
+
+    def count_posts(self, query):
+        match = self._match(query)
+        if not match:
+            return 0
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'SELECT COUNT(DISTINCT post_id) FROM {SEARCH_TABLE} '
+                f'WHERE {SEARCH_TABLE} MATCH %s',
+                [match],
+            )
+            return cursor.fetchone()[0]
+
+    def rank_posts(self, query, limit, offset):
+        match = self._match(query)
+        if not match:
+            return []
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'SELECT post_id, MIN(rank) AS best FROM ('
+                f'SELECT post_id, rank FROM {SEARCH_TABLE} '
+                f'WHERE {SEARCH_TABLE} MATCH %s'
+                ') GROUP BY post_id ORDER BY best, post_id DESC '
+                'LIMIT %s OFFSET %s',
+                [match, limit, offset],
+            )
+            return [row[0] for row in cursor.fetchall()]
+
+    def filter_queryset(self, queryset, query):
+        match = self._match(query)
+        if not match:
+            return queryset.none()
+        kind = KIND_COMMENT if queryset.model is Comment else KIND_POST
+        return queryset.filter(pk__in=RawSQL(
+            f'SELECT rowid / 2 FROM {SEARCH_TABLE} '
+            f'WHERE {SEARCH_TABLE} MATCH %s AND rowid %% 2 = %s',
+            [match, kind],
+        ))
+
+
+def get_search_backend():
+    """Возвращает бэкенд из settings.POST_SEARCH_BACKEND."""
+    return import_string(settings.POST_SEARCH_BACKEND)()
@@ -0,0 +1,287 @@
+from django.core.signals import request_finished, request_started
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from .counters import (
+    add_group_posts,
+    add_post_comment,
+    bump_counters,
+    refresh_post_comments,
+    remove_group_post,
+)
+from .feed_cache import bump_scopes, invalidate_feeds
+from .models import (
+    Comment,
+    FeedEntry,
+    Follow,
+    FollowSuggestion,
+    Group,
+    GroupStats,
+    Post,
+)
+from .search import get_search_backend
+from .thumbnails import (
+    defer_thumbnails,
+    finish_thumbnails,
+    schedule_image_processing,
+    schedule_thumbnails,
+)
+
+
+@receiver(post_save, sender=Post)
+def fan_out_post(sender, instance, created, **kwargs):
+    """Раскладывает новый пост в ленты подписчиков автора."""
+    if not created:
+        return
+    followers = Follow.objects.filter(
+        author_id=instance.author_id
+    ).values_list('user_id', flat=True)
+    FeedEntry.objects.bulk_create(
+        (
+            FeedEntry(
+                user_id=user_id,
+                post=instance,
+                pub_date=instance.pub_date,
+            )
+            for user_id in followers.iterator()
+        ),
+        batch_size=500,
+        ignore_conflicts=True,
+    )
+
+
+@receiver(post_save, sender=Follow)
+def backfill_feed(sender, instance, created, **kwargs):
+    """Добавляет посты автора в ленту нового подписчика."""
+    if not created or instance.author_id is None:
+        return
+    posts = Post.objects.filter(
+        author_id=instance.author_id
+    ).values_list('pk', 'pub_date')
+    FeedEntry.objects.bulk_create(
+        (
+            FeedEntry(
+                user_id=instance.user_id,
+                post_id=post_id,
+                pub_date=pub_date,
+            )
+            for post_id, pub_date in posts.iterator()
+        ),
+        batch_size=500,
+        ignore_conflicts=True,
+    )
+
+
+@receiver(post_save, sender=Follow)
+def drop_follow_suggestion(sender, instance, created, **kwargs):
+    """Убирает из рекомендаций автора, на которого уже подписались."""
+    if created and FollowSuggestion.objects.filter(
+        user_id=instance.user_id, author_id=instance.author_id
+    ).delete()[0]:
+        bump_scopes('suggestions')
+
+
+@receiver(post_delete, sender=Follow)
+def prune_feed(sender, instance, **kwargs):
+    """Убирает посты автора из ленты отписавшегося пользователя."""
+    FeedEntry.objects.filter(
+        user_id=instance.user_id,
+        post__author_id=instance.author_id,
+    ).delete()
+
+
+@receiver(pre_save, sender=Post)
+def remember_post_group(sender, instance, **kwargs):
+    """Запоминает прежнюю группу поста, чтобы сбросить и её страницу.
+
+    У нового поста прежней группы нет, а загруженный из базы пост
+    помнит её сам (Post.from_db), так что перечитывать строку нужно
+    только для поста, собранного без загрузки.
+    """
+    if instance._state.adding:
+        instance._previous_group_id = None
+    elif hasattr(instance, '_loaded_group_id'):
+        instance._previous_group_id = instance._loaded_group_id
+    else:
+        instance._previous_group_id = Post.objects.filter(
+            pk=instance.pk
+        ).values_list('group_id', flat=True).first()
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+def invalidate_post_pages(sender, instance, **kwargs):
+    """Сбрасывает кеш и ETag лент, группы, профиля и страницы поста."""
+    group_ids = {
+        instance.group_id,
+        getattr(instance, '_previous_group_id', None),
+    } - {None}
+    invalidate_feeds(
+        f'post:{instance.pk}',
+        f'profile:{instance.author_id}',
+        *(f'group:{group_id}' for group_id in group_ids),
+    )
+
+
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+def invalidate_comment_pages(sender, instance, **kwargs):
+    """Сбрасывает кеш лент и ETag страниц с карточкой поста.
+
+    Число и последний комментарий видны в карточке на страницах
+    группы и профиля автора, поэтому меняются и их поколения.
+    """
+    post = Post.objects.filter(pk=instance.post_id).values_list(
+        'author_id', 'group_id'
+    ).first()
+    scopes = [f'post:{instance.post_id}']
+    if post is not None:
+        author_id, group_id = post
+        scopes.append(f'profile:{author_id}')
+        if group_id is not None:
+            scopes.append(f'group:{group_id}')
+    invalidate_feeds(*scopes)
+
+
+@receiver(post_save, sender=Group)
+@receiver(post_delete, sender=Group)
+def invalidate_group_pages(sender, instance, **kwargs):
+    """Сбрасывает кеш лент, ETag страницы группы и каталог групп."""
+    invalidate_feeds(f'group:{instance.pk}', 'groups')
+
+
+@receiver(post_save, sender=Follow)
+@receiver(post_delete, sender=Follow)
+def invalidate_follow_pages(sender, instance, **kwargs):
+    """Сбрасывает ETag профилей: меняются счётчики и кнопка подписки."""
+    bump_scopes(
+        f'profile:{instance.author_id}',
+        f'profile:{instance.user_id}',
+    )
+
+
+@receiver(post_save, sender=Post)
+def count_new_post(sender, instance, created, **kwargs):
+    if created:
+        bump_counters(instance.author_id, posts_count=1)
+
+
+@receiver(post_delete, sender=Post)
+def count_deleted_post(sender, instance, **kwargs):
+    bump_counters(instance.author_id, posts_count=-1)
+
+
+@receiver(post_save, sender=Group)
+def create_group_stats(sender, instance, created, **kwargs):
+    if created:
+        GroupStats.objects.get_or_create(group=instance)
+
+
+@receiver(post_save, sender=Post)
+def count_group_post(sender, instance, created, **kwargs):
+    """Обновляет сводки групп при публикации и переносе поста."""
+    previous = getattr(instance, '_previous_group_id', None)
+    if previous == instance.group_id:
+        return
+    remove_group_post(previous, instance.author_id)
+    add_group_posts(
+        instance.group_id, instance.author_id, 1, instance.pub_date
+    )
+    bump_scopes('groups')
+
+
+@receiver(post_delete, sender=Post)
+def count_deleted_group_post(sender, instance, **kwargs):
+    if instance.group_id is not None:
+        remove_group_post(instance.group_id, instance.author_id)
+        bump_scopes('groups')
+
+
+@receiver(post_save, sender=Comment)
+def summarize_comment(sender, instance, created, **kwargs):
+    """Обновляет число и последний комментарий в карточке поста."""
+    if created:
+        add_post_comment(instance)
+    else:
+        refresh_post_comments(instance.post_id)
+
+
+@receiver(post_delete, sender=Comment)
+def summarize_deleted_comment(sender, instance, **kwargs):
+    refresh_post_comments(instance.post_id, delta=-1)
+
+
+@receiver(post_save, sender=Comment)
+def count_new_comment(sender, instance, created, **kwargs):
+    if created:
+        bump_counters(instance.author_id, comments_count=1)
+
+
+@receiver(post_delete, sender=Comment)
+def count_deleted_comment(sender, instance, **kwargs):
+    bump_counters(instance.author_id, comments_count=-1)
+
+
+@receiver(post_save, sender=Follow)
+def count_new_follow(sender, instance, created, **kwargs):
+    if created:
+        bump_counters(instance.author_id, followers_count=1)
+        bump_counters(instance.user_id, following_count=1)
+
+
+@receiver(post_delete, sender=Follow)
+def count_deleted_follow(sender, instance, **kwargs):
+    bump_counters(instance.author_id, followers_count=-1)
+    bump_counters(instance.user_id, following_count=-1)
+
+
+@receiver(pre_save, sender=Post)
+def remember_image_upload(sender, instance, **kwargs):
+    """Отмечает пост, которому только что загрузили картинку."""
+    instance._image_uploaded = (
+        bool(instance.image) and not instance.image._committed
+    )
+
+
+@receiver(post_save, sender=Post)
+def pregenerate_thumbnails(sender, instance, **kwargs):
+    """Готовит картинку поста и миниатюры в фоне, вне запроса к ленте.
+
+    Новую загрузку пул сначала пережимает, см. posts.images.
+    """
+    if getattr(instance, '_image_uploaded', False):
+        schedule_image_processing(instance)
+    else:
+        schedule_thumbnails(instance.image)
+
+
+@receiver(request_started)
+def start_request_thumbnails(sender, **kwargs):
+    """Копит миниатюры, заказанные запросом, до отправки ответа."""
+    defer_thumbnails()
+
+
+@receiver(request_finished)
+def finish_request_thumbnails(sender, **kwargs):
+    """Отдаёт миниатюры запроса в пул уже после отправки ответа."""
+    finish_thumbnails()
+
+
+@receiver(post_save, sender=Post)
+def index_post(sender, instance, **kwargs):
+    get_search_backend().index_post(instance)
+
+
+@receiver(post_delete, sender=Post)
+def unindex_post(sender, instance, **kwargs):
+    get_search_backend().remove_post(instance)
+
+
+@receiver(post_save, sender=Comment)
+def index_comment(sender, instance, **kwargs):
+    get_search_backend().index_comment(instance)
+
+
+@receiver(post_delete, sender=Comment)
+def unindex_comment(sender, instance, **kwargs):
+    get_search_backend().remove_comment(instance)
@@ -0,0 +1,11 @@
+from django import template
+
+from ..utils import page_window
+
+register = template.Library()
+
+
+@register.filter(name='page_window')
+def page_window_filter(page):
+    """Номера страниц для пагинатора, None — место пропуска."""
+    return page_window(page)
@@ -0,0 +1,13 @@
+from django import template
+
+from ..thumbnails import lookup_thumbnail
+
+register = template.Library()
+
+
+@register.simple_tag
+def post_thumbnail(image, size):
+    """Находит заранее созданную миниатюру, не генерируя её в запросе."""
+    if not image:
+        return None
+    return lookup_thumbnail(image, size)
@@ -0,0 +1,132 @@
+from http import HTTPStatus
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from ..models import Comment, Follow, Group, Post
+
+User = get_user_model()
+
+
+@override_settings(POST_COUNT=2, COMMENT_COUNT=2)
+class ApiTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(
+            title='Группа', slug='group', description='Описание'
+        )
+        for number in range(3):
+            cls.post = Post.objects.create(
+                text=f'Пост {number}', author=cls.author, group=cls.group
+            )
+        for number in range(3):
+            Comment.objects.create(
+                post=cls.post, author=cls.reader, text=f'Комментарий {number}'
+            )
+        Follow.objects.create(user=cls.reader, author=cls.author)
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.reader_client = Client()
+        self.reader_client.force_login(self.reader)
+
+    def collect(self, client, url, **params):
+        """Проходит ленту по курсорам и возвращает все объекты."""
+        results = []
+        cursor = ''
+        while cursor is not None:
+            response = client.get(url, {**params, 'cursor': cursor})
+            self.assertEqual(response.status_code, HTTPStatus.OK)
+            data = response.json()
+            results += data['results']
+            cursor = data['next']
+        return results
+
+    def test_feeds_walk_by_cursor(self):
+        """Ленты листаются курсором и отдают все посты по порядку."""
+        urls = {
+            'posts:api_index': {},
+            'posts:api_group_list': {'slug': 'group'},
+            'posts:api_profile': {'username': 'author'},
+        }
+        for name, kwargs in urls.items():
+            with self.subTest(name=name):
+                results = self.collect(
+                    self.client, reverse(name, kwargs=kwargs)
+                )
+                self.assertEqual(
+                    [item['text'] for item in results],
+                    ['Пост 2', 'Пост 1', 'Пост 0'],
+                )
+                self.assertEqual(results[0]['author'], 'author')
+                self.assertEqual(results[0]['group'], 'group')
+
+    def test_follow_feed(self):
+        """Лента подписок требует входа."""
+        url = reverse('posts:api_follow_index')
+        self.assertEqual(
+            self.client.get(url).status_code, HTTPStatus.UNAUTHORIZED
+        )
+        results = self.collect(self.reader_client, url, fields='id')
+        self.assertEqual(
+            results,
+            [{'id': pk} for pk in Post.objects.order_by(
+                '-pub_date', '-pk'
+            ).values_list('pk', flat=True)],
+        )
+
+    def test_sparse_fields(self):
+        """?fields= оставляет в ответе только запрошенные поля."""
+        response = self.client.get(
+            reverse('posts:api_index'), {'fields': 'id,text'}
+        )
+        for item in response.json()['results']:
+            self.assertEqual(set(item), {'id', 'text'})
+        response = self.client.get(
+            reverse('posts:api_index'), {'fields': 'id,password'}
+        )
+        self.assertEqual(response.status_code, HTTPStatus.BAD_REQUEST)
+        self.assertIn('password', response.json()['error'])
+
+    def test_post_detail_and_comments(self):
+        detail = reverse('posts:api_post_detail', args=[self.post.pk])
+        self.assertEqual(
+            self.client.get(detail, {'fields': 'text,image'}).json(),
+            {'text': 'Пост 2', 'image': None},
+        )
+        comments = self.collect(
+            self.client,
+            reverse('posts:api_post_comments', args=[self.post.pk]),
+            fields='text',
+        )
+        self.assertEqual(
+            [item['text'] for item in comments],
+            ['Комментарий 2', 'Комментарий 1', 'Комментарий 0'],
+        )
+        missing = reverse('posts:api_post_detail', args=[0])
+        self.assertEqual(
+            self.client.get(missing).status_code, HTTPStatus.NOT_FOUND
+        )
+
+    def test_feed_queries(self):
+        """Страница ленты — валидаторы и один запрос values()."""
+        url = reverse('posts:api_index')
+        with self.assertNumQueries(2):
+            self.client.get(url)
+
+    def test_not_modified(self):
+        response = self.client.get(reverse('posts:api_index'))
+        response = self.client.get(
+            reverse('posts:api_index'), HTTP_IF_NONE_MATCH=response['ETag']
+        )
+        self.assertEqual(response.status_code, HTTPStatus.NOT_MODIFIED)
+        response = self.client.post(reverse('posts:api_index'))
+        self.assertEqual(
+            response.status_code, HTTPStatus.METHOD_NOT_ALLOWED
+        )
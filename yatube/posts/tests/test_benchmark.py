@@ -0,0 +1,98 @@
+import json
+import os
+import tempfile
+from io import StringIO
+
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
+from django.test import TestCase
+
+from ..benchmark import SKIPPED_URLS
+from ..models import FeedEntry, Follow, Post, UserCounters
+from ..urls import urlpatterns
+
+
+class BenchmarkCommandTests(TestCase):
+    def setUp(self):
+        self.output = tempfile.NamedTemporaryFile(
+            suffix='.json', delete=False
+        ).name
+
+    def tearDown(self):
+        os.remove(self.output)
+
+    def run_benchmark(self, *args):
+        call_command(
+            'benchmark',
+            '--repeat=2',
+            f'--output={self.output}',
+            *args,
+            stdout=StringIO(),
+        )
+        with open(self.output, encoding='utf-8') as file:
+            return json.load(file)
+
+    def test_seed_and_measure_every_url(self):
+        """Бенчмарк наполняет базу и замеряет все адреса posts.urls."""
+        results = self.run_benchmark(
+            '--seed', '--users=5', '--posts=30', '--comments=20',
+            '--follows=10', '--groups=2',
+        )
+        self.assertEqual(Post.objects.count(), 30)
+        self.assertTrue(Follow.objects.exists())
+        self.assertTrue(FeedEntry.objects.exists())
+        self.assertEqual(UserCounters.objects.count(), 5)
+        for pattern in urlpatterns:
+            if pattern.name in SKIPPED_URLS:
+                self.assertNotIn(pattern.name, results)
+                continue
+            with self.subTest(name=pattern.name):
+                result = results[pattern.name]
+                self.assertGreater(result['queries'], 0)
+                self.assertLessEqual(result['p50_ms'], result['p95_ms'])
+
+    def test_urls_without_sample_are_skipped(self):
+        """Без групп с постами адрес группы пропускается с причиной."""
+        out = StringIO()
+        call_command(
+            'benchmark', '--seed', '--users=3', '--posts=5',
+            '--comments=5', '--follows=2', '--groups=0', '--repeat=1',
+            f'--output={self.output}', stdout=out,
+        )
+        with open(self.output, encoding='utf-8') as file:
+            results = json.load(file)
+        self.assertNotIn('group_list', results)
+        self.assertIn('index', results)
+        output = out.getvalue()
+        self.assertIn('group_list: пропущен, нет примера для slug', output)
+        self.assertIn('export: пропущен', output)
+
+    def test_measure_leaves_shared_cache_and_data(self):
+        """Замеры не чистят общий кеш и не пишут в базу."""
+        self.run_benchmark(
+            '--seed', '--users=3', '--posts=5', '--comments=5',
+            '--follows=2', '--groups=1',
+        )
+        cache.set('shared', 'value')
+        follows = list(Follow.objects.values_list('pk', flat=True))
+        self.run_benchmark()
+        self.assertEqual(cache.get('shared'), 'value')
+        self.assertEqual(
+            list(Follow.objects.values_list('pk', flat=True)), follows
+        )
+
+    def test_query_regression_fails(self):
+        """Рост числа запросов относительно базы считается регрессией."""
+        results = self.run_benchmark(
+            '--seed', '--users=3', '--posts=5', '--comments=5',
+            '--follows=2', '--groups=1',
+        )
+        results['index']['queries'] -= 1
+        baseline = self.output + '.baseline'
+        with open(baseline, 'w', encoding='utf-8') as file:
+            json.dump(results, file)
+        try:
+            with self.assertRaisesMessage(CommandError, 'index'):
+                self.run_benchmark(f'--baseline={baseline}', '--tolerance=100')
+        finally:
+            os.remove(baseline)
@@ -0,0 +1,125 @@
+from http import HTTPStatus
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from ..models import Comment, Follow, Group, Post
+
+User = get_user_model()
+
+
+class ConditionalGetTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(
+            title='Группа', slug='group', description='Описание'
+        )
+        cls.other_group = Group.objects.create(
+            title='Другая группа', slug='other', description='Описание'
+        )
+        cls.post = Post.objects.create(
+            text='Тестовый пост', author=cls.author, group=cls.group
+        )
+        cls.urls = {
+            'index': reverse('posts:index'),
+            'group': reverse('posts:group_list', kwargs={'slug': 'group'}),
+            'profile': reverse(
+                'posts:profile', kwargs={'username': 'author'}
+            ),
+            'detail': reverse(
+                'posts:post_detail', kwargs={'post_id': cls.post.pk}
+            ),
+        }
+
+    def setUp(self):
+        cache.clear()
+        self.guest_user = Client()
+
+    def test_unchanged_pages_return_not_modified(self):
+        """Неизменившаяся страница отдаёт 304 без запроса ленты."""
+        for name, url in self.urls.items():
+            with self.subTest(name=name):
+                response = self.guest_user.get(url)
+                self.assertIn('Last-Modified', response)
+                self.assertIn('private', response['Cache-Control'])
+                self.assertIn('no-cache', response['Cache-Control'])
+                with self.assertNumQueries(1):
+                    response = self.guest_user.get(
+                        url, HTTP_IF_NONE_MATCH=response['ETag']
+                    )
+                self.assertEqual(
+                    response.status_code, HTTPStatus.NOT_MODIFIED
+                )
+
+    def test_etag_depends_on_user_and_page(self):
+        """ETag различается для пользователей и страниц ленты."""
+        url = self.urls['index']
+        reader = Client()
+        reader.force_login(self.reader)
+        etag = self.guest_user.get(url)['ETag']
+        self.assertNotEqual(reader.get(url)['ETag'], etag)
+        self.assertNotEqual(
+            self.guest_user.get(f'{url}?page=2')['ETag'], etag
+        )
+
+    def move_post_to_other_group(self):
+        post = Post.objects.get(pk=self.post.pk)
+        post.group = self.other_group
+        post.save()
+
+    def test_changes_refresh_affected_pages(self):
+        """Изменения данных меняют ETag затронутых страниц."""
+        changes = {
+            'index': lambda: Post.objects.create(
+                text='Новый пост', author=self.reader
+            ),
+            'detail': lambda: Comment.objects.create(
+                post=self.post, author=self.reader, text='Комментарий'
+            ),
+            'profile': lambda: Follow.objects.create(
+                user=self.reader, author=self.author
+            ),
+            'group': self.move_post_to_other_group,
+        }
+        for name, change in changes.items():
+            with self.subTest(name=name):
+                url = self.urls[name]
+                etag = self.guest_user.get(url)['ETag']
+                change()
+                self.assertNotEqual(self.guest_user.get(url)['ETag'], etag)
+
+    def test_comments_refresh_post_cards(self):
+        """Комментарий меняет карточку поста на всех её страницах."""
+        for name in ('index', 'group', 'profile', 'detail'):
+            with self.subTest(name=name):
+                url = self.urls[name]
+                response = self.guest_user.get(url)
+                Comment.objects.create(
+                    post=self.post, author=self.reader, text=f'Для {name}'
+                )
+                response = self.guest_user.get(
+                    url, HTTP_IF_NONE_MATCH=response['ETag']
+                )
+                self.assertEqual(response.status_code, HTTPStatus.OK)
+                self.assertContains(response, f'Для {name}')
+
+    def test_writes_without_signals_refresh_pages(self):
+        """Записи в обход сигналов видны по дате последнего поста."""
+        url = self.urls['profile']
+        etag = self.guest_user.get(url)['ETag']
+        Post.objects.bulk_create([Post(text='Пачка', author=self.author)])
+        self.assertNotEqual(self.guest_user.get(url)['ETag'], etag)
+
+    def test_if_modified_since(self):
+        """Без If-None-Match страница сверяется по Last-Modified."""
+        url = self.urls['detail']
+        last_modified = self.guest_user.get(url)['Last-Modified']
+        response = self.guest_user.get(
+            url, HTTP_IF_MODIFIED_SINCE=last_modified
+        )
+        self.assertEqual(response.status_code, HTTPStatus.NOT_MODIFIED)
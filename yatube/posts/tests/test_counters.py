@@ -0,0 +1,190 @@
+from importlib import import_module
+from io import StringIO
+
+from django.apps import apps
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from ..counters import get_counters
+from ..models import (
+    LAST_COMMENT_LENGTH,
+    Comment,
+    Follow,
+    Post,
+    UserCounters,
+)
+
+User = get_user_model()
+
+
+class UserCountersTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.post = Post.objects.create(
+            text='Тестовый пост',
+            author=cls.author,
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.guest_user = Client()
+
+    def test_counters_follow_signals(self):
+        """Счётчики меняются вместе с постами, комментариями и подписками."""
+        author_counters = get_counters(User.objects.get(username='author'))
+        reader_counters = get_counters(User.objects.get(username='reader'))
+        self.assertEqual(author_counters.posts_count, 1)
+        Post.objects.create(text='Второй пост', author=self.author)
+        comment = Comment.objects.create(
+            post=self.post,
+            author=self.reader,
+            text='Комментарий',
+        )
+        follow = Follow.objects.create(user=self.reader, author=self.author)
+        author_counters.refresh_from_db()
+        reader_counters.refresh_from_db()
+        self.assertEqual(author_counters.posts_count, 2)
+        self.assertEqual(author_counters.followers_count, 1)
+        self.assertEqual(reader_counters.comments_count, 1)
+        self.assertEqual(reader_counters.following_count, 1)
+        comment.delete()
+        follow.delete()
+        author_counters.refresh_from_db()
+        reader_counters.refresh_from_db()
+        self.assertEqual(author_counters.followers_count, 0)
+        self.assertEqual(reader_counters.comments_count, 0)
+        self.assertEqual(reader_counters.following_count, 0)
+
+    def test_reconcile_command_fixes_drift(self):
+        """Команда reconcile_counters исправляет разошедшиеся счётчики."""
+        get_counters(User.objects.get(username='author'))
+        UserCounters.objects.filter(user=self.author).update(posts_count=42)
+        call_command('reconcile_counters', stdout=StringIO())
+        self.assertEqual(
+            UserCounters.objects.get(user=self.author).posts_count, 1
+        )
+        self.assertTrue(
+            UserCounters.objects.filter(user=self.reader).exists()
+        )
+
+    def test_drifted_counter_stays_non_negative(self):
+        """Удаление при обнулившемся счётчике не ломается о CHECK."""
+        get_counters(User.objects.get(username='author'))
+        UserCounters.objects.filter(user=self.author).update(posts_count=0)
+        Post.objects.get(pk=self.post.pk).delete()
+        self.assertEqual(
+            UserCounters.objects.get(user=self.author).posts_count, 0
+        )
+
+    def test_profile_renders_without_count_queries(self):
+        """Профиль и пост показывают счётчики без COUNT(*)."""
+        get_counters(User.objects.get(username='author'))
+        urls_queries = {
+            reverse('posts:profile', kwargs={'username': 'author'}): 3,
+            reverse(
+                'posts:post_detail', kwargs={'post_id': self.post.pk}
+            ): 3,
+        }
+        for url, queries_count in urls_queries.items():
+            with self.subTest(url=url):
+                with self.assertNumQueries(queries_count) as queries:
+                    self.guest_user.get(url)
+                for query in queries.captured_queries:
+                    self.assertNotIn('COUNT(', query['sql'])
+
+
+class PostCommentSummaryTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.post = Post.objects.create(
+            text='Тестовый пост',
+            author=cls.author,
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.guest_user = Client()
+
+    def comment(self, text, author=None):
+        return Comment.objects.create(
+            post=self.post, author=author or self.reader, text=text
+        )
+
+    def summary(self):
+        post = Post.objects.get(pk=self.post.pk)
+        return (
+            post.comments_count,
+            post.last_comment_author,
+            post.last_comment_text,
+        )
+
+    def test_summary_follows_comment_signals(self):
+        """Число и последний комментарий меняются вместе с комментариями."""
+        first = self.comment('Первый')
+        last = self.comment('Второй', author=self.author)
+        self.assertEqual(self.summary(), (2, 'author', 'Второй'))
+        last.delete()
+        self.assertEqual(self.summary(), (1, 'reader', 'Первый'))
+        first.text = 'Исправленный'
+        first.save()
+        self.assertEqual(self.summary(), (1, 'reader', 'Исправленный'))
+        first.delete()
+        self.assertEqual(self.summary(), (0, '', ''))
+
+    def test_long_comment_is_truncated(self):
+        """В сводку попадает начало длинного комментария."""
+        self.comment('а' * 500)
+        _, _, text = self.summary()
+        self.assertEqual(len(text), LAST_COMMENT_LENGTH)
+
+    def test_backfill_matches_signals(self):
+        """Миграция заполняет сводку так же, как сигналы."""
+        self.comment('Короткий', author=self.author)
+        self.comment('а' * 500)
+        expected = self.summary()
+        Post.objects.update(
+            comments_count=0, last_comment_text='', last_comment_author=''
+        )
+        migration = import_module('posts.migrations.0016_post_comment_summary')
+        migration.fill_comment_summary(apps, None)
+        self.assertEqual(self.summary(), expected)
+
+    def test_post_edit_keeps_summary(self):
+        """Правка поста не затирает сводку устаревшими значениями."""
+        post = Post.objects.get(pk=self.post.pk)
+        self.comment('Комментарий')
+        post.text = 'Правка'
+        post.save()
+        self.assertEqual(self.summary(), (1, 'reader', 'Комментарий'))
+
+    def test_feed_shows_summary_without_queries(self):
+        """Лента показывает комментарии без дополнительных запросов."""
+        url = reverse('posts:index')
+        with CaptureQueriesContext(connection) as before:
+            self.guest_user.get(url)
+        self.comment('Комментарий в ленте')
+        cache.clear()
+        with self.assertNumQueries(len(before)):
+            response = self.guest_user.get(url)
+        self.assertContains(response, 'Комментариев: 1')
+        self.assertContains(response, 'Комментарий в ленте')
+
+    def test_reconcile_command_fixes_drift(self):
+        """Команда reconcile_counters пересчитывает сводки постов."""
+        self.comment('Первый')
+        Post.objects.filter(pk=self.post.pk).update(
+            comments_count=7, last_comment_text='', last_comment_author=''
+        )
+        call_command('reconcile_counters', stdout=StringIO())
+        self.assertEqual(self.summary(), (1, 'reader', 'Первый'))
@@ -0,0 +1,116 @@
+import csv
+import io
+import json
+import os
+import tempfile
+from http import HTTPStatus
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from ..models import Comment, Follow, Group, Post
+
+User = get_user_model()
+
+
+class ExportTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.staff = User.objects.create_user(username='staff', is_staff=True)
+        cls.group = Group.objects.create(
+            title='Группа', slug='group', description='Описание'
+        )
+        cls.posts = Post.objects.bulk_create([
+            Post(text=f'Пост {i}', author=cls.author, group=cls.group)
+            for i in range(5)
+        ])
+        cls.post = Post.objects.order_by('pk').first()
+        Comment.objects.create(post=cls.post, author=cls.staff, text='Да')
+        Follow.objects.create(user=cls.staff, author=cls.author)
+
+    def setUp(self):
+        self.staff_client = Client()
+        self.staff_client.force_login(self.staff)
+
+    def export(self, model, **options):
+        out = io.StringIO()
+        call_command('export_data', model, stdout=out, **options)
+        return out.getvalue()
+
+    def test_command_exports_ndjson_and_resumes(self):
+        """Команда выгружает NDJSON и продолжает с переданного id."""
+        rows = [
+            json.loads(line) for line in self.export('post').splitlines()
+        ]
+        self.assertEqual(len(rows), 5)
+        self.assertEqual(rows[0]['text'], 'Пост 0')
+        self.assertEqual(rows[0]['group_id'], self.group.pk)
+        rest = self.export('post', after=rows[2]['id'], chunk_size=1)
+        self.assertEqual(
+            [json.loads(line)['id'] for line in rest.splitlines()],
+            [row['id'] for row in rows[3:]],
+        )
+
+    def test_command_exports_csv(self):
+        """CSV начинается с заголовков, продолжение выгрузки — без них."""
+        output = self.export('follow', format='csv')
+        rows = list(csv.reader(io.StringIO(output)))
+        self.assertEqual(rows[0], ['id', 'user_id', 'author_id'])
+        self.assertEqual(
+            rows[1][1:], [str(self.staff.pk), str(self.author.pk)]
+        )
+        rest = self.export('comment', format='csv', after=0)
+        self.assertEqual(len(list(csv.reader(io.StringIO(rest)))), 1)
+
+    def test_resume_from_zero_appends(self):
+        """--after 0 дописывает файл без заголовков, как любой другой id."""
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'follows.csv')
+            self.export('follow', format='csv', output=path)
+            self.export('follow', format='csv', after=0, output=path)
+            with open(path, encoding='utf-8', newline='') as output:
+                rows = list(csv.reader(output))
+        self.assertEqual(rows[0], ['id', 'user_id', 'author_id'])
+        self.assertEqual(len(rows), 3)
+        self.assertEqual(rows[1], rows[2])
+
+    def test_export_endpoint_is_staff_only(self):
+        """Выгрузка по HTTP доступна только персоналу."""
+        url = reverse('posts:export', kwargs={'model': 'post'})
+        reader = Client()
+        reader.force_login(self.author)
+        for client in (Client(), reader):
+            with self.subTest(client=client):
+                response = client.get(url)
+                self.assertEqual(response.status_code, HTTPStatus.FOUND)
+                self.assertIn(reverse('admin:login'), response.url)
+        response = self.staff_client.get(
+            reverse('posts:export', kwargs={'model': 'user'})
+        )
+        self.assertEqual(response.status_code, HTTPStatus.NOT_FOUND)
+
+    def test_export_endpoint_streams(self):
+        """Эндпоинт отдаёт потоковый ответ с учётом формата и курсора."""
+        response = self.staff_client.get(
+            reverse('posts:export', kwargs={'model': 'post'}),
+            {'after': self.post.pk},
+        )
+        self.assertTrue(response.streaming)
+        self.assertEqual(
+            response['Content-Type'], 'application/x-ndjson; charset=utf-8'
+        )
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        self.assertEqual(len(lines), 4)
+        response = self.staff_client.get(
+            reverse('posts:export', kwargs={'model': 'group'}),
+            {'format': 'csv'},
+        )
+        self.assertEqual(
+            b''.join(response.streaming_content).decode(),
+            'id,title,slug,description\r\n'
+            f'{self.group.pk},Группа,group,Описание\r\n',
+        )
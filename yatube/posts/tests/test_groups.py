@@ -0,0 +1,193 @@
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from ..counters import reconcile_group_stats
+from ..models import Group, GroupAuthor, GroupStats, Post
+
+User = get_user_model()
+
+
+class GroupStatsTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.second_author = User.objects.create_user(username='second')
+        cls.group = Group.objects.create(
+            title='Первая группа',
+            slug='first',
+            description='Описание',
+        )
+        cls.other_group = Group.objects.create(
+            title='Вторая группа',
+            slug='second',
+            description='Описание',
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.guest_user = Client()
+
+    def stats(self, group):
+        return GroupStats.objects.get(group=group)
+
+    def test_stats_follow_post_signals(self):
+        """Сводка группы меняется при публикации, переносе и удалении."""
+        self.assertEqual(self.stats(self.group).posts_count, 0)
+        first = Post.objects.create(
+            text='Первый', author=self.author, group=self.group
+        )
+        second = Post.objects.create(
+            text='Второй', author=self.second_author, group=self.group
+        )
+        stats = self.stats(self.group)
+        self.assertEqual(stats.posts_count, 2)
+        self.assertEqual(stats.authors_count, 2)
+        self.assertEqual(stats.last_post_date, second.pub_date)
+        second.group = self.other_group
+        second.save()
+        stats = self.stats(self.group)
+        self.assertEqual(stats.posts_count, 1)
+        self.assertEqual(stats.authors_count, 1)
+        self.assertEqual(stats.last_post_date, first.pub_date)
+        other = self.stats(self.other_group)
+        self.assertEqual(other.posts_count, 1)
+        self.assertEqual(other.authors_count, 1)
+        first.delete()
+        stats = self.stats(self.group)
+        self.assertEqual(stats.posts_count, 0)
+        self.assertEqual(stats.authors_count, 0)
+        self.assertIsNone(stats.last_post_date)
+        self.assertFalse(
+            GroupAuthor.objects.filter(group=self.group).exists()
+        )
+
+    def test_editing_post_keeps_stats(self):
+        """Правка поста без смены группы не меняет сводку."""
+        post = Post.objects.create(
+            text='Пост', author=self.author, group=self.group
+        )
+        post.text = 'Правка'
+        post.save()
+        stats = self.stats(self.group)
+        self.assertEqual(stats.posts_count, 1)
+        self.assertEqual(stats.authors_count, 1)
+
+    def test_saving_post_does_not_reread_group(self):
+        """Прежняя группа берётся из загруженного поста, а не SELECT."""
+        with CaptureQueriesContext(connection) as queries:
+            post = Post.objects.create(
+                text='Пост', author=self.author, group=self.group
+            )
+            post = Post.objects.get(pk=post.pk)
+            post.group = self.other_group
+            post.save()
+        for query in queries.captured_queries:
+            self.assertNotIn('SELECT "posts_post"."group_id"', query['sql'])
+        self.assertEqual(self.stats(self.group).posts_count, 0)
+        self.assertEqual(self.stats(self.other_group).posts_count, 1)
+
+    def test_post_edit_moves_post_between_groups(self):
+        post = Post.objects.create(
+            text='Пост', author=self.author, group=self.group
+        )
+        client = Client()
+        client.force_login(self.author)
+        client.post(
+            reverse('posts:post_edit', kwargs={'post_id': post.pk}),
+            {'text': 'Правка', 'group': self.other_group.pk},
+        )
+        self.assertEqual(self.stats(self.group).posts_count, 0)
+        self.assertEqual(self.stats(self.other_group).posts_count, 1)
+
+    def test_reconcile_command_fixes_drift(self):
+        """Команда reconcile_counters пересчитывает сводки групп."""
+        post = Post.objects.create(
+            text='Пост', author=self.author, group=self.group
+        )
+        Post.objects.bulk_create([Post(
+            text='Мимо сигналов',
+            author=self.second_author,
+            group=self.group,
+        )])
+        Post.objects.filter(author=self.second_author).update(
+            pub_date=post.pub_date + timedelta(days=1)
+        )
+        GroupStats.objects.filter(group=self.other_group).delete()
+        call_command('reconcile_counters', stdout=StringIO())
+        stats = self.stats(self.group)
+        self.assertEqual(stats.posts_count, 2)
+        self.assertEqual(stats.authors_count, 2)
+        self.assertEqual(
+            stats.last_post_date, post.pub_date + timedelta(days=1)
+        )
+        self.assertEqual(self.stats(self.other_group).posts_count, 0)
+
+    def test_failed_reconcile_keeps_stats(self):
+        """Сбой посреди пересчёта не оставляет сводки стёртыми."""
+        Post.objects.create(text='Пост', author=self.author, group=self.group)
+        with mock.patch.object(
+            GroupAuthor.objects, 'bulk_create', side_effect=RuntimeError
+        ):
+            with self.assertRaises(RuntimeError):
+                reconcile_group_stats()
+        self.assertTrue(
+            GroupAuthor.objects.filter(group=self.group).exists()
+        )
+
+    def test_group_index_shows_groups_by_activity(self):
+        """Каталог групп упорядочен по дате последней записи."""
+        Post.objects.create(
+            text='Пост', author=self.author, group=self.other_group
+        )
+        response = self.guest_user.get(reverse('posts:group_index'))
+        self.assertEqual(
+            [stats.group for stats in response.context['page_obj']],
+            [self.other_group, self.group],
+        )
+        self.assertContains(response, 'Записей: 1')
+
+    def test_group_index_does_not_aggregate_posts(self):
+        """Каталог читает сводки и не агрегирует таблицу постов."""
+        Post.objects.create(
+            text='Пост', author=self.author, group=self.group
+        )
+        with CaptureQueriesContext(connection) as queries:
+            self.guest_user.get(reverse('posts:group_index'))
+        posts_table = Post._meta.db_table
+        for query in queries.captured_queries:
+            with self.subTest(sql=query['sql']):
+                self.assertNotIn(posts_table, query['sql'])
+
+    def test_group_index_is_cached(self):
+        """Повторный показ каталога берётся из кеша до новой записи."""
+        url = reverse('posts:group_index')
+        self.guest_user.get(url)
+        with self.assertNumQueries(1):
+            response = self.guest_user.get(url)
+        self.assertContains(response, 'Первая группа')
+        Post.objects.create(
+            text='Пост', author=self.author, group=self.group,
+        )
+        response = self.guest_user.get(url)
+        self.assertContains(response, 'Записей: 1')
+
+    def test_new_group_gets_stats(self):
+        """У новой группы сразу появляется пустая сводка."""
+        group = Group.objects.create(
+            title='Новая', slug='new', description='Описание'
+        )
+        stats = self.stats(group)
+        self.assertEqual(
+            (stats.posts_count, stats.authors_count, stats.last_post_date),
+            (0, 0, None),
+        )
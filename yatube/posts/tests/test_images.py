@@ -0,0 +1,168 @@
+import shutil
+import tempfile
+from io import BytesIO, StringIO
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import (
+    Client,
+    SimpleTestCase,
+    TransactionTestCase,
+    override_settings,
+)
+from django.urls import reverse
+from PIL import Image
+from sorl.thumbnail import default
+
+from ..forms import PostForm
+from ..images import process_image
+from ..models import Post
+from ..thumbnails import lookup_thumbnail, wait_for_thumbnails
+
+User = get_user_model()
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+ORIENTATION = 0x0112
+ROTATED_90 = 6
+
+
+def make_image(image_format='JPEG', size=(4000, 1000), exif=True):
+    image = Image.new('RGB', size, color=(200, 30, 30))
+    buffer = BytesIO()
+    options = {}
+    if exif:
+        data = Image.Exif()
+        data[ORIENTATION] = ROTATED_90
+        options['exif'] = data.tobytes()
+    image.save(buffer, image_format, **options)
+    return buffer.getvalue()
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class ProcessImageTests(SimpleTestCase):
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def test_image_is_rotated_capped_and_stripped(self):
+        """Картинка поворачивается по EXIF, уменьшается и теряет EXIF."""
+        name = default_storage.save('posts/photo.jpg', ContentFile(
+            make_image()
+        ))
+        new_name = process_image(name)
+        self.assertEqual(new_name, 'posts/photo.webp')
+        with default_storage.open(new_name) as file:
+            image = Image.open(file)
+            self.assertEqual(image.format, 'WEBP')
+            self.assertEqual(image.size, (480, 1920))
+            self.assertFalse(image.getexif())
+        self.assertLess(
+            default_storage.size(new_name), default_storage.size(name)
+        )
+
+    @override_settings(POST_IMAGE_PROCESSING={
+        **settings.POST_IMAGE_PROCESSING, 'FORMAT': 'JPEG',
+    })
+    def test_progressive_jpeg(self):
+        name = default_storage.save('posts/small.png', ContentFile(
+            make_image('PNG', size=(100, 50), exif=False)
+        ))
+        with default_storage.open(process_image(name)) as file:
+            image = Image.open(file)
+            self.assertEqual(image.format, 'JPEG')
+            self.assertEqual(image.size, (100, 50))
+            self.assertTrue(image.info.get('progressive'))
+
+    def test_gif_is_skipped(self):
+        """GIF не пережимается, чтобы не потерять анимацию."""
+        name = default_storage.save('posts/anim.gif', ContentFile(
+            make_image('GIF', size=(10, 10), exif=False)
+        ))
+        self.assertIsNone(process_image(name))
+
+    @override_settings(POST_IMAGE_MAX_UPLOAD_SIZE=100)
+    def test_form_rejects_large_upload(self):
+        form = PostForm(
+            data={'text': 'Пост'},
+            files={'image': SimpleUploadedFile(
+                'big.png', make_image('PNG', size=(100, 100), exif=False),
+                content_type='image/png',
+            )},
+        )
+        self.assertFalse(form.is_valid())
+        self.assertIn('image', form.errors)
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class UploadPipelineTests(TransactionTestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='author')
+        self.client = Client()
+        self.client.force_login(self.user)
+
+    def tearDown(self):
+        wait_for_thumbnails()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def create_post(self):
+        self.client.post(reverse('posts:post_create'), {
+            'text': 'Пост с фото',
+            'image': SimpleUploadedFile(
+                'upload.jpg', make_image(), content_type='image/jpeg'
+            ),
+        })
+        wait_for_thumbnails()
+        return Post.objects.get(text='Пост с фото')
+
+    def test_upload_is_replaced_after_response(self):
+        """После ответа пост ссылается на пережатую картинку."""
+        post = self.create_post()
+        self.assertTrue(post.image.name.endswith('.webp'))
+        self.assertFalse(default_storage.exists('posts/upload.jpg'))
+        self.assertIsNotNone(lookup_thumbnail(post.image, 'feed'))
+
+    @override_settings(POST_IMAGE_PROCESSING={
+        **settings.POST_IMAGE_PROCESSING, 'KEEP_ORIGINAL': True,
+    })
+    def test_original_is_kept_when_configured(self):
+        post = self.create_post()
+        self.assertTrue(post.image.name.endswith('.webp'))
+        self.assertTrue(default_storage.exists('posts/upload.jpg'))
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class GenerateThumbnailsTests(TransactionTestCase):
+    def setUp(self):
+        name = default_storage.save(
+            'posts/old.jpg', ContentFile(make_image(exif=False))
+        )
+        self.post = Post.objects.create(
+            text='Старый пост',
+            author=User.objects.create_user(username='author'),
+            image=name,
+        )
+
+    def tearDown(self):
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def test_generates_missing_thumbnails(self):
+        """Команда создаёт миниатюры и с пулом, и без потоков."""
+        for workers in (0, 2):
+            with self.subTest(workers=workers):
+                default.kvstore.clear()
+                self.assertIsNone(lookup_thumbnail(self.post.image, 'feed'))
+                out = StringIO()
+                call_command(
+                    'generate_thumbnails', workers=workers, stdout=out
+                )
+                self.assertIn('Обработано картинок: 1', out.getvalue())
+                for size in settings.POST_THUMBNAILS:
+                    self.assertIsNotNone(
+                        lookup_thumbnail(self.post.image, size)
+                    )
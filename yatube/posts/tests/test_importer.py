@@ -0,0 +1,147 @@
+import json
+from datetime import datetime, timezone
+from http import HTTPStatus
+from io import StringIO
+from tempfile import NamedTemporaryFile
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from ..counters import get_counters
+from ..models import FeedEntry, Follow, Group, Post
+from ..search import get_search_backend
+
+User = get_user_model()
+
+
+def ndjson(rows):
+    return ''.join(
+        (row if isinstance(row, str) else json.dumps(row)) + '\n'
+        for row in rows
+    )
+
+
+class PostImporterTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.staff = User.objects.create_user(username='staff', is_staff=True)
+        cls.group = Group.objects.create(
+            title='Группа', slug='group', description='Описание'
+        )
+        Follow.objects.create(user=cls.reader, author=cls.author)
+
+    def setUp(self):
+        self.staff_client = Client()
+        self.staff_client.force_login(self.staff)
+
+    def import_file(self, rows, **options):
+        out = StringIO()
+        with NamedTemporaryFile('w', suffix='.ndjson') as file:
+            file.write(ndjson(rows))
+            file.flush()
+            call_command(
+                'import_posts', file.name, stdout=out, stderr=out, **options
+            )
+        return out.getvalue()
+
+    def test_command_imports_posts_in_batches(self):
+        """Команда загружает посты пачками и обновляет производные данные."""
+        get_counters(User.objects.get(username='author'))
+        rows = [
+            {'text': f'Импорт {i}', 'author': 'author', 'group': 'group'}
+            for i in range(5)
+        ]
+        rows.append({
+            'text': 'Старый пост',
+            'author': 'author',
+            'pub_date': '2015-03-01T10:00:00',
+        })
+        output = self.import_file(rows, batch_size=2, skip_images=True)
+        self.assertIn('Загружено постов: 6', output)
+        self.assertEqual(output.count('постов/с'), 4)
+        self.assertEqual(
+            Post.objects.filter(group=self.group, author=self.author).count(),
+            5,
+        )
+        old = Post.objects.get(text='Старый пост')
+        self.assertEqual(
+            old.pub_date, datetime(2015, 3, 1, 10, tzinfo=timezone.utc)
+        )
+        self.assertEqual(
+            FeedEntry.objects.get(user=self.reader, post=old).pub_date,
+            old.pub_date,
+        )
+        self.assertEqual(
+            FeedEntry.objects.filter(user=self.reader).count(), 6
+        )
+        self.assertEqual(
+            User.objects.get(username='author').counters.posts_count, 6
+        )
+        self.assertEqual(
+            get_search_backend().search_posts('импорт').count(), 5
+        )
+
+    def test_command_reports_rejected_rows(self):
+        """Битые строки отклоняются, не мешая остальным."""
+        output = self.import_file([
+            {'text': 'Хороший пост', 'author': 'author'},
+            'не json',
+            {'text': 'Без автора', 'author': 'nobody'},
+            {'text': 'Чужая группа', 'author': 'author', 'group': 'nope'},
+            {'text': '', 'author': 'author'},
+            {'text': 'Плохая дата', 'author': 'author', 'pub_date': 'вчера'},
+        ])
+        self.assertIn('отклонено строк: 5', output)
+        self.assertIn('строка 2: некорректный JSON', output)
+        self.assertIn("строка 3: неизвестный автор 'nobody'", output)
+        self.assertEqual(Post.objects.count(), 1)
+
+    def test_command_rejects_non_string_fields(self):
+        """Списки и словари вместо строк отклоняются построчно."""
+        output = self.import_file([
+            {'text': 'Автор списком', 'author': ['author']},
+            {'text': 'Группа словарём', 'author': 'author', 'group': {}},
+            {'text': 'Картинка числом', 'author': 'author', 'image': 1},
+            {'text': 'Хороший пост', 'author': 'author'},
+        ], skip_images=True)
+        self.assertIn('отклонено строк: 3', output)
+        self.assertIn('строка 1: поле author должно быть строкой', output)
+        self.assertIn('строка 2: поле group должно быть строкой', output)
+        self.assertIn('строка 3: поле image должно быть строкой', output)
+        self.assertEqual(Post.objects.count(), 1)
+
+    def test_import_endpoint_is_staff_only(self):
+        """Загрузка по HTTP доступна только персоналу и только POST."""
+        url = reverse('posts:import_posts')
+        reader = Client()
+        reader.force_login(self.reader)
+        response = reader.post(
+            url, ndjson([]), content_type='application/x-ndjson'
+        )
+        self.assertEqual(response.status_code, HTTPStatus.FOUND)
+        self.assertEqual(
+            self.staff_client.get(url).status_code,
+            HTTPStatus.METHOD_NOT_ALLOWED,
+        )
+
+    def test_import_endpoint_streams_ndjson(self):
+        """Эндпоинт разбирает тело запроса построчно и возвращает отчёт."""
+        response = self.staff_client.post(
+            f'{reverse("posts:import_posts")}?batch_size=2',
+            ndjson([
+                {'text': f'Пост {i}', 'author': 'reader', 'group': 'group'}
+                for i in range(3)
+            ] + ['{', {'text': 'Пост', 'author': {'name': 'reader'}}]),
+            content_type='application/x-ndjson',
+        )
+        report = response.json()
+        self.assertEqual(report['read'], 5)
+        self.assertEqual(report['imported'], 3)
+        self.assertEqual(report['skipped'], 2)
+        self.assertIn('posts_per_second', report)
+        self.assertEqual(self.group.posts.count(), 3)
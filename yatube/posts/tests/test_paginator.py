@@ -0,0 +1,93 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from ..models import Follow, Post
+from ..utils import FeedPaginator, page_window
+
+User = get_user_model()
+
+
+@override_settings(POST_COUNT=2, PAGE_WINDOW=1)
+class FeedPaginatorTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+        Follow.objects.create(user=cls.reader, author=cls.author)
+        for number in range(21):
+            Post.objects.create(text=f'Пост {number}', author=cls.author)
+
+    def setUp(self):
+        cache.clear()
+        self.guest_user = Client()
+        self.reader_client = Client()
+        self.reader_client.force_login(self.reader)
+
+    def test_has_next_mode_fetches_one_extra_row(self):
+        """Без числа записей страница выбирается одним запросом."""
+        paginator = FeedPaginator(Post.objects.order_by('pk'), 2)
+        with self.assertNumQueries(1) as queries:
+            page = paginator.page(3)
+        self.assertNotIn('COUNT(', queries.captured_queries[0]['sql'])
+        self.assertEqual(len(page), 2)
+        self.assertTrue(page.has_next())
+        self.assertEqual(page.end_index(), 6)
+        last = paginator.page(11)
+        self.assertFalse(last.has_next())
+        self.assertEqual(last.end_index(), 21)
+        self.assertEqual(paginator.get_page(100).number, 11)
+
+    def test_count_is_cached(self):
+        """Число записей считается один раз на ключ кеша."""
+        with self.assertNumQueries(1):
+            FeedPaginator(Post.objects.all(), 2, count_key='count').count
+        with self.assertNumQueries(0):
+            paginator = FeedPaginator(
+                Post.objects.all(), 2, count_key='count'
+            )
+            self.assertEqual(paginator.num_pages, 11)
+
+    def test_page_window(self):
+        """Окно страниц: края и соседи текущей, пропуски — None."""
+        paginator = FeedPaginator(Post.objects.all(), 2, count=21)
+        windows = {
+            1: [1, 2, None, 11],
+            5: [1, None, 4, 5, 6, None, 11],
+            11: [1, None, 10, 11],
+        }
+        for number, window in windows.items():
+            with self.subTest(number=number):
+                self.assertEqual(
+                    page_window(paginator.page(number)), window
+                )
+        has_next = FeedPaginator(Post.objects.all(), 2)
+        self.assertEqual(page_window(has_next.page(5)), [1, None, 4, 5, 6])
+
+    def test_index_counts_once_per_feed_version(self):
+        """Главная не выполняет COUNT(*), пока лента не изменилась."""
+        url = reverse('posts:index')
+        self.guest_user.get(url)
+        response = self.guest_user.get(f'{url}?page=5')
+        self.assertContains(response, '?page=11')
+        self.assertNotContains(response, '?page=8"')
+        with self.assertNumQueries(2) as queries:
+            self.guest_user.get(f'{url}?page=6')
+        for query in queries.captured_queries:
+            self.assertNotIn('COUNT(', query['sql'])
+        Post.objects.create(text='Новый пост', author=self.author)
+        response = self.guest_user.get(f'{url}?page=12')
+        self.assertEqual(response.context['page_obj'].number, 11)
+
+    def test_follow_index_without_count(self):
+        """Лента подписок листается без COUNT(*) и ссылки на последнюю."""
+        url = reverse('posts:follow_index')
+        # Сессия, пользователь, страница ленты и рекомендации авторов.
+        with self.assertNumQueries(4) as queries:
+            response = self.reader_client.get(f'{url}?page=3')
+        for query in queries.captured_queries:
+            self.assertNotIn('COUNT(', query['sql'])
+        self.assertContains(response, '?page=4')
+        self.assertNotContains(response, 'Последняя')
@@ -0,0 +1,92 @@
+from unittest import skipUnless
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from ..models import Comment, Follow, Group, Post
+
+User = get_user_model()
+
+
+@skipUnless(connection.vendor == 'sqlite', 'EXPLAIN QUERY PLAN есть в SQLite')
+class FeedQueryPlanTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Тестовое описание',
+        )
+        Follow.objects.create(user=cls.reader, author=cls.author)
+        Follow.objects.create(
+            user=User.objects.create_user(username='another_reader'),
+            author=cls.author,
+        )
+        cls.post = Post.objects.create(
+            text='Тестовый пост',
+            author=cls.author,
+            group=cls.group,
+        )
+        Comment.objects.create(
+            post=cls.post,
+            author=cls.reader,
+            text='Тестовый комментарий',
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.reader_client = Client()
+        self.reader_client.force_login(self.reader)
+
+    def feed_queries(self, fetch):
+        """Собирает SQL-запросы к постам и комментариям."""
+        with CaptureQueriesContext(connection) as queries:
+            fetch()
+        return [
+            query['sql'] for query in queries.captured_queries
+            if query['sql'].startswith('SELECT')
+            and ('FROM "posts_post"' in query['sql']
+                 or 'FROM "posts_comment"' in query['sql'])
+            and 'COUNT(' not in query['sql']
+        ]
+
+    def assert_no_temp_sort(self, sql):
+        with connection.cursor() as cursor:
+            cursor.execute(f'EXPLAIN QUERY PLAN {sql}')
+            plan = ' '.join(str(row[-1]) for row in cursor.fetchall())
+        self.assertNotIn('TEMP B-TREE', plan, f'{sql}\n{plan}')
+
+    def test_feeds_are_read_in_index_order(self):
+        """Ленты и комментарии читаются по индексу без сортировки."""
+        urls = (
+            reverse('posts:index'),
+            reverse('posts:index') + '?cursor=',
+            reverse('posts:group_list', kwargs={'slug': self.group.slug}),
+            reverse('posts:profile', kwargs={'username': 'author'}),
+            reverse('posts:follow_index'),
+        )
+        urls += tuple(f'{url}?cursor=' for url in urls[2:])
+        for url in urls:
+            with self.subTest(url=url):
+                queries = self.feed_queries(
+                    lambda: self.reader_client.get(url)
+                )
+                self.assertTrue(queries)
+                for sql in queries:
+                    self.assert_no_temp_sort(sql)
+
+    def test_comments_are_read_in_index_order(self):
+        """Комментарии к посту читаются по индексу без сортировки."""
+        queries = self.feed_queries(
+            lambda: list(self.post.comments.select_related('author'))
+        )
+        self.assertTrue(queries)
+        for sql in queries:
+            self.assert_no_temp_sort(sql)
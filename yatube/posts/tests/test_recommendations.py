@@ -0,0 +1,148 @@
+from io import StringIO
+from unittest import mock, skipIf
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from .. import recommendations
+from ..models import Follow, FollowSuggestion
+from ..recommendations import build_suggestions, get_suggestions
+
+User = get_user_model()
+
+
+class FollowSuggestionTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.reader, cls.friend, cls.popular, cls.niche, cls.fan = (
+            User.objects.create_user(username=username)
+            for username in ('reader', 'friend', 'popular', 'niche', 'fan')
+        )
+        for user, author in (
+            (cls.reader, cls.friend),
+            (cls.friend, cls.popular),
+            (cls.friend, cls.niche),
+            (cls.fan, cls.friend),
+            (cls.fan, cls.popular),
+        ):
+            Follow.objects.create(user=user, author=author)
+
+    def setUp(self):
+        cache.clear()
+        self.reader_client = Client()
+        self.reader_client.force_login(self.reader)
+
+    def suggestions(self, user):
+        return list(FollowSuggestion.objects.filter(
+            user=user
+        ).values_list('author__username', 'score'))
+
+    def test_friends_of_friends_ranked_by_cofollow(self):
+        """Авторы друга ранжируются по общим подписчикам."""
+        build_suggestions(vectorized=False)
+        names = [name for name, _ in self.suggestions(self.reader)]
+        self.assertEqual(names, ['popular', 'niche'])
+
+    def test_followed_authors_and_self_are_skipped(self):
+        """В рекомендациях нет себя и авторов, на которых уже подписан."""
+        build_suggestions(vectorized=False)
+        for user in User.objects.all():
+            followed = set(user.follower.values_list('author', flat=True))
+            suggested = set(user.follow_suggestions.values_list(
+                'author', flat=True
+            ))
+            with self.subTest(user=user.username):
+                self.assertNotIn(user.pk, suggested)
+                self.assertFalse(followed & suggested)
+
+    @skipIf(recommendations.np is None, 'нужны NumPy и SciPy')
+    def test_vectorized_matches_python(self):
+        """Матричный расчёт даёт те же оценки, что и расчёт на словарях."""
+        build_suggestions(vectorized=False)
+        expected = {
+            user.pk: self.suggestions(user) for user in User.objects.all()
+        }
+        for products in (1, 3, 10 ** 7):
+            options = {
+                **settings.FOLLOW_SUGGESTIONS, 'BLOCK_PRODUCTS': products,
+            }
+            with self.settings(FOLLOW_SUGGESTIONS=options):
+                build_suggestions(vectorized=True)
+            for user in User.objects.all():
+                actual = self.suggestions(user)
+                with self.subTest(products=products, user=user.username):
+                    self.assertEqual(
+                        [name for name, _ in actual],
+                        [name for name, _ in expected[user.pk]],
+                    )
+                    for (_, score), (_, expected_score) in zip(
+                        actual, expected[user.pk]
+                    ):
+                        self.assertAlmostEqual(score, expected_score)
+
+    def test_follows_without_author_are_ignored(self):
+        """Подписка без автора не ломает пересчёт."""
+        Follow.objects.create(user=self.reader, author=None)
+        modes = [False]
+        if recommendations.np is not None:
+            modes.append(True)
+        for vectorized in modes:
+            with self.subTest(vectorized=vectorized):
+                build_suggestions(vectorized=vectorized)
+                names = [name for name, _ in self.suggestions(self.reader)]
+                self.assertEqual(names, ['popular', 'niche'])
+
+    def test_rebuild_drops_stale_suggestions(self):
+        """Пересчёт удаляет рекомендации пользователей вне графа."""
+        build_suggestions(vectorized=False, batch_size=1)
+        self.assertTrue(self.suggestions(self.reader))
+        Follow.objects.filter(user=self.reader).delete()
+        build_suggestions(vectorized=False, batch_size=1)
+        self.assertEqual(self.suggestions(self.reader), [])
+
+    def test_follow_removes_suggestion(self):
+        """Подписка убирает автора из рекомендаций сразу."""
+        build_suggestions(vectorized=False)
+        Follow.objects.create(user=self.reader, author=self.popular)
+        names = [name for name, _ in self.suggestions(self.reader)]
+        self.assertNotIn('popular', names)
+
+    def test_pages_show_suggestions(self):
+        """Профиль и лента подписок показывают рекомендации."""
+        build_suggestions(vectorized=False)
+        urls = (
+            reverse('posts:profile', kwargs={'username': 'friend'}),
+            reverse('posts:follow_index'),
+        )
+        for url in urls:
+            with self.subTest(url=url):
+                response = self.reader_client.get(url)
+                self.assertEqual(
+                    [s.author for s in response.context['suggestions']],
+                    [self.popular, self.niche],
+                )
+                self.assertContains(response, 'На кого подписаться')
+
+    def test_guest_gets_no_suggestions(self):
+        """Гостю рекомендации не показываются и не запрашиваются."""
+        build_suggestions(vectorized=False)
+        with self.assertNumQueries(0):
+            self.assertEqual(get_suggestions(AnonymousUser()), [])
+
+    def test_command_builds_suggestions(self):
+        """Команда build_follow_suggestions сохраняет рекомендации."""
+        call_command('build_follow_suggestions', stdout=StringIO())
+        self.assertTrue(FollowSuggestion.objects.exists())
+
+    def test_without_numpy_uses_dict_fallback(self):
+        """Без NumPy и SciPy пересчёт идёт на словарях."""
+        with mock.patch.object(recommendations, 'np', None):
+            build_suggestions()
+        names = [name for name, _ in self.suggestions(self.reader)]
+        self.assertEqual(names, ['popular', 'niche'])
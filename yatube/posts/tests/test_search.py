@@ -0,0 +1,95 @@
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from ..models import Comment, Post
+from ..search import get_search_backend
+
+User = get_user_model()
+
+
+class SearchTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.admin = User.objects.create_superuser(
+            username='admin', email='admin@example.com', password='pass'
+        )
+        cls.post = Post.objects.create(
+            text='Заметки о путешествии на Байкал',
+            author=cls.author,
+        )
+        cls.commented = Post.objects.create(
+            text='Фотографии без подписи',
+            author=cls.author,
+        )
+        cls.comment = Comment.objects.create(
+            post=cls.commented,
+            author=cls.author,
+            text='Красивый вид на Байкал',
+        )
+        cls.search_url = reverse('posts:search')
+
+    def setUp(self):
+        self.guest_user = Client()
+
+    def search(self, query, **params):
+        response = self.guest_user.get(self.search_url, {'q': query, **params})
+        return response, list(response.context['page_obj'])
+
+    def test_search_finds_posts_and_comments(self):
+        """Поиск находит посты по тексту поста и комментариев к нему."""
+        _, posts = self.search('байкал')
+        self.assertEqual(set(posts), {self.post, self.commented})
+        _, posts = self.search('путешествии байкал')
+        self.assertEqual(posts, [self.post])
+        _, posts = self.search('нет такого')
+        self.assertEqual(posts, [])
+
+    def test_search_ranks_and_paginates(self):
+        """Результаты упорядочены по релевантности и разбиты на страницы."""
+        Post.objects.bulk_create([
+            Post(text=f'Пост {i} про море', author=self.author)
+            for i in range(settings.POST_COUNT + 2)
+        ])
+        get_search_backend().rebuild()
+        exact = Post.objects.create(text='море море море', author=self.author)
+        response, posts = self.search('море')
+        self.assertEqual(posts[0], exact)
+        self.assertEqual(len(posts), settings.POST_COUNT)
+        self.assertContains(response, '?page=2&amp;q=%D0%BC%D0%BE%D1%80%D0%B5')
+        _, rest = self.search('море', page=2)
+        self.assertEqual(len(rest), 3)
+
+    def test_index_follows_edits_and_deletes(self):
+        """Индекс обновляется при правке и удалении постов и комментариев."""
+        post = Post.objects.get(pk=self.post.pk)
+        post.text = 'Заметки о поездке в горы'
+        post.save()
+        _, posts = self.search('байкал')
+        self.assertEqual(posts, [self.commented])
+        Comment.objects.get(pk=self.comment.pk).delete()
+        _, posts = self.search('байкал')
+        self.assertEqual(posts, [])
+        Post.objects.get(pk=self.commented.pk).delete()
+        _, posts = self.search('фотографии')
+        self.assertEqual(posts, [])
+
+    def test_admin_search_uses_index(self):
+        """Поиск в админке идёт по тому же индексу."""
+        client = Client()
+        client.force_login(self.admin)
+        response = client.get(
+            reverse('admin:posts_post_changelist'), {'q': 'байкал'}
+        )
+        self.assertEqual(
+            list(response.context['cl'].result_list), [self.post]
+        )
+        response = client.get(
+            reverse('admin:posts_comment_changelist'), {'q': 'байкал'}
+        )
+        self.assertEqual(
+            list(response.context['cl'].result_list), [self.comment]
+        )
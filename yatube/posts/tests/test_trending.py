@@ -0,0 +1,159 @@
+import math
+from datetime import timedelta
+from io import StringIO
+from unittest import skipUnless
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from ..models import Comment, Post, TrendingScore
+from ..trending import add_scores, event_score, update_trending
+
+User = get_user_model()
+
+TRENDING = {
+    'HALF_LIFE': 60 * 60,
+    'POST_WEIGHT': 1.0,
+    'REACH_WEIGHT': 1.0,
+    'COMMENT_WEIGHT': 1.0,
+    'MIN_WEIGHT': 0.01,
+}
+
+
+@override_settings(TRENDING=TRENDING, POST_COUNT=2)
+class TrendingTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.quiet_post = Post.objects.create(
+            text='Тихий пост',
+            author=cls.author,
+        )
+        cls.busy_post = Post.objects.create(
+            text='Обсуждаемый пост',
+            author=cls.author,
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.guest_user = Client()
+
+    def comment(self, post, count=1):
+        for _ in range(count):
+            Comment.objects.create(
+                post=post, author=self.reader, text='Комментарий'
+            )
+
+    def scores(self):
+        return dict(TrendingScore.objects.values_list('post', 'score'))
+
+    def test_scores_decay_by_half_life(self):
+        """Вес события вдвое меньше через HALF_LIFE, а сумма — в логарифмах."""
+        now = timezone.now()
+        with self.settings(TRENDING=TRENDING):
+            recent = event_score(1, now)
+            older = event_score(1, now - timedelta(hours=1))
+        self.assertAlmostEqual(math.exp(older - recent), 0.5)
+        self.assertAlmostEqual(
+            add_scores(recent, recent), recent + math.log(2)
+        )
+        self.assertEqual(add_scores(None, recent), recent)
+
+    def test_comments_raise_post(self):
+        """Пост с новыми комментариями поднимается выше тихого поста."""
+        self.comment(self.busy_post, 3)
+        update_trending()
+        response = self.guest_user.get(reverse('posts:trending'))
+        self.assertEqual(
+            [entry.post for entry in response.context['page_obj']],
+            [self.busy_post, self.quiet_post],
+        )
+
+    def test_update_is_incremental(self):
+        """Повторный запуск учитывает только новые комментарии."""
+        update_trending()
+        before = self.scores()
+        self.assertEqual(update_trending(), 0)
+        self.assertEqual(self.scores(), before)
+        self.comment(self.quiet_post)
+        self.assertEqual(update_trending(), 1)
+        after = self.scores()
+        self.assertEqual(after[self.busy_post.pk], before[self.busy_post.pk])
+        self.assertGreater(
+            after[self.quiet_post.pk], before[self.quiet_post.pk]
+        )
+
+    def test_old_posts_are_pruned(self):
+        """Посты легче MIN_WEIGHT выбывают из таблицы рейтинга."""
+        update_trending()
+        update_trending(now=timezone.now() + timedelta(hours=24))
+        self.assertFalse(TrendingScore.objects.exists())
+
+    def test_follower_reach_raises_post(self):
+        """Пост автора с подписчиками весит больше поста без подписчиков."""
+        star = User.objects.create_user(username='star')
+        for number in range(5):
+            User.objects.create_user(
+                username=f'fan{number}'
+            ).follower.create(author=star)
+        star_post = Post.objects.create(text='Пост звезды', author=star)
+        update_trending()
+        scores = self.scores()
+        self.assertGreater(scores[star_post.pk], scores[self.busy_post.pk])
+
+    def test_command_updates_scores(self):
+        """Команда update_trending заполняет рейтинг."""
+        call_command('update_trending', stdout=StringIO())
+        self.assertEqual(TrendingScore.objects.count(), 2)
+
+    def test_cursor_pages(self):
+        """Следующая страница выбирается по курсору из рейтинга."""
+        extra = Post.objects.create(text='Третий пост', author=self.author)
+        self.comment(self.busy_post, 2)
+        self.comment(extra)
+        update_trending()
+        response = self.guest_user.get(reverse('posts:trending'))
+        page_obj = response.context['page_obj']
+        self.assertEqual(
+            [entry.post for entry in page_obj], [self.busy_post, extra]
+        )
+        response = self.guest_user.get(
+            reverse('posts:trending'), {'cursor': page_obj.next_cursor}
+        )
+        self.assertEqual(
+            [entry.post for entry in response.context['page_obj']],
+            [self.quiet_post],
+        )
+
+    @skipUnless(
+        connection.vendor == 'sqlite', 'EXPLAIN QUERY PLAN есть в SQLite'
+    )
+    def test_page_is_read_by_index(self):
+        """Страница популярного читается по индексу рейтинга без сортировки."""
+        Post.objects.create(text='Третий пост', author=self.author)
+        self.comment(self.busy_post)
+        update_trending()
+        first = self.guest_user.get(reverse('posts:trending'))
+        cursor = first.context['page_obj'].next_cursor
+        for params in ({}, {'cursor': cursor}):
+            with CaptureQueriesContext(connection) as queries:
+                self.guest_user.get(reverse('posts:trending'), params)
+            sql = [
+                query['sql'] for query in queries.captured_queries
+                if 'FROM "posts_trendingscore"' in query['sql']
+            ]
+            self.assertEqual(len(sql), 1)
+            with connection.cursor() as db_cursor:
+                db_cursor.execute(f'EXPLAIN QUERY PLAN {sql[0]}')
+                plan = ' '.join(str(row[-1]) for row in db_cursor.fetchall())
+            with self.subTest(params=params):
+                self.assertIn('trending_score_idx', plan)
+                self.assertNotIn('TEMP B-TREE', plan)
@@ -10,7 +10,9 @@ from django.core.files.uploadedfile import SimpleUploadedFile
 from django.test import Client, TestCase, override_settings
 from django.urls import reverse
 
-from ..models import Follow, Group, Post
+from ..counters import get_counters
+from ..models import Comment, Follow, Group, Post
+from ..thumbnails import generate_thumbnails, lookup_thumbnail
 
 User = get_user_model()
 
@@ -62,6 +64,53 @@ class PaginatorViewsTest(TestCase):
                     count_obj = len(response.context['page_obj'])
                     self.assertEqual(count_obj, count_post)
 
+    def test_cursor_pages_follow_each_other(self):
+        """Курсорная пагинация проходит ленту без пропусков и повторов."""
+        for url in PaginatorViewsTest.urls:
+            with self.subTest(url=url):
+                cache.clear()
+                first = self.authorized_user.get(f'{url}?cursor=')
+                page_obj = first.context['page_obj']
+                self.assertEqual(len(page_obj), settings.POST_COUNT)
+                self.assertFalse(page_obj.has_previous())
+                self.assertTrue(page_obj.has_next())
+                second = self.authorized_user.get(
+                    f'{url}?cursor={page_obj.next_cursor}'
+                )
+                second_page = second.context['page_obj']
+                self.assertEqual(len(second_page), 3)
+                self.assertFalse(second_page.has_next())
+                self.assertEqual(
+                    {post.pk for post in page_obj}
+                    | {post.pk for post in second_page},
+                    set(Post.objects.values_list('pk', flat=True)),
+                )
+                back = self.authorized_user.get(
+                    f'{url}?cursor={second_page.previous_cursor}'
+                )
+                self.assertEqual(
+                    list(back.context['page_obj']), list(page_obj)
+                )
+
+    def test_cursor_page_skips_count_query(self):
+        """Курсорная страница не выполняет COUNT(*) и OFFSET."""
+        url = reverse('posts:group_list', kwargs={'slug': 'test-slug'})
+        with self.assertNumQueries(3) as queries:
+            self.guest_user.get(f'{url}?cursor=')
+        for query in queries.captured_queries:
+            self.assertNotIn('COUNT(', query['sql'])
+            self.assertNotIn('OFFSET', query['sql'])
+
+    def test_broken_cursor_shows_first_page(self):
+        """Битый курсор открывает первую страницу ленты."""
+        response = self.authorized_user.get(
+            reverse('posts:index') + '?cursor=broken'
+        )
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+        self.assertEqual(
+            len(response.context['page_obj']), settings.POST_COUNT
+        )
+
 
 @override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
 class PostsViewsTests(TestCase):
@@ -244,6 +293,40 @@ class PostsViewsTests(TestCase):
         context_count_end = response_end.context['page_obj']
         self.assertNotEqual(post, context_count_end)
 
+    def test_feed_uses_pregenerated_thumbnail(self):
+        """Лента берёт готовую миниатюру и не создаёт её сама."""
+        cache.clear()
+        response = self.guest_user.get(reverse('posts:index'))
+        self.assertContains(response, self.post.image.url)
+        generate_thumbnails(self.post.image.name)
+        cache.clear()
+        response = self.guest_user.get(reverse('posts:index'))
+        thumbnail = lookup_thumbnail(self.post.image, 'feed')
+        self.assertIsNotNone(thumbnail)
+        self.assertContains(response, thumbnail.url)
+
+    def test_index_cache_keeps_pages_apart(self):
+        """Кеш главной хранит страницы отдельно."""
+        cache.clear()
+        Post.objects.bulk_create([
+            Post(author=self.user, text=f'Пост для второй страницы {i}')
+            for i in range(settings.POST_COUNT)
+        ])
+        first = self.guest_user.get(reverse('posts:index'))
+        second = self.guest_user.get(reverse('posts:index') + '?page=2')
+        self.assertNotEqual(first.content, second.content)
+
+    def test_index_cache_is_dropped_on_new_post(self):
+        """Новый пост сбрасывает кеш главной страницы."""
+        cache.clear()
+        self.guest_user.get(reverse('posts:index'))
+        Post.objects.create(
+            text='Пост после кеширования',
+            author=self.user,
+        )
+        response = self.guest_user.get(reverse('posts:index'))
+        self.assertContains(response, 'Пост после кеширования')
+
 
 class FollowPagesTests(TestCase):
     @classmethod
@@ -311,8 +394,8 @@ class FollowPagesTests(TestCase):
         )
         response_2 = self.follower_user.get(reverse('posts:follow_index'))
         self.assertEqual(
-            response_2.context['page_obj']
-            .paginator.page(1).object_list.count(), 1
+            len(response_2.context['page_obj']
+                .paginator.page(1).object_list), 1
         )
 
     def test_new_post_not_appears_in_not_followers_list(self):
@@ -329,6 +412,121 @@ class FollowPagesTests(TestCase):
             reverse('posts:follow_index')
         )
         self.assertEqual(
-            response_3.context['page_obj']
-            .paginator.page(1).object_list.count(), 0
+            len(response_3.context['page_obj']
+                .paginator.page(1).object_list), 0
+        )
+
+    def test_feed_is_filled_on_publish_and_pruned_on_unfollow(self):
+        """Лента подписок пополняется при публикации
+        и очищается при отписке.
+        """
+        Follow.objects.create(
+            user=FollowPagesTests.follower,
+            author=FollowPagesTests.author,
+        )
+        new_post = Post.objects.create(
+            text='Пост после подписки',
+            author=FollowPagesTests.author,
+        )
+        self.assertEqual(
+            set(FollowPagesTests.follower.feed.values_list(
+                'post', flat=True
+            )),
+            {FollowPagesTests.post.pk, new_post.pk},
+        )
+        self.assertFalse(FollowPagesTests.not_follower.feed.exists())
+        self.follower_user.get(
+            reverse(
+                'posts:profile_unfollow',
+                kwargs={'username': FollowPagesTests.author}
+            )
+        )
+        self.assertFalse(FollowPagesTests.follower.feed.exists())
+        response = self.follower_user.get(reverse('posts:follow_index'))
+        self.assertEqual(len(response.context['page_obj']), 0)
+
+    def test_follow_feed_cursor_pages(self):
+        """Курсорные страницы ленты подписок не дублируют посты."""
+        Follow.objects.create(
+            user=FollowPagesTests.not_follower,
+            author=FollowPagesTests.author,
+        )
+        Follow.objects.create(
+            user=FollowPagesTests.follower,
+            author=FollowPagesTests.author,
+        )
+        Post.objects.bulk_create([
+            Post(author=FollowPagesTests.author, text=f'Пост {i}')
+            for i in range(settings.POST_COUNT)
+        ])
+        Follow.objects.filter(user=FollowPagesTests.follower).delete()
+        Follow.objects.create(
+            user=FollowPagesTests.follower,
+            author=FollowPagesTests.author,
+        )
+        url = reverse('posts:follow_index')
+        first = self.follower_user.get(f'{url}?cursor=').context['page_obj']
+        second = self.follower_user.get(
+            f'{url}?cursor={first.next_cursor}'
+        ).context['page_obj']
+        self.assertEqual(len(first), settings.POST_COUNT)
+        self.assertEqual(len(second), 1)
+        self.assertFalse(second.has_next())
+        self.assertFalse({post.pk for post in first}
+                         & {post.pk for post in second})
+
+
+class CommentsViewsTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.post = Post.objects.create(
+            text='Тестовый пост',
+            author=cls.author,
+        )
+        Comment.objects.bulk_create([
+            Comment(
+                post=cls.post,
+                author=User.objects.create_user(username=f'reader{i}'),
+                text=f'Комментарий {i}',
+            )
+            for i in range(settings.COMMENT_COUNT + 5)
+        ])
+        cls.detail_url = reverse(
+            'posts:post_detail', kwargs={'post_id': cls.post.pk}
+        )
+        cls.comments_url = reverse(
+            'posts:api_post_comments', kwargs={'post_id': cls.post.pk}
+        )
+
+    def setUp(self):
+        self.guest_user = Client()
+
+    def test_post_detail_comments_without_n_plus_one(self):
+        """Комментарии выводятся с авторами без запроса на каждого."""
+        get_counters(User.objects.get(username='author'))
+        with self.assertNumQueries(3):
+            response = self.guest_user.get(self.detail_url)
+        comments = response.context['comments']
+        self.assertEqual(len(comments), settings.COMMENT_COUNT)
+        self.assertContains(response, comments[0].author.username)
+        rest = self.guest_user.get(
+            f'{self.detail_url}?comments={comments.next_cursor}'
+        ).context['comments']
+        self.assertEqual(len(rest), 5)
+        self.assertFalse(rest.has_next())
+
+    def test_load_more_comments_json(self):
+        """«Показать ещё» догружает комментарии из API по курсору."""
+        comments = self.guest_user.get(self.detail_url).context['comments']
+        url = f'{self.comments_url}?cursor={comments.next_cursor}'
+        response = self.guest_user.get(self.detail_url)
+        self.assertContains(response, f'data-comments-url="{url}"')
+        rest = self.guest_user.get(url).json()
+        self.assertEqual(len(rest['results']), 5)
+        self.assertEqual(
+            set(rest['results'][0]),
+            {'id', 'post', 'author', 'text', 'created'},
         )
+        self.assertIsNone(rest['next'])
@@ -0,0 +1,208 @@
+import logging
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.db import connection, transaction
+from sorl.thumbnail import default, get_thumbnail
+from sorl.thumbnail.base import ThumbnailBackend
+from sorl.thumbnail.images import ImageFile
+
+from .feed_cache import invalidate_feeds
+from .images import process_image
+from .models import Post
+
+logger = logging.getLogger(__name__)
+
+_executor = None
+_executor_lock = threading.Lock()
+_pending = threading.local()
+
+
+class _Found(Exception):
+    def __init__(self, thumbnail):
+        self.thumbnail = thumbnail
+
+
+class LookupThumbnailBackend(ThumbnailBackend):
+    """Бэкенд sorl, который только ищет готовую миниатюру.
+
+    Параметры и имя файла миниатюры считает сам sorl в get_thumbnail,
+    а поиск обрывается сразу после имени, до чтения исходника.
+    """
+
+    def _get_thumbnail_filename(self, source, geometry_string, options):
+        name = super()._get_thumbnail_filename(
+            source, geometry_string, options
+        )
+        raise _Found(default.kvstore.get(ImageFile(name, default.storage)))
+
+    def lookup(self, file_, geometry_string, **options):
+        try:
+            self.get_thumbnail(file_, geometry_string, **options)
+        except _Found as found:
+            return found.thumbnail
+        return None
+
+
+lookup_backend = LookupThumbnailBackend()
+
+
+def lookup_thumbnail(image, size):
+    """Возвращает готовую миниатюру размера из POST_THUMBNAILS или None."""
+    geometry, options = settings.POST_THUMBNAILS[size]
+    return lookup_backend.lookup(image, geometry, **options)
+
+
+def generate_thumbnails(name):
+    """Создаёт все миниатюры изображения, которые используют шаблоны."""
+    for geometry, options in settings.POST_THUMBNAILS.values():
+        get_thumbnail(name, geometry, **options)
+
+
+def _generate_in_worker(name, size):
+    geometry, options = settings.POST_THUMBNAILS[size]
+    try:
+        get_thumbnail(name, geometry, **options)
+    except Exception:
+        logger.exception('Не удалось создать миниатюру %s для %s', size, name)
+
+
+def _process_in_worker(post_id, name, scopes):
+    try:
+        new_name = process_image(name)
+        if new_name is not None:
+            updated = Post.objects.filter(
+                pk=post_id, image=name
+            ).update(image=new_name)
+            if not updated:
+                # Пока картинка пережималась, у поста сменилась картинка.
+                default_storage.delete(new_name)
+                return
+            invalidate_feeds(*scopes)
+            if not settings.POST_IMAGE_PROCESSING['KEEP_ORIGINAL']:
+                default_storage.delete(name)
+            name = new_name
+        generate_thumbnails(name)
+    except Exception:
+        logger.exception('Не удалось обработать картинку %s', name)
+
+
+def _run_in_worker(func, *args):
+    try:
+        func(*args)
+    finally:
+        connection.close()
+
+
+class ThumbnailPool(ThreadPoolExecutor):
+    """Пул, закрывающий соединение потока с базой после каждой задачи."""
+
+    def submit(self, func, *args):
+        return super().submit(_run_in_worker, func, *args)
+
+
+class ImmediateExecutor:
+    """Исполнитель без потоков: задача выполняется прямо при отдаче.
+
+    Включается THUMBNAIL_WORKERS = 0, например в тестах, где задача
+    не должна пережить запрос и временный MEDIA_ROOT.
+    """
+
+    def submit(self, func, *args):
+        future = Future()
+        future.set_result(func(*args))
+        return future
+
+
+def _get_executor():
+    global _executor
+    if not settings.THUMBNAIL_WORKERS:
+        return ImmediateExecutor()
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThumbnailPool(
+                max_workers=settings.THUMBNAIL_WORKERS,
+                thread_name_prefix='thumbnails',
+            )
+        return _executor
+
+
+def _pending_jobs():
+    if not hasattr(_pending, 'jobs'):
+        _pending.jobs = set()
+    return _pending.jobs
+
+
+def _submit(func, *args):
+    jobs = _pending_jobs()
+    future = _get_executor().submit(func, *args)
+    jobs.add(future)
+    future.add_done_callback(jobs.discard)
+
+
+def _submit_thumbnails(name):
+    for size in settings.POST_THUMBNAILS:
+        _submit(_generate_in_worker, name, size)
+
+
+def _enqueue(func, *args):
+    deferred = getattr(_pending, 'deferred', None)
+    if deferred is None:
+        func(*args)
+    else:
+        deferred.append((func, args))
+
+
+def schedule_thumbnails(image):
+    """Ставит генерацию миниатюр в фоновый пул после фиксации транзакции.
+
+    Внутри запроса задачи копятся до его завершения, см.
+    defer_thumbnails, вне запроса уходят в пул сразу.
+    """
+    if not image:
+        return
+    name = image.name
+    transaction.on_commit(lambda: _enqueue(_submit_thumbnails, name))
+
+
+def schedule_image_processing(post):
+    """Ставит новую картинку поста в пул на пережатие и миниатюры.
+
+    Пост получает пережатую картинку обновлением в обход сигналов,
+    поэтому задача сама сбрасывает кеш его лент.
+    """
+    scopes = [f'post:{post.pk}', f'profile:{post.author_id}']
+    if post.group_id:
+        scopes.append(f'group:{post.group_id}')
+    args = (post.pk, post.image.name, scopes)
+    transaction.on_commit(lambda: _enqueue(_submit, _process_in_worker, *args))
+
+
+def defer_thumbnails():
+    """Откладывает миниатюры, заказанные в текущем потоке, до отправки ответа.
+
+    Пока запрос пишет в базу, пул не конкурирует с ним за блокировки.
+    """
+    _pending.deferred = []
+
+
+def wait_for_thumbnails():
+    """Дожидается задач, уже отданных в пул из текущего потока.
+
+    Нужен пакетным командам и тестам: запросы своих задач не ждут.
+    """
+    wait(list(_pending_jobs()))
+
+
+def finish_thumbnails():
+    """Отдаёт отложенные миниатюры в пул, не дожидаясь их.
+
+    Каждый размер считается в пуле отдельной задачей, а поток
+    запроса сразу берёт следующий запрос.
+    """
+    deferred = getattr(_pending, 'deferred', None) or []
+    _pending.deferred = None
+    for func, args in deferred:
+        func(*args)
@@ -0,0 +1,129 @@
+import math
+from datetime import datetime, timezone
+
+from django.conf import settings
+from django.db.models.functions import Coalesce
+from django.utils import timezone as django_timezone
+
+from core.db import retry_on_busy
+
+from .feed_cache import bump_scopes
+from .models import Comment, Post, TrendingScore, TrendingWatermark
+
+# Точка отсчёта времени в рейтинге. Рейтинг растёт линейно со временем,
+# и близкая точка отсчёта сохраняет точность float.
+EPOCH = datetime(2020, 1, 1, tzinfo=timezone.utc)
+
+
+def _decay_rate():
+    return math.log(2) / settings.TRENDING['HALF_LIFE']
+
+
+def event_score(weight, moment):
+    """Логарифм веса события, затухающего от момента moment.
+
+    Вес, поделённый пополам каждые HALF_LIFE секунд, в логарифмах
+    равен log(weight) - (now - moment) / tau. Слагаемое с now общее
+    у всех постов и в рейтинг не входит.
+    """
+    return (
+        math.log(weight)
+        + (moment - EPOCH).total_seconds() * _decay_rate()
+    )
+
+
+def add_scores(first, second):
+    """Логарифм суммы весов, заданных логарифмами; first может быть None."""
+    if first is None:
+        return second
+    high, low = max(first, second), min(first, second)
+    return high + math.log1p(math.exp(low - high))
+
+
+def score_floor(now=None):
+    """Рейтинг, ниже которого пост выпадает из популярного."""
+    return event_score(
+        settings.TRENDING['MIN_WEIGHT'], now or django_timezone.now()
+    )
+
+
+def _add_event(scores, post_id, weight, moment):
+    if weight > 0:
+        scores[post_id] = add_scores(
+            scores.get(post_id), event_score(weight, moment)
+        )
+
+
+def _new_events(watermarks):
+    """Считает рейтинги постов и комментариев новее отметок."""
+    options = settings.TRENDING
+    scores = {}
+    posts = Post.objects.filter(
+        pk__gt=watermarks['post'].last_id
+    ).annotate(
+        followers=Coalesce('author__counters__followers_count', 0)
+    ).order_by('pk').values_list('pk', 'pub_date', 'followers')
+    for post_id, pub_date, followers in posts.iterator():
+        _add_event(
+            scores, post_id,
+            options['POST_WEIGHT']
+            + options['REACH_WEIGHT'] * math.log1p(followers),
+            pub_date,
+        )
+        watermarks['post'].last_id = post_id
+    comments = Comment.objects.filter(
+        pk__gt=watermarks['comment'].last_id
+    ).order_by('pk').values_list('pk', 'post', 'created')
+    for comment_id, post_id, created in comments.iterator():
+        _add_event(scores, post_id, options['COMMENT_WEIGHT'], created)
+        watermarks['comment'].last_id = comment_id
+    return scores
+
+
+@retry_on_busy
+def _apply_new_events(batch_size, now):
+    watermarks = {
+        watermark.source: watermark
+        for watermark in TrendingWatermark.objects.all()
+    }
+    for source in ('post', 'comment'):
+        watermarks.setdefault(source, TrendingWatermark(source=source))
+    scores = _new_events(watermarks)
+    ids = list(scores)
+    existing = {}
+    for start in range(0, len(ids), batch_size):
+        existing.update(TrendingScore.objects.filter(
+            post_id__in=ids[start:start + batch_size]
+        ).values_list('post_id', 'score'))
+    floor = score_floor(now)
+    to_create = []
+    to_update = []
+    for post_id, score in scores.items():
+        if post_id in existing:
+            to_update.append(TrendingScore(
+                post_id=post_id, score=add_scores(existing[post_id], score)
+            ))
+        elif score >= floor:
+            to_create.append(TrendingScore(post_id=post_id, score=score))
+    TrendingScore.objects.bulk_create(to_create, batch_size=batch_size)
+    TrendingScore.objects.bulk_update(
+        to_update, ['score'], batch_size=batch_size
+    )
+    TrendingScore.objects.filter(score__lt=floor).delete()
+    for watermark in watermarks.values():
+        watermark.save()
+    return len(to_create) + len(to_update)
+
+
+def update_trending(batch_size=1000, now=None):
+    """Добавляет в рейтинг посты и комментарии с прошлого запуска.
+
+    Новые события прибавляются к сохранённому рейтингу поста, старые
+    не перечитываются: затухание уже заложено в score. Посты, чей вес
+    упал ниже MIN_WEIGHT, удаляются из таблицы, поэтому она хранит
+    только популярное за последние несколько HALF_LIFE.
+    Возвращает количество постов с изменившимся рейтингом.
+    """
+    updated = _apply_new_events(batch_size, now or django_timezone.now())
+    bump_scopes('trending')
+    return updated
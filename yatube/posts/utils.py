@@ -1,10 +1,252 @@
 from django.conf import settings
-from django.core.paginator import Paginator
+from django.core.cache import cache
+from django.core.paginator import EmptyPage, Page, PageNotAnInteger, Paginator
+from django.db.models import Q
+from django.utils.functional import cached_property
+from django.utils.dateparse import parse_datetime
+from django.utils.encoding import force_bytes
+from django.utils.http import urlsafe_base64_decode, urlsafe_base64_encode
 
+CURSOR_NEXT = 'n'
+CURSOR_PREVIOUS = 'p'
 
-def show_post_count_in_page(request, posts):
-    """Данная функция возвращает количество постов на странице."""
-    paginator = Paginator(posts, settings.POST_COUNT)
+
+def encode_cursor(date, pk, direction):
+    """Кодирует позицию записи в ленте в непрозрачный токен.
+
+    Вместо даты ключом может быть число, например рейтинг поста.
+    """
+    date = date.isoformat() if hasattr(date, 'isoformat') else repr(date)
+    value = f'{direction}|{date}|{pk}'
+    return urlsafe_base64_encode(force_bytes(value))
+
+
+def decode_cursor(token, parse=parse_datetime):
+    """Возвращает (направление, дата, id) или None для битого токена."""
+    try:
+        direction, date, pk = urlsafe_base64_decode(token).decode().split('|')
+        date = parse(date)
+        pk = int(pk)
+    except (TypeError, ValueError):
+        return None
+    if direction not in (CURSOR_NEXT, CURSOR_PREVIOUS) or date is None:
+        return None
+    return direction, date, pk
+
+
+class CursorPage(Page):
+    """Страница ленты, выбранная по ключу (дата, id) без COUNT(*)."""
+
+    cursor_mode = True
+
+    def __init__(self, object_list, paginator, has_next, has_previous):
+        super().__init__(object_list, None, paginator)
+        self._has_next = has_next
+        self._has_previous = has_previous
+
+    def __repr__(self):
+        return '<Cursor page>'
+
+    def has_next(self):
+        return self._has_next
+
+    def has_previous(self):
+        return self._has_previous
+
+    def _cursor(self, row, direction):
+        values = [
+            row[field] if isinstance(row, dict) else getattr(row, field)
+            for field in (self.paginator.date_field, self.paginator.pk_field)
+        ]
+        return encode_cursor(*values, direction)
+
+    @property
+    def next_cursor(self):
+        if not self._has_next:
+            return None
+        return self._cursor(self.object_list[-1], CURSOR_NEXT)
+
+    @property
+    def previous_cursor(self):
+        if not self._has_previous:
+            return None
+        return self._cursor(self.object_list[0], CURSOR_PREVIOUS)
+
+
+class CursorPaginator(Paginator):
+    """Пагинатор по ключу (дата, id) вместо OFFSET.
+
+    Страница выбирается запросом по индексу с LIMIT per_page + 1:
+    лишняя запись лишь показывает, есть ли продолжение в ту же сторону.
+    Поля ключа должны быть среди полей строк, в том числе для values().
+    parse разбирает первое поле ключа из токена.
+    """
+
+    def __init__(
+        self, object_list, per_page, key=('pub_date', 'pk'),
+        parse=parse_datetime,
+    ):
+        super().__init__(object_list, per_page)
+        self.date_field, self.pk_field = key
+        self.parse = parse
+
+    def cursor_page(self, token):
+        cursor = decode_cursor(token, self.parse) if token else None
+        date_field, pk_field = self.date_field, self.pk_field
+        queryset = self.object_list.order_by(
+            f'-{date_field}', f'-{pk_field}'
+        )
+        if cursor is None:
+            rows = list(queryset[:self.per_page + 1])
+            return CursorPage(
+                rows[:self.per_page], self,
+                has_next=len(rows) > self.per_page,
+                has_previous=False,
+            )
+        direction, date, pk = cursor
+        if direction == CURSOR_NEXT:
+            rows = list(queryset.filter(
+                Q(**{f'{date_field}__lt': date})
+                | Q(**{date_field: date, f'{pk_field}__lt': pk})
+            )[:self.per_page + 1])
+            return CursorPage(
+                rows[:self.per_page], self,
+                has_next=len(rows) > self.per_page,
+                has_previous=True,
+            )
+        rows = list(queryset.filter(
+            Q(**{f'{date_field}__gt': date})
+            | Q(**{date_field: date, f'{pk_field}__gt': pk})
+        ).reverse()[:self.per_page + 1])
+        return CursorPage(
+            rows[:self.per_page][::-1], self,
+            has_next=True,
+            has_previous=len(rows) > self.per_page,
+        )
+
+
+class FeedPaginator(Paginator):
+    """Постраничный пагинатор, который не считает ленту на каждый запрос.
+
+    Число записей берётся из ``count``, если оно известно заранее,
+    или из кеша под ключом ``count_key``; в ключ стоит включать
+    поколение ленты, тогда COUNT(*) выполняется раз на изменение.
+    Без того и другого пагинатор работает в режиме «есть ли
+    следующая»: страница выбирается с per_page + 1 записью, а число
+    страниц известно только до следующей за текущей.
+    """
+
+    def __init__(self, object_list, per_page, count=None, count_key=None):
+        super().__init__(object_list, per_page)
+        self.count_key = count_key
+        self.has_next_only = count is None and count_key is None
+        if count is not None:
+            self.count = count
+
+    @cached_property
+    def count(self):
+        if self.count_key is None:
+            return Paginator.count.func(self)
+        return cache.get_or_set(
+            self.count_key,
+            lambda: Paginator.count.func(self),
+            settings.COUNT_CACHE_TIMEOUT,
+        )
+
+    def validate_number(self, number):
+        if not self.has_next_only:
+            return super().validate_number(number)
+        try:
+            number = int(number)
+        except (TypeError, ValueError):
+            raise PageNotAnInteger('Номер страницы не является числом')
+        if number < 1:
+            raise EmptyPage('Номер страницы меньше 1')
+        return number
+
+    def page(self, number):
+        if not self.has_next_only:
+            return super().page(number)
+        number = self.validate_number(number)
+        bottom = (number - 1) * self.per_page
+        rows = list(self.object_list[bottom:bottom + self.per_page + 1])
+        if not rows and number > 1:
+            self.__dict__.pop('count', None)
+            self.__dict__.pop('num_pages', None)
+            raise EmptyPage('На этой странице нет записей')
+        # Лишняя запись делает count нижней оценкой, которой хватает,
+        # чтобы has_next() и num_pages видели одну следующую страницу.
+        self.count = bottom + len(rows)
+        self.__dict__.pop('num_pages', None)
+        return self._get_page(rows[:self.per_page], number, self)
+
+    def get_page(self, number):
+        """Как Paginator.get_page; за концом ленты считает COUNT(*)."""
+        try:
+            return super().get_page(number)
+        except EmptyPage:
+            return self.page(self.num_pages)
+
+
+def page_window(page, on_each_side=None, on_ends=1):
+    """Номера страниц вокруг текущей и по краям, None на месте пропуска.
+
+    Длина списка не зависит от числа страниц, поэтому пагинатор
+    в шаблоне не растёт вместе с таблицей.
+    """
+    if on_each_side is None:
+        on_each_side = settings.PAGE_WINDOW
+    last = page.paginator.num_pages
+    numbers = set(range(1, min(on_ends, last) + 1))
+    if not getattr(page.paginator, 'has_next_only', False):
+        numbers.update(range(max(1, last - on_ends + 1), last + 1))
+    numbers.update(range(
+        max(1, page.number - on_each_side),
+        min(last, page.number + on_each_side) + 1,
+    ))
+    window = []
+    for number in sorted(numbers):
+        if window and number - window[-1] > 1:
+            window.append(None)
+        window.append(number)
+    return window
+
+
+def show_post_count_in_page(
+    request, posts, count=None, cursor_key=('pub_date', 'pk'),
+    count_key=None,
+):
+    """Данная функция возвращает количество постов на странице.
+
+    С параметром ``cursor`` страница выбирается по ключу ``cursor_key``
+    без COUNT(*) и OFFSET, обычные ссылки ``?page=N`` продолжают работать.
+    Известное заранее ``count`` или ключ кеша ``count_key`` избавляют
+    пагинатор от COUNT(*) на каждый запрос, без них страница
+    выбирается в режиме «есть ли следующая».
+    """
+    cursor = request.GET.get('cursor')
+    if cursor is not None:
+        paginator = CursorPaginator(
+            posts, settings.POST_COUNT, key=cursor_key
+        )
+        return paginator.cursor_page(cursor)
+    paginator = FeedPaginator(
+        posts, settings.POST_COUNT, count=count, count_key=count_key
+    )
     page_number = request.GET.get('page')
     page_obj = paginator.get_page(page_number)
     return page_obj
+
+
+def show_comments_page(request, comments):
+    """Возвращает страницу комментариев поста.
+
+    Длинные обсуждения листаются по ключу (created, id), размер
+    страницы задаёт settings.COMMENT_COUNT.
+    """
+    paginator = CursorPaginator(
+        comments,
+        settings.COMMENT_COUNT,
+        key=('created', 'pk'),
+    )
+    return paginator.cursor_page(request.GET.get('comments'))
@@ -1,34 +1,154 @@
+from django.conf import settings
+from django.contrib.admin.views.decorators import staff_member_required
 from django.contrib.auth import get_user_model
 from django.contrib.auth.decorators import login_required
+from django.db.models import F
+from django.http import Http404, JsonResponse, StreamingHttpResponse
 from django.shortcuts import get_object_or_404, redirect, render
+from django.utils.http import urlencode
+from django.views.decorators.http import require_POST
 
+from core.db import retry_on_busy
+
+from .conditional import (
+    conditional_feed,
+    group_index_validators,
+    group_validators,
+    index_validators,
+    post_validators,
+    profile_validators,
+    trending_validators,
+)
+from .counters import get_counters
+from .export import EXPORT_FORMATS, EXPORT_MODELS, export_lines
+from .feed_cache import feed_version
 from .forms import CommentForm, PostForm
-from .models import Follow, Group, Post
-from .utils import show_post_count_in_page
+from .importer import PostImporter
+from .models import Follow, Group, GroupStats, Post, TrendingScore
+from .recommendations import get_suggestions
+from .search import get_search_backend
+from .utils import (
+    CursorPaginator,
+    FeedPaginator,
+    show_comments_page,
+    show_post_count_in_page,
+)
 
 User = get_user_model()
 
+FOLLOW_CURSOR_KEY = ("feed_date", "feed_post")
+TRENDING_CURSOR_KEY = ("score", "post_id")
 
-def index(request):
-    posts = Post.objects.select_related(
+
+def index_feed():
+    return Post.objects.select_related(
+        "author",
+        "group"
+    )
+
+
+def group_feed(group):
+    return group.posts.select_related(
         "author",
         "group"
     )
-    page_obj = show_post_count_in_page(request, posts)
+
+
+def profile_feed(author):
+    return author.posts.select_related(
+        "author",
+        "group"
+    )
+
+
+def follow_feed(user):
+    """Лента подписок, упорядоченная по ключу FOLLOW_CURSOR_KEY."""
+    return Post.objects.filter(
+        feed_entries__user=user
+    ).annotate(
+        feed_date=F("feed_entries__pub_date"),
+        feed_post=F("feed_entries__post"),
+    ).select_related(
+        "author",
+        "group"
+    ).order_by("-feed_date", "-feed_post")
+
+
+def trending_feed():
+    """Популярные посты, упорядоченные по ключу TRENDING_CURSOR_KEY."""
+    return TrendingScore.objects.select_related(
+        "post__author",
+        "post__group"
+    )
+
+
+@conditional_feed(index_validators)
+def index(request):
+    posts = index_feed()
+    page_obj = show_post_count_in_page(
+        request,
+        posts,
+        count_key=f'posts:count:index:{feed_version()}'
+    )
     template = 'posts/index.html'
     context = {
         'page_obj': page_obj,
+        'feed_version': feed_version(),
+        'cache_timeout': settings.INDEX_CACHE_TIMEOUT,
     }
     return render(request, template, context)
 
 
+@conditional_feed(trending_validators)
+def trending(request):
+    """Популярное: страница выбирается по индексу рейтинга без OFFSET."""
+    page_obj = CursorPaginator(
+        trending_feed(),
+        settings.POST_COUNT,
+        key=TRENDING_CURSOR_KEY,
+        parse=float,
+    ).cursor_page(request.GET.get('cursor'))
+    template = 'posts/trending.html'
+    context = {
+        'page_obj': page_obj,
+        'trending': True,
+    }
+    return render(request, template, context)
+
+
+@conditional_feed(group_index_validators)
+def group_index(request):
+    """Каталог групп по сводкам GroupStats, без агрегации постов."""
+    version = feed_version('groups')
+    groups = GroupStats.objects.select_related('group').order_by(
+        '-last_post_date', '-group'
+    )
+    page_obj = FeedPaginator(
+        groups,
+        settings.GROUP_COUNT,
+        count_key=f'posts:count:groups:{version}'
+    ).get_page(request.GET.get('page'))
+    template = 'posts/group_index.html'
+    context = {
+        'page_obj': page_obj,
+        'groups_version': version,
+        'cache_timeout': settings.GROUP_INDEX_CACHE_TIMEOUT,
+    }
+    return render(request, template, context)
+
+
+@conditional_feed(group_validators)
 def group_posts(request, slug):
     group = get_object_or_404(Group, slug=slug)
-    posts = group.posts.select_related(
-        "author",
-        "group"
+    posts = group_feed(group)
+    page_obj = show_post_count_in_page(
+        request,
+        posts,
+        count_key=(
+            f'posts:count:group:{group.pk}:'
+            f'{feed_version(f"group:{group.pk}")}'
+        )
     )
-    page_obj = show_post_count_in_page(request, posts)
     template = 'posts/group_list.html'
     context = {
         'group': group,
@@ -37,33 +157,50 @@ def group_posts(request, slug):
     return render(request, template, context)
 
 
+@conditional_feed(profile_validators)
 def profile(request, username,):
-    author = get_object_or_404(User, username=username)
-    post_author = author.posts.select_related(
-        "author",
-        "group"
+    author = get_object_or_404(
+        User.objects.select_related("counters"),
+        username=username
     )
+    counters = get_counters(author)
+    post_author = profile_feed(author)
     is_following = (
         request.user.is_authenticated
         and author.following.filter(user=request.user).exists()
     )
     template = 'posts/profile.html'
-    page_obj = show_post_count_in_page(request, post_author)
+    page_obj = show_post_count_in_page(
+        request,
+        post_author,
+        count=counters.posts_count
+    )
     context = {
         'page_obj': page_obj,
         'author': author,
-        'following': is_following
+        'counters': counters,
+        'following': is_following,
+        'suggestions': get_suggestions(request.user),
     }
     return render(request, template, context)
 
 
+@conditional_feed(post_validators)
 def post_detail(request, post_id):
-    post = get_object_or_404(Post, pk=post_id)
+    post = get_object_or_404(
+        Post.objects.select_related("author__counters", "group"),
+        pk=post_id
+    )
     template = 'posts/post_detail.html'
     form = CommentForm()
     context = {
         'post': post,
         'form': form,
+        'comments': show_comments_page(
+            request,
+            post.comments.select_related("author")
+        ),
+        'post_count': get_counters(post.author).posts_count,
     }
     return render(request, template, context)
 
@@ -114,6 +251,7 @@ def post_edit(request, post_id):
 
 
 @login_required
+@retry_on_busy
 def add_comment(request, post_id):
     post = get_object_or_404(Post, pk=post_id)
     form = CommentForm(request.POST or None)
@@ -128,17 +266,22 @@ def add_comment(request, post_id):
 
 @login_required
 def follow_index(request):
-    posts = Post.objects.filter(author__following__user=request.user)
-    page_obj = show_post_count_in_page(request, posts)
+    page_obj = show_post_count_in_page(
+        request,
+        follow_feed(request.user),
+        cursor_key=FOLLOW_CURSOR_KEY
+    )
     template = 'posts/follow.html'
     context = {
         'page_obj': page_obj,
         'follow': True,
+        'suggestions': get_suggestions(request.user),
     }
     return render(request, template, context)
 
 
 @login_required
+@retry_on_busy
 def profile_follow(request, username):
     author = get_object_or_404(User, username=username)
     if request.user != author:
@@ -147,9 +290,57 @@ def profile_follow(request, username):
 
 
 @login_required
+@retry_on_busy
 def profile_unfollow(request, username):
     post_author = get_object_or_404(User, username=username)
     follower = Follow.objects.filter(user=request.user, author=post_author)
     if follower.exists():
         follower.delete()
     return redirect("posts:profile", username=username)
+
+
+def search(request):
+    query = request.GET.get('q', '').strip()
+    page_obj = None
+    if query:
+        results = get_search_backend().search_posts(query)
+        paginator = FeedPaginator(results, settings.POST_COUNT)
+        page_obj = paginator.get_page(request.GET.get('page'))
+    template = 'posts/search.html'
+    context = {
+        'query': query,
+        'page_obj': page_obj,
+        'paginator_params': '&' + urlencode({'q': query}),
+    }
+    return render(request, template, context)
+
+
+@staff_member_required
+def export(request, model):
+    export_format = request.GET.get('format', 'ndjson')
+    if model not in EXPORT_MODELS or export_format not in EXPORT_FORMATS:
+        raise Http404
+    after = request.GET.get('after')
+    after = int(after) if after and after.isdigit() else None
+    content_type = (
+        'text/csv' if export_format == 'csv' else 'application/x-ndjson'
+    )
+    response = StreamingHttpResponse(
+        export_lines(model, export_format, after=after),
+        content_type=f'{content_type}; charset=utf-8',
+    )
+    response['Content-Disposition'] = (
+        f'attachment; filename="{model}.{export_format}"'
+    )
+    return response
+
+
+@staff_member_required
+@require_POST
+def import_posts(request):
+    batch_size = request.GET.get('batch_size', '')
+    importer = PostImporter(
+        batch_size=int(batch_size) if batch_size.isdigit() else 1000
+    )
+    report = importer.run(request)
+    return JsonResponse(report.as_dict())
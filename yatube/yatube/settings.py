@@ -32,9 +32,12 @@ INSTALLED_APPS = [
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
+    'core.middleware.ReplicaRoutingMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'core.middleware.RateLimitMiddleware',
+    'core.middleware.ProfilingMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -54,21 +57,64 @@ TEMPLATES = [
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
                 'core.context_processors.year.year',
+                'core.context_processors.cache.cache_timeouts',
             ],
         },
     },
 ]
 
 WSGI_APPLICATION = 'yatube.wsgi.application'
+ASGI_APPLICATION = 'yatube.asgi.application'
+# Размер пула, в котором ASGI-обработчик выполняет запросы Django.
+ASGI_THREADS = int(os.environ.get('ASGI_THREADS', 8))
 
 
+# Профиль SQLite под конкурентную запись: WAL пускает читателей
+# параллельно с писателем, synchronous=NORMAL в WAL не теряет
+# согласованность, mmap и кеш страниц уменьшают системные вызовы.
+# PRAGMAS выставляет core.signals.tune_connection на каждом новом
+# соединении, BUSY_RETRIES и BUSY_BACKOFF задают повторы при
+# «database is locked» (core.db).
+SQLITE_PROFILE = {
+    'CONN_MAX_AGE': int(os.environ.get('DB_CONN_MAX_AGE', 60)),
+    'OPTIONS': {'timeout': 5},
+    'PRAGMAS': {
+        'journal_mode': 'WAL',
+        'synchronous': 'NORMAL',
+        'mmap_size': 256 * 1024 * 1024,
+        'cache_size': -64 * 1024,
+        'temp_store': 'MEMORY',
+    },
+    'BUSY_RETRIES': 5,
+    'BUSY_BACKOFF': 0.05,
+}
+
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': os.path.join(BASE_DIR, 'db.sqlite3'),
+        **SQLITE_PROFILE,
     }
 }
 
+# Реплики для чтения перечисляются через запятую в DB_REPLICAS,
+# например DB_REPLICAS=replica1.sqlite3,replica2.sqlite3. Локально
+# их догоняет команда replicate_db.
+REPLICA_DATABASES = []
+for number, name in enumerate(
+    filter(None, os.environ.get('DB_REPLICAS', '').split(',')), start=1
+):
+    DATABASES[f'replica{number}'] = {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': os.path.join(BASE_DIR, name.strip()),
+        'TEST': {'MIRROR': 'default'},
+        **SQLITE_PROFILE,
+    }
+    REPLICA_DATABASES.append(f'replica{number}')
+
+DATABASE_ROUTERS = ['core.routers.ReplicaRouter']
+REPLICA_STICKY_SECONDS = 10
+
 
 AUTH_PASSWORD_VALIDATORS = [
     {
@@ -101,6 +147,34 @@ STATIC_URL = '/static/'
 STATICFILES_DIRS = [os.path.join(BASE_DIR, 'static')]
 
 POST_COUNT = 10
+COMMENT_COUNT = 20
+GROUP_COUNT = 50
+# Популярное: вес события вдвое падает каждые HALF_LIFE секунд. Пост
+# весит POST_WEIGHT + REACH_WEIGHT * ln(1 + подписчики автора),
+# комментарий — COMMENT_WEIGHT. Посты легче MIN_WEIGHT выбывают.
+TRENDING = {
+    'HALF_LIFE': 6 * 60 * 60,
+    'POST_WEIGHT': 1.0,
+    'REACH_WEIGHT': 1.0,
+    'COMMENT_WEIGHT': 1.0,
+    'MIN_WEIGHT': 0.01,
+}
+# Рекомендации авторов: COUNT хранится на пользователя, SHOW
+# показывается на страницах. NEIGHBOURS похожих авторов учитывается
+# для каждого автора, BLOCK_PRODUCTS ограничивает работу и память
+# на блок матрицы, BATCH_SIZE пользователей записывается за раз.
+FOLLOW_SUGGESTIONS = {
+    'COUNT': 20,
+    'SHOW': 5,
+    'FRIENDS_WEIGHT': 1.0,
+    'COFOLLOW_WEIGHT': 1.0,
+    'NEIGHBOURS': 50,
+    'BLOCK_PRODUCTS': 10 ** 7,
+    'BATCH_SIZE': 5000,
+}
+# Сколько номеров страниц показывать по обе стороны от текущей.
+PAGE_WINDOW = 2
+COUNT_CACHE_TIMEOUT = 60 * 60
 LIMIT_TEXT = 30
 
 LOGIN_URL = 'users:login'
@@ -112,8 +186,99 @@ EMAIL_FILE_PATH = os.path.join(BASE_DIR, 'sent_emails')
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
+# Кеш в файле SQLite общий для всех воркеров на машине: фрагменты
+# и поколения лент, сброшенные в одном процессе, видны остальным.
+# Бэкенд подменяется через CACHE_BACKEND и CACHE_LOCATION, например
+# на django.core.cache.backends.memcached.PyLibMCCache.
 CACHES = {
     'default': {
-        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'BACKEND': os.environ.get('CACHE_BACKEND', 'core.cache.SQLiteCache'),
+        'LOCATION': os.environ.get(
+            'CACHE_LOCATION', os.path.join(BASE_DIR, 'cache.sqlite3')
+        ),
+        'OPTIONS': {
+            'MAX_SIZE': 64 * 1024 * 1024,
+            'MAX_ENTRIES': 10000,
+        },
     }
 }
+
+POST_THUMBNAILS = {
+    'feed': ('960x339', {'crop': 'center', 'upscale': True}),
+    'detail': ('960x339', {'crop': 'center', 'upscale': False}),
+}
+# 0 — считать миниатюры сразу в потоке, который их заказал.
+THUMBNAIL_WORKERS = 2
+
+# Новые картинки постов пережимаются в пуле миниатюр: поворот
+# по EXIF, уменьшение до MAX_SIZE, FORMAT без метаданных (без WebP
+# в сборке Pillow — прогрессивный JPEG). KEEP_ORIGINAL оставляет
+# исходный файл в хранилище.
+POST_IMAGE_PROCESSING = {
+    'MAX_SIZE': (1920, 1920),
+    'FORMAT': 'WEBP',
+    'QUALITY': 80,
+    'KEEP_ORIGINAL': False,
+    'SKIP_FORMATS': ('GIF',),
+}
+POST_IMAGE_MAX_UPLOAD_SIZE = 20 * 1024 * 1024
+# Загрузки пишутся на диск по частям, а не собираются в памяти;
+# из временного файла в MEDIA_ROOT файл переносится переименованием.
+FILE_UPLOAD_HANDLERS = [
+    'django.core.files.uploadhandler.TemporaryFileUploadHandler',
+]
+
+POST_SEARCH_BACKEND = 'posts.search.FTS5SearchBackend'
+
+# Корзины токенов для записи: CAPACITY запросов подряд, полностью
+# восстанавливаются за PERIOD секунд. METHODS ограничивает правило
+# методами, без него считаются все запросы к адресу.
+RATELIMIT = {
+    'LOCATION': os.environ.get(
+        'RATELIMIT_LOCATION', os.path.join(BASE_DIR, 'ratelimit.sqlite3')
+    ),
+    'RATES': {
+        'posts:add_comment': {
+            'CAPACITY': 10, 'PERIOD': 60, 'METHODS': ('POST',),
+        },
+        'posts:post_create': {
+            'CAPACITY': 5, 'PERIOD': 60, 'METHODS': ('POST',),
+        },
+        'posts:profile_follow': {'CAPACITY': 30, 'PERIOD': 60},
+        'posts:profile_unfollow': {'CAPACITY': 30, 'PERIOD': 60},
+    },
+}
+
+INDEX_CACHE_TIMEOUT = 60 * 5
+HEADER_CACHE_TIMEOUT = 60 * 5
+GROUP_INDEX_CACHE_TIMEOUT = 60 * 5
+
+PROFILING_SAMPLE_RATE = 0.01
+PROFILING_SLOW_REQUEST_MS = 500
+PROFILING_LOG_FILE = os.path.join(BASE_DIR, 'profiling.log')
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'formatters': {
+        'message': {'format': '%(message)s'},
+    },
+    'handlers': {
+        'profiling': {
+            'class': 'logging.handlers.RotatingFileHandler',
+            'filename': PROFILING_LOG_FILE,
+            'maxBytes': 10 * 1024 * 1024,
+            'backupCount': 5,
+            'encoding': 'utf-8',
+            'delay': True,
+            'formatter': 'message',
+        },
+    },
+    'loggers': {
+        'core.profiling': {
+            'handlers': ['profiling'],
+            'level': 'INFO',
+            'propagate': False,
+        },
+    },
+}
@@ -0,0 +1,33 @@
+"""Настройки для manage.py test и pytest.
+
+Кеш и корзины ограничений живут во временном каталоге и не трогают
+файлы сервера, а задачи пула миниатюр выполняются сразу и не
+переживают тест и его временный MEDIA_ROOT.
+"""
+import atexit
+import os
+import shutil
+import tempfile
+
+from .settings import *  # noqa: F401,F403
+from .settings import CACHES
+
+TEST_DIR = tempfile.mkdtemp(prefix='yatube-tests-')
+atexit.register(shutil.rmtree, TEST_DIR, ignore_errors=True)
+
+CACHES = {
+    'default': {
+        **CACHES['default'],
+        'BACKEND': 'core.cache.SQLiteCache',
+        'LOCATION': os.path.join(TEST_DIR, 'cache.sqlite3'),
+    }
+}
+
+# Все тесты ходят с одного IP, и общая корзина адреса копилась бы
+# между ними; тесты ограничений включают свои правила сами.
+RATELIMIT = {
+    'LOCATION': os.path.join(TEST_DIR, 'ratelimit.sqlite3'),
+    'RATES': {},
+}
+
+THUMBNAIL_WORKERS = 0